@@ -1,2 +1,3 @@
 #!/bin/sh
-exec redis-server --requirepass "${REDIS_PASSWORD}"
\ No newline at end of file
+# the append only file keeps queued jobs, inboxes and rankings across restarts, in the volume at /data.
+exec redis-server --requirepass "${REDIS_PASSWORD}" --appendonly yes --appendfsync everysec
@@ -1,5 +1,11 @@
+from datetime import timedelta
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
+
+from mboard.moderation import ban
+from mboard.moderation import remove_content
 
 from .forms import CustomUserCreationForm
 from .models import CustomUser
@@ -16,6 +22,19 @@ class CustomUserAdmin(UserAdmin):
         ("Permissions", {"fields": ("status", "is_active", "is_staff")}),
         ("Important dates", {"fields": ("last_login", "date_joined")}),
     )
+    actions = ["ban_and_purge", "remove_last_day"]
+
+    def report(self, request, counts: dict[str, int]):
+        self.message_user(request, ", ".join(f"{count} {name}" for name, count in counts.items()) + ".")
+
+    @admin.action(description="Ban selected users and remove their posts, comments and votes")
+    def ban_and_purge(self, request, queryset):
+        self.report(request, ban(list(queryset.values_list("id", flat=True))))
+
+    @admin.action(description="Remove posts and comments of selected users from the last 24 hours")
+    def remove_last_day(self, request, queryset):
+        since = timezone.now() - timedelta(days=1)
+        self.report(request, remove_content(list(queryset.values_list("id", flat=True)), since=since))
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -0,0 +1,21 @@
+"""
+Authentication backend loading the users of sessions from the cache.
+
+Every authenticated request loads its user, by id from the session. The backend keeps users in the cache for
+a short while. Users are forgotten whenever they are saved, see `forget_users`, so that bans, password changes
+and deactivations take effect on the next request rather than when the cache entry expires.
+"""
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import USER_CACHE_KEY
+from .models import USER_CACHE_TIMEOUT
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = USER_CACHE_KEY.format(user_id=user_id)
+        if (user := cache.get(key)) is None and (user := super().get_user(user_id)) is not None:
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
@@ -1,5 +1,19 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.db import models
+from django.db import transaction
+
+# users loaded by sessions, see `backends.CachedModelBackend`.
+USER_CACHE_KEY = "auth:user:{user_id}"
+USER_CACHE_TIMEOUT = 5 * 60
+
+
+def forget_users(*user_ids: int):
+    """Drops cached users, now for the rest of the transaction, and again once it commits."""
+    keys = [USER_CACHE_KEY.format(user_id=user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    # a request may have cached the old row while the transaction was running.
+    transaction.on_commit(lambda: cache.delete_many(keys))
 
 
 class CustomUser(AbstractUser):
@@ -15,6 +29,14 @@ class CustomUser(AbstractUser):
         default=Status.USER,
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        forget_users(self.id)
+
+    def delete(self, *args, **kwargs):
+        forget_users(self.id)
+        return super().delete(*args, **kwargs)
+
     def is_admin(self):
         return self.status == self.Status.ADMIN
 
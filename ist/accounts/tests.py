@@ -13,12 +13,23 @@ b. Login:
 c. Logout:
 
 [v] Test logging out successfully
+
+d. Sessions:
+
+[v] Test sessions and their users load without queries
+[v] Test saved and banned users are loaded afresh
+[v] Test sessions survive the cache being emptied
 """
 
+from django.contrib.auth import get_user
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory
 from django.test import TestCase
 from django.urls import reverse
 
+from mboard.moderation import ban
+
 
 # Create your tests here.
 class CustomUserModelTests(TestCase):
@@ -92,3 +103,33 @@ class LogoutTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(response.wsgi_request.user.is_authenticated)
         self.assertContains(response, "Logged out")
+
+
+class SessionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="test-user", password="test-password")
+        self.client.login(username="test-user", password="test-password")
+        self.request = RequestFactory().get("/")
+        self.request.session = self.client.session
+
+    def test_no_queries(self):
+        self.assertEqual(get_user(self.request), self.user)
+        with self.assertNumQueries(0):
+            request = RequestFactory().get("/")
+            request.session = self.client.session
+            self.assertEqual(get_user(request).username, "test-user")
+
+    def test_changes_take_effect(self):
+        get_user(self.request)
+        self.user.status = get_user_model().Status.MODERATOR
+        self.user.save()
+        self.assertTrue(get_user(self.request).is_mod())
+        ban([self.user.id], purge=False)
+        self.assertTrue(get_user(self.request).is_banned())
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(get_user(self.request).is_authenticated)
+
+    def test_cache_lost(self):
+        cache.clear()
+        self.assertEqual(get_user(self.request), self.user)
@@ -0,0 +1,68 @@
+from random import choice
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import RequestContext
+from django.template import Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from mboard.models import Comment
+from mboard.models import Post
+from mboard.settings import MAX_DEPTH
+
+
+class Command(BaseCommand):
+    help = "Compares rendering a large thread with the comment tree tag and with the recursive templates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=5_000, help="Number of comments in the thread")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of renders, the best one is reported")
+
+    def handle(self, *args, **options):
+        # the thread is created in a transaction which is rolled back at the end.
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(username="benchmark-user")
+            post = Post.objects.create(title="benchmark", url="https://example.com/benchmark", user=user)
+            self.create_thread(post, user, options["comments"])
+
+            request = RequestFactory().get("/")
+            request.user = user
+            comments = list(Comment.objects.with_nested_replies(MAX_DEPTH, user).filter(parent=None, post=post))
+            context = {"comments": comments, "max_depth": MAX_DEPTH}
+            tree_template = Template("{% load mboard_extras %}{% comment_tree comments max_depth %}")
+
+            recursive = self.best_of(
+                options["repeat"],
+                lambda: render_to_string("mboard/includes/comments.html", context, request=request),
+            )
+            tree = self.best_of(options["repeat"], lambda: tree_template.render(RequestContext(request, context)))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"recursive templates: {recursive * 1000:.0f}ms")
+        self.stdout.write(f"comment tree tag: {tree * 1000:.0f}ms")
+        self.stdout.write(f"speedup: {recursive / tree:.1f}x")
+
+    @staticmethod
+    def create_thread(post: Post, user, ncomments: int):
+        # a fifth of the comments are top level, the others reply to a comment of the level above.
+        # replies past the maximum depth are not rendered, only linked.
+        nlevels = MAX_DEPTH + 1
+        parents = [None]
+        for level in range(nlevels):
+            size = ncomments // 5 if level == 0 else (ncomments - ncomments // 5) // (nlevels - 1)
+            parents = Comment.objects.bulk_create(
+                Comment(content=f"a *comment* at level {level}", post=post, user=user, parent=choice(parents))
+                for _ in range(size)
+            )
+
+    @staticmethod
+    def best_of(repeat: int, render) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,96 @@
+"""
+Database routing between the primary and its read replicas.
+
+Views decorated with `read_from_replica` read from a replica, picked once per request among those
+lagging less than `REPLICA_MAX_LAG` seconds. Clients which wrote recently carry a cookie pinning them
+to the primary, so they see their own writes, and requests for pages which changed recently are pinned by
+`pin_to_primary`. Everything else, writes included, goes to the primary.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+from random import choice
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db import connections
+from django.http import HttpRequest
+
+PRIMARY = "default"
+# set by the middleware after a write, the client reads from the primary until it expires.
+STICKY_COOKIE = "primary"
+# set on requests which must read from the primary.
+PINNED_ATTRIBUTE = "_read_from_primary"
+# the alias reads are routed to within the current request, if not the primary.
+_read_alias = ContextVar("read_alias", default=None)
+# alias to (time of the check, lag in seconds), per process.
+_lags = {}
+
+
+def replicas() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def replica_lag(alias: str) -> float:
+    """
+    Returns how many seconds a replica is behind the primary, checking at most every `REPLICA_LAG_CHECK` seconds.
+    A replica which can not be reached counts as infinitely behind.
+    """
+    checked_at, lag = _lags.get(alias, (0.0, 0.0))
+    if time.monotonic() - checked_at < settings.REPLICA_LAG_CHECK:
+        return lag
+    try:
+        with connections[alias].cursor() as cursor:
+            # an idle replica has replayed everything it received, however old the last transaction is.
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )
+            lag = float(cursor.fetchone()[0])
+    except DatabaseError:
+        lag = float("inf")
+    _lags[alias] = (time.monotonic(), lag)
+    return lag
+
+
+def pick_replica() -> str | None:
+    """Returns a random replica among those keeping up with the primary, if any."""
+    healthy = [alias for alias in replicas() if replica_lag(alias) <= settings.REPLICA_MAX_LAG]
+    return choice(healthy) if healthy else None
+
+
+def pin_to_primary(request: HttpRequest):
+    """Routes the reads of a request to the primary, even within views decorated with `read_from_replica`."""
+    setattr(request, PINNED_ATTRIBUTE, True)
+
+
+def read_from_replica(view):
+    """Routes the reads of a view to a replica, unless the client has written recently or the request is pinned."""
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs):
+        if STICKY_COOKIE in request.COOKIES or getattr(request, PINNED_ATTRIBUTE, False) or not replicas():
+            return view(request, *args, **kwargs)
+        token = _read_alias.set(pick_replica())
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import os
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -80,6 +81,22 @@ MIDDLEWARE = [
     "mboard.middleware.rate_limiter",
 ]
 
+# p: production profiling. samples one request every `PROFILER_SAMPLE_RATE` and any request
+# p: slower than `PROFILER_THRESHOLD_MS`, zero disables. see `manage.py profiles`.
+PROFILER_SAMPLE_RATE = int(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+PROFILER_THRESHOLD_MS = int(os.environ.get("PROFILER_THRESHOLD_MS", 0))
+
+if PROFILER_SAMPLE_RATE or PROFILER_THRESHOLD_MS:
+    MIDDLEWARE.insert(1, "mboard.middleware.sampling_profiler")
+
+# p: records queries slower than `SLOW_QUERY_THRESHOLD_MS`, zero disables. one every
+# p: `SLOW_QUERY_EXPLAIN_RATE` slow selects is re-run with EXPLAIN ANALYZE. see `manage.py slowqueries`.
+SLOW_QUERY_THRESHOLD_MS = int(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 0))
+SLOW_QUERY_EXPLAIN_RATE = int(os.environ.get("SLOW_QUERY_EXPLAIN_RATE", 10))
+
+if SLOW_QUERY_THRESHOLD_MS:
+    MIDDLEWARE.insert(1, "mboard.middleware.slow_query_logger")
+
 if DEBUG:
     MIDDLEWARE += [
         "pyinstrument.middleware.ProfilerMiddleware",
@@ -99,6 +116,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "mboard.notifications.unread_count",
             ],
         },
     },
@@ -106,6 +124,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "ist.wsgi.application"
 
+# p: renders the top pages when the app is loaded, so that the first requests after a deploy are not slow.
+WARMUP_ON_START = bool(int(os.environ.get("WARMUP_ON_START", 0)))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -118,9 +139,41 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # p: each process keeps a pool of connections, see psycopg_pool.
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+                "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 4)),
+            },
+        },
     }
 }
 
+# p: read replicas, as comma separated hosts sharing the primary credentials. read only views
+# p: read from replicas lagging less than `REPLICA_MAX_LAG` seconds, checked every `REPLICA_LAG_CHECK`.
+# p: clients read from the primary for `REPLICA_STICKY_SECONDS` after writing. see `ist/routers.py`.
+DB_REPLICA_HOSTS = [host for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host]
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 2))
+REPLICA_LAG_CHECK = 5
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+# p: replicas are connected to within requests, by the lag check too. an unreachable one must fail fast rather
+# p: than wait the pool default of 30 seconds, it is then skipped until the next check.
+REPLICA_TIMEOUT = int(os.environ.get("REPLICA_TIMEOUT", 1))
+
+for i, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f"replica{i}"] = DATABASES["default"] | {
+        "HOST": host,
+        "OPTIONS": {
+            "pool": DATABASES["default"]["OPTIONS"]["pool"] | {"timeout": REPLICA_TIMEOUT},
+            "connect_timeout": REPLICA_TIMEOUT,
+        },
+        "TEST": {"MIRROR": "default"},
+    }
+
+if DB_REPLICA_HOSTS:
+    DATABASE_ROUTERS = ["ist.routers.ReplicaRouter"]
+    MIDDLEWARE.append("mboard.middleware.primary_after_write")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -162,10 +215,33 @@ STATIC_URL = "static/static/"
 if not DEBUG:
     STATIC_ROOT = "/vol/web/static"
 
+# p: collectstatic writes hashed names, which can be cached forever, and their compressed variants.
+# p: see `ist/storage.py` and the proxy configuration.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "ist.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# p: tests render pages without running collectstatic first, from the files as they are.
+if "test" in sys.argv[1:2]:
+    STORAGES["staticfiles"]["BACKEND"] = "django.contrib.staticfiles.storage.StaticFilesStorage"
+
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# p: sitemaps are prebuilt by the job workers and served by the proxy, see `mboard/sitemaps.py`.
+# p: their urls are absolute, `SITE_URL` is where the site is served.
+SITE_URL = os.environ.get("SITE_URL", "http://localhost:8000")
+SITEMAP_ROOT = BASE_DIR / "sitemaps"
+
+if not DEBUG:
+    SITEMAP_ROOT = "/vol/web/sitemaps"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -174,8 +250,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # p: redirect to home URL after login (default redirects to /accounts/profile/)
 LOGIN_REDIRECT_URL = "/"
 
-# p: this will redirect emails to the console.
-EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+# p: emails are sent by the job workers, with the queued backend. this will redirect them to the console.
+EMAIL_BACKEND = "mboard.mail.QueuedEmailBackend"
+QUEUED_EMAIL_BACKEND = os.environ.get("QUEUED_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
 
 # p: custom user model
 AUTH_USER_MODEL = "accounts.CustomUser"
@@ -197,3 +274,9 @@ CACHES = {
         "LOCATION": f"redis://:{CACHE_PASS}@{CACHE_HOST}",
     }
 }
+
+# p: sessions are read from redis and written through to the `django_session` table, and users are loaded from
+# p: the cache too, see `accounts/backends.py`. together they take two queries off every authenticated request.
+# p: the cache redis is not persisted, sessions it loses on a restart or an eviction are read back from the table.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+AUTHENTICATION_BACKENDS = ["accounts.backends.CachedModelBackend"]
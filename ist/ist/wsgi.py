@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from django.db import connections
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ist.settings")
 
 application = get_wsgi_application()
+
+if settings.WARMUP_ON_START:
+    from mboard.warmup import warm_up
+
+    warm_up()
+    # uWSGI loads the app once and forks its workers, which must not share the connections opened here.
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        connection.close_pool()
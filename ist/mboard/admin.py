@@ -2,6 +2,24 @@ from django.contrib import admin
 
 from .models import Comment
 from .models import Post
+from .moderation import set_pinned
 
-admin.site.register(Post)
+
+class PostAdmin(admin.ModelAdmin):
+    list_display = ["title", "user", "date", "pinned"]
+    list_filter = ["pinned", "board"]
+    actions = ["pin", "unpin"]
+
+    @admin.action(description="Pin selected posts")
+    def pin(self, request, queryset):
+        nchanged = set_pinned(list(queryset.values_list("id", flat=True)), pinned=True)
+        self.message_user(request, f"Pinned {nchanged} posts.")
+
+    @admin.action(description="Unpin selected posts")
+    def unpin(self, request, queryset):
+        nchanged = set_pinned(list(queryset.values_list("id", flat=True)), pinned=False)
+        self.message_user(request, f"Unpinned {nchanged} posts.")
+
+
+admin.site.register(Post, PostAdmin)
 admin.site.register(Comment)
@@ -0,0 +1,285 @@
+"""
+Read only JSON API, mirroring the HTML routes.
+
+Lists are paginated by keyset cursors: `next` links carry an opaque `cursor` made of the ordering values of the
+last row, so that deep pages cost as much as the first one and stay stable while posts are submitted.
+`?fields=a,b` selects the serialized fields, `?limit=n` the page size. Rows are serialized straight from `.values()`.
+Comment trees are nested `max_depth` levels deep, deeper replies have `"replies": null` and are found
+at the comment endpoint. Responses share the versions and validators of the HTML views.
+"""
+
+import base64
+import binascii
+from functools import partial
+from functools import wraps
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import BadRequest
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.http import Http404
+from django.http import HttpRequest
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from ist.routers import read_from_replica
+
+from .models import Comment
+from .models import Post
+from .settings import API_MAX_PAGE_SIZE
+from .settings import API_PAGE_SIZE
+from .settings import MAX_DEPTH
+from .versions import FEED_VERSION
+from .versions import POST_VERSION
+from .versions import conditional
+
+# serialized fields and the lookups they come from.
+POST_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "url": "url",
+    "domain": "domain",
+    "summary": "summary",
+    "authors": "authors",
+    "date": "date",
+    "edited": "edited",
+    "score": "score",
+    "nlikes": "nlikes",
+    "ncomments": "ncomments",
+    "pinned": "pinned",
+    "board_name": "board__name",
+    "user_id": "user_id",
+    "username": "user__username",
+    "deleted_at": "deleted_at",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "content": "content",
+    "date": "date",
+    "edited": "edited",
+    "nlikes": "nlikes",
+    "post_id": "post_id",
+    "parent_id": "parent_id",
+    "user_id": "user_id",
+    "username": "user__username",
+    "deleted_at": "deleted_at",
+}
+# fields left empty in tombstones of deleted posts and comments, which keep their place in threads.
+DELETED_POST_FIELDS = ["title", "url", "domain", "summary", "authors", "user_id", "username"]
+DELETED_COMMENT_FIELDS = ["content", "user_id", "username"]
+
+
+def _api(view):
+    """Serves GET requests only and reports errors as JSON."""
+
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        except Http404:
+            return JsonResponse({"error": "not found"}, status=404)
+
+    return require_GET(wrapper)
+
+
+def _fields(request: HttpRequest, available: dict[str, str], param: str = "fields") -> dict[str, str]:
+    if param not in request.GET:
+        return available
+    names = [name for name in request.GET[param].split(",") if name]
+    if unknown := [name for name in names if name not in available]:
+        raise BadRequest(f"unknown fields: {', '.join(unknown)}")
+    return {name: available[name] for name in names}
+
+
+def _limit(request: HttpRequest) -> int:
+    try:
+        limit = int(request.GET.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    if not 0 < limit <= API_MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {API_MAX_PAGE_SIZE}")
+    return limit
+
+
+def _values(rows: QuerySet, fields: dict[str, str], extra: list[str]) -> QuerySet:
+    """Selects the fields, plus the `extra` plain model fields the caller needs and drops before serializing."""
+    plain = [name for name, lookup in fields.items() if name == lookup]
+    aliased = {name: F(lookup) for name, lookup in fields.items() if name != lookup}
+    return rows.values(*plain, *[name for name in extra if name not in fields], **aliased)
+
+
+def _only(row: dict, fields: dict[str, str]) -> dict:
+    return {name: row[name] for name in fields}
+
+
+def _tombstone(row: dict, fields: dict[str, str], deleted: list[str]) -> dict:
+    """Serializes a row as `_only` does, emptying the `deleted` fields of deleted rows."""
+    serialized = _only(row, fields)
+    if row["deleted_at"] is not None:
+        serialized |= {name: None for name in deleted if name in fields}
+    return serialized
+
+
+def _encode_cursor(values: list) -> str:
+    # isoformat keeps microseconds, which the django encoder would truncate and break ties.
+    dumped = json.dumps(values, default=lambda value: value.isoformat())
+    return base64.urlsafe_b64encode(dumped.encode()).decode()
+
+
+def _decode_cursor(cursor: str, rows: QuerySet, keys: list[str]) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [rows.model._meta.get_field(key).to_python(value) for key, value in zip(keys, values)]
+    except (binascii.Error, ValueError, ValidationError):
+        raise BadRequest("invalid cursor")
+
+
+def _after(ordering: tuple[str, ...], values: list) -> Q:
+    """Filters the rows which come after `values` in `ordering`, the keyset equivalent of an offset."""
+    after = Q()
+    for order, value in reversed(list(zip(ordering, values))):
+        field = order.lstrip("-")
+        lookup = "lt" if order.startswith("-") else "gt"
+        beyond = Q(**{f"{field}__{lookup}": value})
+        after = beyond | (Q(**{field: value}) & after) if after else beyond
+    return after
+
+
+def _page(
+    request: HttpRequest,
+    rows: QuerySet,
+    ordering: tuple[str, ...],
+    fields: dict[str, str],
+    extra: tuple[str, ...] = (),
+) -> tuple[list[dict], str | None]:
+    """
+    Returns a page of rows, as dicts of the fields and of the `extra` model fields, and the link to the next page.
+    The ordering must end with a unique field, to break ties between rows.
+    """
+    keys = [order.lstrip("-") for order in ordering]
+    limit = _limit(request)
+    if cursor := request.GET.get("cursor"):
+        rows = rows.filter(_after(ordering, _decode_cursor(cursor, rows, keys)))
+    # one more row tells whether there is a next page.
+    page = list(_values(rows.order_by(*ordering), fields, [*keys, *extra])[: limit + 1])
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    query = request.GET.copy()
+    query["cursor"] = _encode_cursor([page[-1][key] for key in keys])
+    return page, f"{request.path}?{query.urlencode()}"
+
+
+def _comment_tree(top: list[dict], fields: dict[str, str], depth: int) -> list[dict]:
+    """Nests replies under the `top` comments down to `depth` levels, with one query per level."""
+    level = {row["id"]: _tombstone(row, fields, DELETED_COMMENT_FIELDS) | {"replies": []} for row in top}
+    tree = list(level.values())
+    for _ in range(depth):
+        if not level:
+            return tree
+        replies = Comment.objects.filter(parent_id__in=level).order_by("-date", "-id")
+        children = {}
+        for row in _values(replies, fields, ["id", "parent_id", "deleted_at"]):
+            children[row["id"]] = _tombstone(row, fields, DELETED_COMMENT_FIELDS) | {"replies": []}
+            level[row["parent_id"]]["replies"].append(children[row["id"]])
+        level = children
+    # replies of the deepest level are left to the comment endpoint.
+    deeper = Comment.objects.filter(parent_id__in=level).values_list("parent_id", flat=True).distinct()
+    for parent_id in deeper if level else ():
+        level[parent_id]["replies"] = None
+    return tree
+
+
+def _posts(request: HttpRequest, filter: dict, order_by: tuple[str, ...]) -> JsonResponse:
+    fields = _fields(request, POST_FIELDS)
+    posts = Post.objects.filter(deleted_at=None, **filter)
+    page, next_page = _page(request, posts, ("-pinned", *order_by, "-id"), fields)
+    return JsonResponse({"results": [_only(row, fields) for row in page], "next": next_page})
+
+
+def _feed(version: str, **kwargs):
+    """Returns a view listing posts as `_posts` does, answering conditional GETs from the feed version."""
+    return conditional(version)(read_from_replica(_api(partial(_posts, **kwargs))))
+
+
+index = _feed(FEED_VERSION.format(feed="all"), filter={}, order_by=("-score", "-date"))
+news = _feed(FEED_VERSION.format(feed="all"), filter={}, order_by=("-date",))
+papers = _feed(FEED_VERSION.format(feed="board:p"), filter={"board__name": "p"}, order_by=("-score", "-date"))
+code = _feed(FEED_VERSION.format(feed="board:c"), filter={"board__name": "c"}, order_by=("-score", "-date"))
+jobs = _feed(FEED_VERSION.format(feed="board:j"), filter={"board__name": "j"}, order_by=("-score", "-date"))
+
+
+@conditional(FEED_VERSION.format(feed="domain:{domain}"))
+@read_from_replica
+@_api
+def from_domain(request: HttpRequest, domain: str) -> JsonResponse:
+    return _posts(request, filter={"domain": domain}, order_by=("-date",))
+
+
+@conditional(POST_VERSION)
+@read_from_replica
+@_api
+def post_detail(request: HttpRequest, post_id: int) -> JsonResponse:
+    """Returns a post with a page of its comment trees. `?comment_fields=` selects the comment fields."""
+    fields = _fields(request, POST_FIELDS)
+    comment_fields = _fields(request, COMMENT_FIELDS, "comment_fields")
+    post = get_object_or_404(_values(Post.objects.all(), fields, ["deleted_at"]), pk=post_id)
+    comments = Comment.objects.filter(post_id=post_id, parent=None)
+    top, next_page = _page(request, comments, ("-date", "-id"), comment_fields, ("id", "deleted_at"))
+    return JsonResponse(
+        {
+            "post": _tombstone(post, fields, DELETED_POST_FIELDS),
+            "comments": _comment_tree(top, comment_fields, MAX_DEPTH),
+            "next": next_page,
+        }
+    )
+
+
+@read_from_replica
+@_api
+def comment_detail(request: HttpRequest, comment_id: int) -> JsonResponse:
+    fields = _fields(request, COMMENT_FIELDS)
+    comment = get_object_or_404(_values(Comment.objects.all(), fields, ["id", "deleted_at"]), pk=comment_id)
+    return JsonResponse({"comment": _comment_tree([comment], fields, MAX_DEPTH)[0]})
+
+
+@read_from_replica
+@_api
+def profile(request: HttpRequest, user_id: int) -> JsonResponse:
+    user = get_object_or_404(
+        get_user_model()
+        .objects.annotate(
+            post_count=Count("posts", filter=Q(posts__deleted_at=None), distinct=True),
+            comment_count=Count("comments", filter=Q(comments__deleted_at=None), distinct=True),
+        )
+        .values("id", "username", "last_login", "date_joined", "status", "post_count", "comment_count"),
+        pk=user_id,
+    )
+    return JsonResponse({"user": user})
+
+
+@conditional(FEED_VERSION.format(feed="user:{user_id}"))
+@read_from_replica
+@_api
+def profile_posts(request: HttpRequest, user_id: int) -> JsonResponse:
+    _ = get_object_or_404(get_user_model(), pk=user_id)
+    return _posts(request, filter={"user_id": user_id}, order_by=("-date",))
+
+
+@read_from_replica
+@_api
+def profile_comments(request: HttpRequest, user_id: int) -> JsonResponse:
+    _ = get_object_or_404(get_user_model(), pk=user_id)
+    fields = _fields(request, COMMENT_FIELDS)
+    comments = Comment.objects.filter(user_id=user_id, deleted_at=None)
+    page, next_page = _page(request, comments, ("-date", "-id"), fields)
+    return JsonResponse({"results": [_only(row, fields) for row in page], "next": next_page})
@@ -0,0 +1,99 @@
+"""
+Co-voting analysis, finding rings of users who vote for the same posts.
+
+Post votes are read by batches from a server side cursor into a sparse users by posts matrix. Multiplying the
+matrix by its transpose counts, for every pair of users at once, the posts both voted for. Pairs sharing enough
+votes, with a Jaccard similarity over the threshold, are linked, and the connected components of these links are
+the suspicious clusters. Posts with very many voters are left out, their votes tell little and they would fill
+the product with pairs. The analysis needs scipy, an optional dependency for the machines which run it.
+"""
+
+from datetime import datetime
+from itertools import islice
+
+from .models import PostVote
+from .settings import COVOTING_BATCH_SIZE
+from .settings import COVOTING_MAX_VOTERS
+from .settings import COVOTING_MIN_SHARED
+from .settings import COVOTING_MIN_SIMILARITY
+
+try:
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse import csgraph
+except ImportError:
+    np = sparse = csgraph = None
+
+
+def vote_matrix(since: datetime | None = None, size: int = COVOTING_BATCH_SIZE):
+    """
+    Returns the users by posts matrix of the votes cast from `since`, in compressed sparse row format,
+    with the user ids of its rows.
+    """
+    votes = PostVote.objects.order_by("id")
+    if since is not None:
+        votes = votes.filter(created_at__gte=since)
+    rows = votes.values_list("customuser_id", "post_id").iterator(chunk_size=size)
+    chunks = []
+    while batch := list(islice(rows, size)):
+        chunks.append(np.array(batch, dtype=np.int64))
+    pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    # ids are mapped to consecutive indexes, the matrix is as large as the voters and voted posts only.
+    user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+    post_ids, posts = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (users, posts)), shape=(len(user_ids), len(post_ids))
+    )
+    return matrix, user_ids
+
+
+def similar_pairs(matrix, min_shared: int, min_similarity: float, max_voters: int):
+    """
+    Returns the row indexes of the pairs of users sharing at least `min_shared` votes, with a Jaccard similarity
+    of at least `min_similarity`, and their numbers of shared votes and similarities.
+    """
+    nvoters = np.asarray(matrix.sum(axis=0)).ravel()
+    matrix = matrix[:, np.flatnonzero(nvoters <= max_voters)]
+    nvotes = np.asarray(matrix.sum(axis=1)).ravel()
+    # users with fewer votes than needed cannot be in a pair.
+    active = np.flatnonzero(nvotes >= min_shared)
+    matrix, nvotes = matrix[active], nvotes[active]
+    shared = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+    keep = shared.data >= min_shared
+    first, second, shared = shared.row[keep], shared.col[keep], shared.data[keep]
+    similarity = shared / (nvotes[first] + nvotes[second] - shared)
+    keep = similarity >= min_similarity
+    return active[first[keep]], active[second[keep]], shared[keep], similarity[keep]
+
+
+def find_rings(
+    since: datetime | None = None,
+    min_shared: int = COVOTING_MIN_SHARED,
+    min_similarity: float = COVOTING_MIN_SIMILARITY,
+    max_voters: int = COVOTING_MAX_VOTERS,
+    size: int = COVOTING_BATCH_SIZE,
+) -> list[dict]:
+    """
+    Returns the clusters of users voting alike, largest first, with their user ids, number of linked pairs,
+    and the largest number of votes and highest similarity shared by a pair.
+    """
+    if sparse is None:
+        raise RuntimeError("The co-voting analysis requires scipy.")
+    matrix, user_ids = vote_matrix(since, size)
+    first, second, shared, similarity = similar_pairs(matrix, min_shared, min_similarity, max_voters)
+    n = len(user_ids)
+    links = sparse.coo_matrix((np.ones(len(first), dtype=np.int8), (first, second)), shape=(n, n))
+    _, labels = csgraph.connected_components(links, directed=False)
+    clusters = []
+    for label in np.unique(labels[first]):
+        members = np.flatnonzero(labels == label)
+        pairs = labels[first] == label
+        clusters.append(
+            {
+                "user_ids": user_ids[members].tolist(),
+                "pairs": int(pairs.sum()),
+                "shared": int(shared[pairs].max()),
+                "similarity": float(similarity[pairs].max()),
+            }
+        )
+    return sorted(clusters, key=lambda cluster: len(cluster["user_ids"]), reverse=True)
@@ -0,0 +1,137 @@
+"""
+Streaming exports of users, posts, comments and votes, as JSON lines or CSV.
+
+Rows are read from server side cursors by `.iterator()` and written as they come, so memory stays flat
+whatever the size of the tables. Exports are ordered by id: an incremental export starts after the last id of
+the previous one, or at a timestamp for the tables which have one. Email addresses are only exported on request,
+by the `export` command, never by the HTTP endpoint.
+"""
+
+import csv
+from datetime import datetime
+import json
+from typing import Iterator
+
+from django.apps import apps
+
+from .settings import EXPORT_FETCH_SIZE
+
+FORMATS = ["jsonl", "csv"]
+
+# table name to model label, exported columns and the lookups they come from, and timestamp field if any.
+TABLES = {
+    # passwords are left out, imported users have to reset theirs. emails are in `PRIVATE_COLUMNS`.
+    "users": (
+        "accounts.CustomUser",
+        {"id": "id", "username": "username", "date_joined": "date_joined", "status": "status"},
+        "date_joined",
+    ),
+    "posts": (
+        "mboard.Post",
+        {
+            "id": "id",
+            "title": "title",
+            "url": "url",
+            "domain": "domain",
+            "summary": "summary",
+            "authors": "authors",
+            "date": "date",
+            "edited": "edited",
+            "score": "score",
+            "nlikes": "nlikes",
+            "ncomments": "ncomments",
+            "pinned": "pinned",
+            "board": "board__name",
+            "user_id": "user_id",
+            "deleted_at": "deleted_at",
+        },
+        "date",
+    ),
+    "comments": (
+        "mboard.Comment",
+        {
+            "id": "id",
+            "post_id": "post_id",
+            "parent_id": "parent_id",
+            "user_id": "user_id",
+            "content": "content",
+            "date": "date",
+            "edited": "edited",
+            "nlikes": "nlikes",
+            "deleted_at": "deleted_at",
+        },
+        "date",
+    ),
+    "post_votes": (
+        "mboard.PostVote",
+        {"id": "id", "post_id": "post_id", "user_id": "customuser_id", "created_at": "created_at"},
+        "created_at",
+    ),
+    "comment_votes": (
+        "mboard.CommentVote",
+        {"id": "id", "comment_id": "comment_id", "user_id": "customuser_id", "created_at": "created_at"},
+        "created_at",
+    ),
+}
+
+
+# personal data, exported with `private` only.
+PRIVATE_COLUMNS = {"users": {"email": "email"}}
+
+
+def _lookups(table: str, private: bool) -> dict[str, str]:
+    return TABLES[table][1] | (PRIVATE_COLUMNS.get(table, {}) if private else {})
+
+
+def columns(table: str, private: bool = False) -> list[str]:
+    return list(_lookups(table, private))
+
+
+def rows(
+    table: str, since: datetime | None = None, after_id: int | None = None, private: bool = False
+) -> Iterator[tuple]:
+    """
+    Returns an iterator over the rows of a table, ordered by id, from a server side cursor.
+    `since` keeps rows with a timestamp from then on, `after_id` rows with a greater id.
+    `private` adds the personal columns.
+    """
+    label, _, timestamp = TABLES[table]
+    lookups = _lookups(table, private)
+    queryset = apps.get_model(label).objects.order_by("id")
+    if since is not None:
+        if timestamp is None:
+            raise ValueError(f"{table} have no timestamp, export them after an id instead.")
+        queryset = queryset.filter(**{f"{timestamp}__gte": since})
+    if after_id is not None:
+        queryset = queryset.filter(id__gt=after_id)
+    return queryset.values_list(*lookups.values()).iterator(chunk_size=EXPORT_FETCH_SIZE)
+
+
+def _default(value):
+    # isoformat keeps microseconds, which the django encoder would truncate.
+    return value.isoformat()
+
+
+def jsonl_lines(columns: list[str], rows: Iterator[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=_default, ensure_ascii=False) + "\n"
+
+
+class _Echo:
+    """A file which returns what is written to it, for `csv.writer` to format lines one by one."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(columns: list[str], rows: Iterator[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def lines(table: str, format: str, since: datetime | None = None, after_id: int | None = None) -> Iterator[str]:
+    """Returns an iterator over the lines of an export of a table, in `format`."""
+    formatter = jsonl_lines if format == "jsonl" else csv_lines
+    return formatter(columns(table), rows(table, since, after_id))
@@ -0,0 +1,180 @@
+"""
+Atom and RSS feeds of the newest posts, of each board and of each keyword.
+
+Feed readers poll often and rarely find something new. Entries are kept in Redis lists, one per feed:
+new posts are pushed to the lists of their feeds after commit, edits and deletes drop the lists, which are
+then rebuilt from the database by the next poll. Polls are answered from the lists, or with 304 Not Modified
+from the feed versions without touching Redis lists nor the database.
+"""
+
+from datetime import datetime
+from functools import partial
+import json
+
+from django.apps import apps
+from django.contrib.syndication.views import Feed
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from redis import Redis
+
+from ist.routers import read_from_replica
+
+from .middleware import redis_default
+from .settings import FEED_CACHE_TIMEOUT
+from .settings import FEED_NENTRIES
+from .versions import bump
+from .versions import conditional
+
+# newest entries of a feed, newest first, as JSON.
+ENTRIES_KEY = "feeds:entries:{feed}"
+# feed versions, bumped when their entries change, not when their posts get votes.
+ENTRIES_VERSION = "version:syndication:{feed}"
+ENTRY_FIELDS = ["id", "title", "url", "domain", "summary", "authors", "date"]
+
+
+def post_feeds(post_id: int) -> list[str]:
+    """Returns the feeds listing a post."""
+    # models import this module, so we resolve the model lazily.
+    Post = apps.get_model("mboard", "Post")
+    feeds = ["all"]
+    if (board := Post.objects.values_list("board__name", flat=True).get(pk=post_id)) is not None:
+        feeds.append(f"board:{board}")
+    keywords = Post.keywords.through.objects.filter(post_id=post_id).values_list("keyword__name", flat=True)
+    return feeds + [f"keyword:{keyword}" for keyword in keywords]
+
+
+def _query(feed: str):
+    Post = apps.get_model("mboard", "Post")
+    kind, _, name = feed.partition(":")
+    posts = Post.objects.filter(deleted_at=None).order_by("-date", "-id")
+    if kind == "board":
+        posts = posts.filter(board__name=name)
+    elif kind == "keyword":
+        posts = posts.filter(keywords__name=name)
+    return posts.values(*ENTRY_FIELDS, username=F("user__username"))
+
+
+def _dump(entry: dict) -> str:
+    return json.dumps(entry, default=datetime.isoformat)
+
+
+def _load(dumped: bytes) -> dict:
+    entry = json.loads(dumped)
+    entry["date"] = datetime.fromisoformat(entry["date"])
+    return entry
+
+
+def entries(red: Redis, feed: str) -> list[dict]:
+    """Returns the newest entries of a feed, rebuilding its list from the database if missing."""
+    key = ENTRIES_KEY.format(feed=feed)
+    if dumped := red.lrange(key, 0, FEED_NENTRIES - 1):
+        return [_load(entry) for entry in dumped]
+    rows = list(_query(feed)[:FEED_NENTRIES])
+    if rows:
+        with red.pipeline() as pipe:
+            pipe.delete(key)
+            pipe.rpush(key, *[_dump(row) for row in rows])
+            pipe.expire(key, FEED_CACHE_TIMEOUT)
+            pipe.execute()
+    return rows
+
+
+def _push(red: Redis, post_id: int):
+    if (entry := _query("all").filter(pk=post_id).first()) is None:
+        # deleted meanwhile.
+        return
+    entry, feeds = _dump(entry), post_feeds(post_id)
+    with red.pipeline() as pipe:
+        for feed in feeds:
+            key = ENTRIES_KEY.format(feed=feed)
+            # missing lists are left to be rebuilt, pushing would make them hold only this entry.
+            pipe.lpushx(key, entry)
+            pipe.ltrim(key, 0, FEED_NENTRIES - 1)
+        pipe.execute()
+    bump(*[ENTRIES_VERSION.format(feed=feed) for feed in feeds])
+
+
+def publish(post_id: int):
+    """Adds a new post to its feeds, once the current transaction commits."""
+    transaction.on_commit(partial(_push, redis_default, post_id))
+
+
+def _drop(red: Redis, feeds: list[str]):
+    red.delete(*[ENTRIES_KEY.format(feed=feed) for feed in feeds])
+    bump(*[ENTRIES_VERSION.format(feed=feed) for feed in feeds])
+
+
+def refresh(post_id: int):
+    """Drops the entries of the feeds listing a post, once the current transaction commits. Call before deleting."""
+    transaction.on_commit(partial(_drop, redis_default, post_feeds(post_id)))
+
+
+def refresh_all():
+    """Drops the entries of every feed, once the current transaction commits. For bulk changes."""
+    Board, Keyword = apps.get_model("mboard", "Board"), apps.get_model("mboard", "Keyword")
+    feeds = [
+        "all",
+        *[f"board:{name}" for name in Board.Boards.values],
+        *[f"keyword:{name}" for name in Keyword.Keywords.values],
+    ]
+    transaction.on_commit(partial(_drop, redis_default, feeds))
+
+
+def feed_label(feed: str) -> str:
+    Board, Keyword = apps.get_model("mboard", "Board"), apps.get_model("mboard", "Keyword")
+    kind, _, name = feed.partition(":")
+    if kind == "board":
+        return Board.Boards(name).label
+    if kind == "keyword":
+        return Keyword.Keywords(name).label
+    return "newest"
+
+
+class PostsFeed(Feed):
+    """RSS feed of the newest posts of a feed: `all`, `board:<name>` or `keyword:<name>`."""
+
+    def get_object(self, request, feed: str) -> str:
+        return feed
+
+    def title(self, feed: str) -> str:
+        return f"Internet Space Telescope: {feed_label(feed)}"
+
+    def link(self, feed: str) -> str:
+        if feed.startswith("board:"):
+            return reverse(f"mboard:{feed_label(feed)}")
+        return reverse("mboard:news")
+
+    def description(self, feed: str) -> str:
+        return f"Newest posts in {feed_label(feed)}."
+
+    def items(self, feed: str) -> list[dict]:
+        return entries(redis_default, feed)
+
+    def item_title(self, entry: dict) -> str:
+        return entry["title"]
+
+    def item_link(self, entry: dict) -> str:
+        return reverse("mboard:post_detail", args=(entry["id"],))
+
+    def item_description(self, entry: dict) -> str:
+        return entry["summary"] or entry["url"]
+
+    def item_author_name(self, entry: dict) -> str:
+        return entry["username"]
+
+    def item_pubdate(self, entry: dict) -> datetime:
+        return entry["date"]
+
+    def item_categories(self, entry: dict) -> list[str]:
+        return [entry["domain"]]
+
+
+class AtomPostsFeed(PostsFeed):
+    feed_type = Atom1Feed
+    subtitle = PostsFeed.description
+
+
+rss = conditional(ENTRIES_VERSION)(read_from_replica(PostsFeed()))
+atom = conditional(ENTRIES_VERSION)(read_from_replica(AtomPostsFeed()))
@@ -0,0 +1,170 @@
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from difflib import SequenceMatcher
+from hashlib import sha1
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db import models
+
+from .jobs import periodic
+
+# history tables are range partitioned by month on `pgh_created_at`, see migration 0002.
+PARTITION_NAME = "{table}_p{month:%Y%m}"
+# revisions never change, so diffs between two of them can be cached for long.
+# we key them by content, which stays valid even after revisions are compacted.
+DIFF_CACHE_KEY = "history:diff:{digest}"
+DIFF_CACHE_TIMEOUT = timedelta(days=30).total_seconds()
+
+
+def _add_months(month: date, n: int) -> date:
+    months = month.year * 12 + month.month - 1 + n
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partitions(model: type[models.Model]) -> list[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+            [model._meta.db_table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_partitions(model: type[models.Model], start: date, months: int) -> tuple[list[str], list[str]]:
+    """
+    Creates monthly partitions for `months` months from `start`.
+    Months which already have rows in the default partition are skipped, since attaching them would
+    require scanning and moving rows under lock. Returns the names of created and skipped partitions.
+    """
+    table = model._meta.db_table
+    existing = set(partitions(model))
+    created, skipped = [], []
+    month = start.replace(day=1)
+    with connection.cursor() as cursor:
+        for _ in range(months):
+            name = PARTITION_NAME.format(table=table, month=month)
+            next_month = _add_months(month, 1)
+            if name not in existing:
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE pgh_created_at >= %s AND pgh_created_at < %s)",
+                    [month, next_month],
+                )
+                if cursor.fetchone()[0]:
+                    skipped.append(name)
+                else:
+                    cursor.execute(
+                        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                        [month, next_month],
+                    )
+                    created.append(name)
+            month = next_month
+    return created, skipped
+
+
+def drop_partitions(model: type[models.Model], before: datetime) -> list[str]:
+    """Drops the monthly partitions holding only events older than `before`. Returns their names."""
+    table = model._meta.db_table
+    dropped = []
+    with connection.cursor() as cursor:
+        for name in partitions(model):
+            try:
+                month = datetime.strptime(name.removeprefix(f"{table}_p"), "%Y%m").date()
+            except ValueError:
+                # the default partition
+                continue
+            if _add_months(month, 1) <= before.date():
+                cursor.execute(f"DROP TABLE {name}")
+                dropped.append(name)
+    return dropped
+
+
+def compact(model: type[models.Model], before: datetime, batch_size: int) -> int:
+    """
+    Collapses revisions older than `before`, keeping only the oldest revision of each object.
+    Deletes in batches so that each statement holds its locks briefly. Returns the number of deleted revisions.
+    """
+    table = model._meta.db_table
+    deleted = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                f"""
+                DELETE FROM {table} WHERE (pgh_id, pgh_created_at) IN (
+                    SELECT e.pgh_id, e.pgh_created_at FROM {table} e
+                    WHERE e.pgh_created_at < %(before)s AND EXISTS (
+                        SELECT 1 FROM {table} o
+                        WHERE o.pgh_obj_id = e.pgh_obj_id
+                        AND (o.pgh_created_at, o.pgh_id) < (e.pgh_created_at, e.pgh_id)
+                    )
+                    LIMIT %(batch_size)s
+                )
+                """,
+                {"before": before, "batch_size": batch_size},
+            )
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+
+
+@periodic(timedelta(days=1))
+def compact_history():
+    """Runs the history maintenance command with its defaults, daily on the job workers."""
+    call_command("compacthistory")
+
+
+def line_diff(old: str, new: str) -> list[tuple[str, str]]:
+    """Returns a line diff as a list of (operation, line) pairs, with operation one of " ", "-" and "+"."""
+    old_lines, new_lines = old.splitlines(), new.splitlines()
+    diff = []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        if op == "equal":
+            diff += [(" ", line) for line in old_lines[i1:i2]]
+        else:
+            diff += [("-", line) for line in old_lines[i1:i2]]
+            diff += [("+", line) for line in new_lines[j1:j2]]
+    return diff
+
+
+def revisions(
+    model: type[models.Model],
+    obj: models.Model,
+    field: str,
+    cursor: int | None,
+    size: int,
+) -> tuple[list[dict], int | None]:
+    """
+    Returns a page of `size` revisions of a tracked object, newest first, and the cursor to the next page.
+    Each revision comes with the diff of `field` against the revision which followed it, or against the
+    current object for the newest one. The cursor is the event id of the last revision of the page.
+    """
+    events = model.objects.filter(pgh_obj=obj).order_by("-pgh_id").values("pgh_id", "pgh_created_at", field)
+    current = {"pgh_id": "current", field: getattr(obj, field)}
+    if cursor is None:
+        rows = list(events[: size + 1])
+        newer = current
+    else:
+        # the cursor event was shown on the previous page, it is only needed here to diff against.
+        rows = list(events.filter(pgh_id__lte=cursor)[: size + 2])
+        if rows and rows[0]["pgh_id"] == cursor:
+            newer = rows.pop(0)
+        else:
+            newer = events.filter(pgh_id__gt=cursor).order_by("pgh_id").first() or current
+
+    more = len(rows) > size
+    rows = rows[:size]
+    pairs = []
+    for row in rows:
+        digest = sha1(f"{row[field]}\0{newer[field]}".encode()).hexdigest()
+        pairs.append((DIFF_CACHE_KEY.format(digest=digest), row, newer))
+        newer = row
+
+    diffs = cache.get_many([key for key, _, _ in pairs])
+    missing = {key: line_diff(old[field], new[field]) for key, old, new in pairs if key not in diffs}
+    if missing:
+        cache.set_many(missing, timeout=DIFF_CACHE_TIMEOUT)
+    diffs |= missing
+    page = [{"date": old["pgh_created_at"], "diff": diffs[key]} for key, old, _ in pairs]
+    return page, rows[-1]["pgh_id"] if more else None
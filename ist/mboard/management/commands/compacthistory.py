@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mboard.history import compact
+from mboard.history import create_partitions
+from mboard.history import drop_partitions
+from mboard.models import CommentHistory
+from mboard.models import PostHistory
+
+
+class Command(BaseCommand):
+    help = "Creates upcoming history partitions, collapses old revisions and drops expired partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3, help="Number of monthly partitions to create")
+        parser.add_argument(
+            "--compact-after",
+            type=int,
+            default=90,
+            help="Age in days after which revisions are collapsed into the original",
+        )
+        parser.add_argument(
+            "--drop-after",
+            type=int,
+            default=None,
+            help="Age in days after which whole monthly partitions are dropped. Disabled by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1_000, help="Number of revisions deleted per statement")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for model in (PostHistory, CommentHistory):
+            created, skipped = create_partitions(model, now.date(), options["months_ahead"] + 1)
+            for name in created:
+                self.stdout.write(f"Created partition {name}.")
+            for name in skipped:
+                self.stderr.write(f"Skipped partition {name}, the default partition has rows in its range.")
+
+            ncompacted = compact(model, now - timedelta(days=options["compact_after"]), options["batch_size"])
+            self.stdout.write(f"Collapsed {ncompacted} {model._meta.verbose_name} revisions.")
+
+            if options["drop_after"] is not None:
+                for name in drop_partitions(model, now - timedelta(days=options["drop_after"])):
+                    self.stdout.write(f"Dropped partition {name}.")
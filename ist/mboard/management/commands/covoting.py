@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.dateparse import parse_datetime
+
+from mboard.covoting import find_rings
+from mboard.covoting import sparse
+from mboard.settings import COVOTING_MAX_VOTERS
+from mboard.settings import COVOTING_MIN_SHARED
+from mboard.settings import COVOTING_MIN_SIMILARITY
+
+
+class Command(BaseCommand):
+    help = "Finds clusters of users voting for the same posts, and reports them to the moderators"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", type=str, default=None, help="Only analyse votes from this ISO timestamp")
+        parser.add_argument(
+            "--min-shared", type=int, default=COVOTING_MIN_SHARED, help="Votes a pair of users must share"
+        )
+        parser.add_argument(
+            "--min-similarity",
+            type=float,
+            default=COVOTING_MIN_SIMILARITY,
+            help="Jaccard similarity of the votes of a pair of users, from 0 to 1",
+        )
+        parser.add_argument(
+            "--max-voters", type=int, default=COVOTING_MAX_VOTERS, help="Posts with more voters are left out"
+        )
+        parser.add_argument("--mail", action="store_true", help="Mail the report to the admins and moderators")
+
+    def handle(self, *args, **options):
+        if sparse is None:
+            raise CommandError("The co-voting analysis requires scipy, install the analysis extra.")
+        since = None
+        if options["since"] is not None and (since := parse_datetime(options["since"])) is None:
+            raise CommandError(f"Invalid timestamp {options['since']}.")
+        clusters = find_rings(
+            since,
+            min_shared=options["min_shared"],
+            min_similarity=options["min_similarity"],
+            max_voters=options["max_voters"],
+        )
+        if not clusters:
+            self.stdout.write("No suspicious clusters.")
+            return
+
+        User = get_user_model()
+        usernames = dict(
+            User.objects.filter(id__in=[i for c in clusters for i in c["user_ids"]]).values_list("id", "username")
+        )
+        lines = [
+            f"{len(c['user_ids'])} users ({', '.join(usernames[i] for i in c['user_ids'])}): {c['pairs']} pairs,"
+            f" up to {c['shared']} shared votes, similarity {c['similarity']:.2f}."
+            for c in clusters
+        ]
+        self.stdout.write("\n".join(lines))
+        if options["mail"]:
+            moderators = User.objects.filter(status__in=[User.Status.ADMIN, User.Status.MODERATOR]).exclude(email="")
+            emails = list(moderators.values_list("email", flat=True))
+            send_mail(f"{len(clusters)} suspicious voting clusters", "\n".join(lines), None, emails)
+            self.stderr.write(f"Mailed to {len(emails)} moderators.")
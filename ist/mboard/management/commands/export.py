@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.dateparse import parse_datetime
+
+from mboard.export import FORMATS
+from mboard.export import TABLES
+from mboard.export import columns
+from mboard.export import csv_lines
+from mboard.export import jsonl_lines
+from mboard.export import rows
+
+
+class Command(BaseCommand):
+    help = "Streams a table to a JSON lines or CSV file, in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=list(TABLES), help="Table to export")
+        parser.add_argument("--format", choices=FORMATS, default="jsonl", help="Output format")
+        parser.add_argument("--since", type=str, default=None, help="Only export rows from this ISO timestamp")
+        parser.add_argument("--after-id", type=int, default=None, help="Only export rows after this id")
+        parser.add_argument(
+            "--private", action="store_true", help="Include personal data, as user emails. Handle with care"
+        )
+        parser.add_argument("--output", type=str, default=None, help="Output file, standard output by default")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"] is not None and (since := parse_datetime(options["since"])) is None:
+            raise CommandError(f"Invalid timestamp {options['since']}.")
+        try:
+            table_rows = rows(options["table"], since, options["after_id"], options["private"])
+        except ValueError as e:
+            raise CommandError(e)
+
+        nrows, last_id = 0, options["after_id"]
+
+        def counted():
+            nonlocal nrows, last_id
+            for row in table_rows:
+                nrows, last_id = nrows + 1, row[0]
+                yield row
+
+        formatter = jsonl_lines if options["format"] == "jsonl" else csv_lines
+        lines = formatter(columns(options["table"], options["private"]), counted())
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending="")
+        # standard output is kept for the data. the last id starts the next incremental export.
+        self.stderr.write(f"Exported {nrows} {options['table']}, last id {last_id}.")
@@ -0,0 +1,25 @@
+from pathlib import Path
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from mboard.imports import import_jsonl
+
+
+class Command(BaseCommand):
+    help = "Imports users, posts, comments and votes from the JSON lines files of a directory, as exported"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=Path, help="Directory of users.jsonl, posts.jsonl, ... files")
+
+    def handle(self, *args, **options):
+        if not options["directory"].is_dir():
+            raise CommandError(f"{options['directory']} is not a directory.")
+        start = time.perf_counter()
+        counts = import_jsonl(options["directory"])
+        duration = time.perf_counter() - start
+        for table, (nread, nimported) in counts.items():
+            self.stdout.write(f"{table}: imported {nimported} of {nread} rows.")
+        nrows = sum(nread for nread, _ in counts.values())
+        self.stdout.write(f"Read {nrows} rows in {duration:.1f}s, {nrows / max(duration, 1e-9):.0f} rows/s.")
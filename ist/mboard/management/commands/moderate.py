@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.utils.dateparse import parse_datetime
+
+from mboard.moderation import ban
+from mboard.moderation import remove_content
+from mboard.moderation import set_pinned
+
+
+class Command(BaseCommand):
+    help = "Bans and purges users, removes their content in a time window, or pins and unpins posts, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["ban", "remove", "pin", "unpin"], help="Moderation action")
+        parser.add_argument("targets", nargs="+", help="Usernames to ban or remove content of, post ids to (un)pin")
+        parser.add_argument("--keep-content", action="store_true", help="Ban without removing content and votes")
+        parser.add_argument("--since", type=str, default=None, help="Only remove content from this ISO timestamp")
+        parser.add_argument("--until", type=str, default=None, help="Only remove content before this ISO timestamp")
+
+    def handle(self, *args, **options):
+        action, targets = options["action"], options["targets"]
+        if action in ("pin", "unpin"):
+            try:
+                post_ids = [int(target) for target in targets]
+            except ValueError:
+                raise CommandError("Posts are given by id.")
+            nchanged = set_pinned(post_ids, pinned=action == "pin")
+            self.stdout.write(f"{'Pinned' if action == 'pin' else 'Unpinned'} {nchanged} posts.")
+            return
+
+        users = dict(get_user_model().objects.filter(username__in=targets).values_list("username", "id"))
+        if missing := set(targets) - users.keys():
+            raise CommandError(f"Unknown users {', '.join(sorted(missing))}.")
+        if action == "ban":
+            counts = ban(list(users.values()), purge=not options["keep_content"])
+        else:
+            window = {bound: options[bound] for bound in ("since", "until") if options[bound] is not None}
+            for bound, value in window.items():
+                window[bound] = parse_datetime(value)
+                if window[bound] is None:
+                    raise CommandError(f"Invalid timestamp {value}.")
+            counts = remove_content(list(users.values()), **window)
+        self.stdout.write(", ".join(f"{count} {name}" for name, count in counts.items()) + ".")
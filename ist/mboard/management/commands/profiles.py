@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from mboard.middleware import redis_default
+from mboard.profiling import load_profile
+from mboard.profiling import load_records
+from mboard.profiling import summarize
+
+
+class Command(BaseCommand):
+    help = "Summarizes the slowest views recorded by the sampling profiler"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10, help="Number of views to list")
+        parser.add_argument(
+            "--export",
+            type=Path,
+            default=None,
+            help="Directory where to write the worst profile of each listed view, in speedscope format",
+        )
+
+    def handle(self, *args, **options):
+        summaries = summarize(load_records(redis_default))[: options["limit"]]
+        if not summaries:
+            self.stdout.write("No profiles recorded.")
+            return
+
+        self.stdout.write(f"{'view':<32} {'count':>6} {'median':>8} {'p95':>8} {'max':>8} {'peak mem':>10}")
+        for s in summaries:
+            peak_memory = f"{s['peak_memory'] / 2**20:.1f}MB" if s["peak_memory"] is not None else "-"
+            self.stdout.write(
+                f"{s['view']:<32} {s['count']:>6} "
+                f"{s['median']:>7.3f}s {s['p95']:>7.3f}s {s['max']:>7.3f}s {peak_memory:>10}"
+            )
+
+        if options["export"] is None:
+            return
+        options["export"].mkdir(parents=True, exist_ok=True)
+        for s in summaries:
+            profile = load_profile(redis_default, s["worst"])
+            if profile is None:
+                continue
+            path = options["export"] / f"{s['view'].replace(':', '_')}-{s['worst']}.speedscope.json"
+            path.write_text(profile)
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,43 @@
+from importlib import import_module
+import os
+import socket
+from threading import Thread
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mboard import settings
+from mboard.jobs import JOBS
+from mboard.jobs import PERIODIC_JOBS
+from mboard.jobs import heartbeat
+from mboard.jobs import keep_alive
+from mboard.jobs import requeue_stale
+from mboard.jobs import work
+from mboard.middleware import redis_default
+
+
+class Command(BaseCommand):
+    help = "Runs a worker executing background jobs, periodic jobs included"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout", type=int, default=1, help="Seconds to wait for a job before checking schedules"
+        )
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after running this many jobs")
+
+    def handle(self, *args, **options):
+        for module in settings.JOB_MODULES:
+            import_module(module)
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.stdout.write(f"Worker {worker_id} running {len(JOBS)} jobs, {len(PERIODIC_JOBS)} periodic.")
+        heartbeat(redis_default, worker_id)
+        Thread(target=keep_alive, args=(redis_default, worker_id), daemon=True).start()
+        # jobs of workers killed while running them. those dying later are requeued by `requeue_stale_jobs`.
+        requeue_stale(redis_default)
+
+        njobs = 0
+        while options["max_jobs"] is None or njobs < options["max_jobs"]:
+            # a worker lives long, we apply the same connection hygiene django applies around requests.
+            close_old_connections()
+            njobs += work(redis_default, worker_id, options["timeout"])
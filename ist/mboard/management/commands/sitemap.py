@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mboard.sitemaps import update
+
+
+class Command(BaseCommand):
+    help = "Writes the sitemaps of the posts which changed since the last run, and the sitemap index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Check every chunk, dropping deleted posts")
+        parser.add_argument("--root", type=Path, default=None, help="Directory of the sitemaps")
+
+    def handle(self, *args, **options):
+        root = options["root"] or Path(settings.SITEMAP_ROOT)
+        written = update(root, full=options["full"])
+        self.stdout.write(f"Wrote {len(written)} sitemap chunks to {root}.")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from mboard.middleware import redis_default
+from mboard.slowqueries import load_slow_queries
+
+
+class Command(BaseCommand):
+    help = "Lists the slowest queries recorded by the slow query logger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10, help="Number of queries to list")
+        parser.add_argument("--view", type=str, default=None, help="Only list queries originating from this view")
+        parser.add_argument("--plans", action="store_true", help="Print captured EXPLAIN ANALYZE plans")
+
+    def handle(self, *args, **options):
+        records = load_slow_queries(redis_default)
+        if options["view"] is not None:
+            records = [r for r in records if r["view"] == options["view"]]
+
+        # the same statement is usually hit many times, we group by view and sql and keep the slowest.
+        groups = {}
+        for record in records:
+            key = (record["view"], record["sql"])
+            count = groups[key]["count"] + 1 if key in groups else 1
+            if key not in groups or record["duration"] > groups[key]["duration"]:
+                groups[key] = record | {"plan": record["plan"] or groups.get(key, {}).get("plan")}
+            groups[key]["count"] = count
+
+        worst = sorted(groups.values(), key=lambda r: r["duration"], reverse=True)[: options["limit"]]
+        if not worst:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        for record in worst:
+            self.stdout.write(
+                # records saved before the database was recorded ran on the primary.
+                f"{record['duration']:.3f}s (x{record['count']}) in {record['view']}"
+                f" on {record.get('database', 'default')} [{record['template'] or 'no template'}]"
+            )
+            self.stdout.write(f"    {record['sql']}")
+            if options["plans"] and record["plan"]:
+                for line in record["plan"].splitlines():
+                    self.stdout.write(f"    | {line}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mboard.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Renders the top pages, filling the caches they use, and reports how long each took"
+
+    def handle(self, *args, **options):
+        for url, (status, duration) in warm_up().items():
+            self.stdout.write(f"{status} {duration * 1000:.0f}ms {url}")
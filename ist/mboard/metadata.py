@@ -0,0 +1,209 @@
+from hashlib import sha1
+from html.parser import HTMLParser
+from http.client import HTTPConnection
+from http.client import HTTPSConnection
+import ipaddress
+import socket
+import time
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.parse import quote
+from urllib.parse import urlsplit
+from urllib.request import HTTPHandler
+from urllib.request import HTTPRedirectHandler
+from urllib.request import HTTPSHandler
+from urllib.request import ProxyHandler
+from urllib.request import Request
+from urllib.request import build_opener
+from xml.etree import ElementTree
+
+from django.apps import apps
+from django.core.cache import cache
+
+from . import settings
+from .feeds import refresh
+from .jobs import job
+from .links import arxiv_id
+from .versions import POST_VERSION
+from .versions import bump
+
+RESPONSE_CACHE_KEY = "metadata:response:{}"
+USER_AGENT = "ist-metadata-fetcher/0.1 (+https://github.com/peppedilillo/ist)"
+ATOM = "{http://www.w3.org/2005/Atom}"
+SCHEMES = ("http", "https")
+
+
+class Refused(URLError):
+    """Raised for URLs we do not fetch: other schemes than http and https, and hosts on non public addresses."""
+
+
+def _global(address: str) -> bool:
+    """Whether an address is a public one, rather than private, loopback, link-local, reserved or multicast."""
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check(url: str):
+    """Refuses an URL unless it is http or https, to a host whose addresses are all public."""
+    parts = urlsplit(url)
+    if parts.scheme not in SCHEMES or not parts.hostname:
+        raise Refused(f"refused scheme of {url}")
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or None)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise Refused(f"cannot resolve {parts.hostname}")
+    if not all(_global(address) for address in addresses):
+        raise Refused(f"refused address of {parts.hostname}")
+
+
+def _connected(connection: HTTPConnection):
+    # the host may resolve differently than when it was checked, the address we reached is checked again.
+    if not _global(connection.sock.getpeername()[0]):
+        connection.close()
+        raise Refused(f"refused address of {connection.host}")
+
+
+class _CheckedHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _connected(self)
+
+
+class _CheckedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _connected(self)
+
+
+class _CheckedHTTPHandler(HTTPHandler):
+    def http_open(self, request):
+        return self.do_open(_CheckedHTTPConnection, request)
+
+
+class _CheckedHTTPSHandler(HTTPSHandler):
+    def https_open(self, request):
+        return self.do_open(_CheckedHTTPSConnection, request, context=self._context)
+
+
+class _CheckedRedirectHandler(HTTPRedirectHandler):
+    def redirect_request(self, request, fp, code, msg, headers, newurl):
+        check(newurl)
+        return super().redirect_request(request, fp, code, msg, headers, newurl)
+
+
+# links are submitted by users, they must not reach the services next to the workers: every url, redirects
+# included, is checked before connecting and every connection after. proxies from the environment are ignored,
+# they would be the address we check.
+_opener = build_opener(ProxyHandler({}), _CheckedHTTPHandler, _CheckedHTTPSHandler, _CheckedRedirectHandler)
+
+
+def fetch(url: str) -> bytes | None:
+    """
+    Gets an URL, retrying on network errors and server errors.
+    Responses are cached, so that the same link submitted twice is fetched once.
+    URLs to other schemes than http and https, or to non public addresses, are not fetched.
+    """
+    key = RESPONSE_CACHE_KEY.format(sha1(url.encode()).hexdigest())
+    if (body := cache.get(key)) is not None:
+        return body
+
+    request = Request(url, headers={"User-Agent": USER_AGENT})
+    for attempt in range(settings.METADATA_RETRIES + 1):
+        try:
+            check(url)
+            with _opener.open(request, timeout=settings.METADATA_TIMEOUT) as response:
+                body = response.read(settings.METADATA_MAX_BYTES)
+            cache.set(key, body, timeout=settings.METADATA_CACHE_TIMEOUT)
+            return body
+        except HTTPError as e:
+            # client errors will not go away by trying again.
+            if e.code < 500 and e.code != 429:
+                return None
+        except URLError as e:
+            # refused connections come wrapped by urllib.
+            if isinstance(e, Refused) or isinstance(e.reason, Refused):
+                return None
+        except TimeoutError:
+            pass
+        time.sleep(settings.METADATA_BACKOFF * 2**attempt)
+    return None
+
+
+def arxiv_metadata(identifier: str) -> dict | None:
+    body = fetch(settings.ARXIV_API_URL.format(quote(identifier)))
+    if body is None:
+        return None
+    try:
+        entry = ElementTree.fromstring(body).find(f"{ATOM}entry")
+    except ElementTree.ParseError:
+        return None
+    if entry is None:
+        return None
+    return {
+        "summary": " ".join((entry.findtext(f"{ATOM}summary") or "").split()),
+        "authors": [a.findtext(f"{ATOM}name") for a in entry.findall(f"{ATOM}author")],
+    }
+
+
+class _MetaParser(HTMLParser):
+    """Collects the content of <meta> tags, by name or property, up to the end of <head>."""
+
+    def __init__(self):
+        super().__init__()
+        self.meta = {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "meta" or self.done:
+            return
+        attrs = dict(attrs)
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        if name and attrs.get("content"):
+            self.meta.setdefault(name, []).append(attrs["content"])
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def page_metadata(url: str) -> dict | None:
+    body = fetch(url)
+    if body is None:
+        return None
+    parser = _MetaParser()
+    parser.feed(body.decode("utf-8", errors="replace"))
+    meta = parser.meta
+    summary = next(
+        (meta[name][0] for name in ("citation_abstract", "og:description", "description") if name in meta),
+        "",
+    )
+    return {
+        "summary": " ".join(summary.split()),
+        "authors": meta.get("citation_author", []),
+    }
+
+
+def fetch_metadata(url: str) -> dict | None:
+    """Returns the summary and authors of the content behind an URL, if we can find them."""
+    if (identifier := arxiv_id(url)) is not None:
+        return arxiv_metadata(identifier)
+    return page_metadata(url)
+
+
+@job
+def enrich_post(post_id: int):
+    """Fills the summary and authors of a post from its link. Runs on the job workers, after submission."""
+    # models import this module, so we resolve the model lazily.
+    Post = apps.get_model("mboard", "Post")
+    url = Post.objects.values_list("url", flat=True).get(pk=post_id)
+    metadata = fetch_metadata(url)
+    if metadata is None:
+        return
+    Post.objects.filter(pk=post_id).update(
+        summary=metadata["summary"][: Post._meta.get_field("summary").max_length],
+        authors=", ".join(metadata["authors"])[: Post._meta.get_field("authors").max_length],
+    )
+    bump(POST_VERSION.format(post_id=post_id))
+    refresh(post_id)
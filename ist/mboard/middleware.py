@@ -1,16 +1,28 @@
+from contextlib import ExitStack
 from datetime import timedelta
+from random import randrange
+import tracemalloc
 
 from django.conf import settings
-from django.contrib.auth import get_user
+from django.db import connections
 from django.http import HttpRequest
 from django.http import HttpResponse
 from ipware import get_client_ip
+from pyinstrument import Profiler
 from redis import Redis
 
+from ist.routers import STICKY_COOKIE
+
+from .profiling import save_profile
+from .slowqueries import SlowQueryRecorder
+
 redis_default = Redis.from_url(url=settings.CACHES["default"]["LOCATION"])
 PERIOD = timedelta(seconds=1)
 AUTHENTICATED_LIMIT = 20
 ANONYMOUS_LIMIT = 10
+# sampling interval of the production profiler, in seconds. coarser than pyinstrument's
+# default to keep overhead low when every request is profiled against a latency threshold.
+PROFILER_INTERVAL = 0.005
 
 
 def get_request_identifier(request: HttpRequest) -> tuple[str, int]:
@@ -18,9 +30,10 @@ def get_request_identifier(request: HttpRequest) -> tuple[str, int]:
     Determines the identifier and rate limit for the request based on authentication status.
     Returns a tuple of (identifier, limit).
     """
-    user = get_user(request)
+    # the user loaded by the authentication middleware, from the cache, see `accounts.backends`.
+    user = request.user
 
-    if user and user.is_authenticated:
+    if user.is_authenticated:
         # Use username for authenticated users
         return f"user:{user.username}", AUTHENTICATED_LIMIT
 
@@ -61,3 +74,80 @@ def rate_limiter(get_response):
         return response
 
     return middleware
+
+
+def sampling_profiler(get_response):
+    """
+    Django middleware profiling one request every `PROFILER_SAMPLE_RATE` and any request
+    slower than `PROFILER_THRESHOLD_MS`. Sampled requests also record tracemalloc peak memory,
+    which is too expensive to trace on every request.
+    """
+    sample_rate = settings.PROFILER_SAMPLE_RATE
+    threshold = settings.PROFILER_THRESHOLD_MS / 1000
+
+    def middleware(request: HttpRequest) -> HttpResponse:
+        sampled = bool(sample_rate) and randrange(sample_rate) == 0
+        if not (sampled or threshold):
+            return get_response(request)
+
+        trace_memory = sampled and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        profiler = Profiler(interval=PROFILER_INTERVAL, async_mode="disabled")
+        profiler.start()
+        try:
+            response = get_response(request)
+        finally:
+            session = profiler.stop()
+            peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+        if sampled or session.duration > threshold:
+            match = request.resolver_match
+            save_profile(
+                redis_default,
+                view=match.view_name if match else "unresolved",
+                path=request.path,
+                session=session,
+                peak_memory=peak_memory,
+                sampled=sampled,
+            )
+        return response
+
+    return middleware
+
+
+def slow_query_logger(get_response):
+    """
+    Django middleware recording database queries slower than `SLOW_QUERY_THRESHOLD_MS`,
+    together with the view and template they originated from.
+    """
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+    explain_rate = settings.SLOW_QUERY_EXPLAIN_RATE
+
+    def middleware(request: HttpRequest) -> HttpResponse:
+        recorder = SlowQueryRecorder(redis_default, request, threshold, explain_rate)
+        # read only views query the replicas, every database is watched.
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return get_response(request)
+
+    return middleware
+
+
+def primary_after_write(get_response):
+    """
+    Django middleware pinning clients to the primary database for `REPLICA_STICKY_SECONDS`
+    after they write, so that they read their own writes while replicas catch up.
+    """
+    sticky_seconds = settings.REPLICA_STICKY_SECONDS
+
+    def middleware(request: HttpRequest) -> HttpResponse:
+        response = get_response(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+            response.set_cookie(STICKY_COOKIE, "1", max_age=sticky_seconds, httponly=True, samesite="Lax")
+        return response
+
+    return middleware
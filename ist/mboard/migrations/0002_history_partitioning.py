@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db import migrations
+from django.db import models
+
+HISTORY_TABLES = ["mboard_commenthistory", "mboard_posthistory"]
+
+
+def partition_sql(table: str) -> str:
+    """
+    Swaps a history table for a copy range partitioned by month on `pgh_created_at`.
+    Partitioned tables require the partition key in the primary key and do not support
+    identity columns, so `pgh_id` becomes part of a composite key fed by a plain sequence.
+    """
+    return f"""
+    ALTER TABLE {table} RENAME TO {table}_unpartitioned;
+    ALTER TABLE {table}_unpartitioned RENAME CONSTRAINT {table}_pkey TO {table}_unpartitioned_pkey;
+    ALTER SEQUENCE {table}_pgh_id_seq RENAME TO {table}_unpartitioned_pgh_id_seq;
+    CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (pgh_created_at);
+    ALTER TABLE {table} ADD PRIMARY KEY (pgh_id, pgh_created_at);
+    CREATE SEQUENCE {table}_pgh_id_seq OWNED BY {table}.pgh_id;
+    ALTER TABLE {table} ALTER COLUMN pgh_id SET DEFAULT nextval('{table}_pgh_id_seq');
+
+    DO $$
+    DECLARE
+        idx record;
+        month timestamptz;
+    BEGIN
+        -- keeps the indexes django created, under the same names.
+        FOR idx IN
+            SELECT indexname, indexdef FROM pg_indexes
+            WHERE tablename = '{table}_unpartitioned' AND indexname <> '{table}_unpartitioned_pkey'
+        LOOP
+            EXECUTE format('DROP INDEX %I', idx.indexname);
+            EXECUTE regexp_replace(idx.indexdef, ' ON \\S+ ', ' ON {table} ');
+        END LOOP;
+
+        FOR month IN
+            SELECT generate_series(
+                date_trunc('month', coalesce(min(pgh_created_at), now())),
+                date_trunc('month', now()) + interval '3 months',
+                interval '1 month'
+            ) FROM {table}_unpartitioned
+        LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                '{table}_p' || to_char(month, 'YYYYMM'),
+                month,
+                month + interval '1 month'
+            );
+        END LOOP;
+    END $$;
+    CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;
+
+    INSERT INTO {table} SELECT * FROM {table}_unpartitioned;
+    SELECT setval('{table}_pgh_id_seq', coalesce(max(pgh_id), 0) + 1, false) FROM {table};
+    DROP TABLE {table}_unpartitioned;
+    """
+
+
+def unpartition_sql(table: str) -> str:
+    return f"""
+    ALTER TABLE {table} RENAME TO {table}_partitioned;
+    ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey;
+    CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS INCLUDING INDEXES);
+    ALTER TABLE {table} DROP CONSTRAINT {table}_pkey;
+    ALTER TABLE {table} ADD PRIMARY KEY (pgh_id);
+    ALTER SEQUENCE {table}_pgh_id_seq OWNED BY {table}.pgh_id;
+    INSERT INTO {table} SELECT * FROM {table}_partitioned;
+    DROP TABLE {table}_partitioned CASCADE;
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mboard", "0001_initial"),
+        ("pghistory", "0006_delete_aggregateevent"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        *[
+            migrations.RunSQL(
+                sql=partition_sql(table),
+                reverse_sql=unpartition_sql(table),
+            )
+            for table in HISTORY_TABLES
+        ],
+        migrations.AddIndex(
+            model_name="commenthistory",
+            index=models.Index(fields=["pgh_obj", "pgh_created_at"], name="mboard_comm_pgh_obj_372d38_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="posthistory",
+            index=models.Index(fields=["pgh_obj", "pgh_created_at"], name="mboard_post_pgh_obj_9843e6_idx"),
+        ),
+    ]
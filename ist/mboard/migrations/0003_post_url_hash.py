@@ -0,0 +1,68 @@
+# Generated by Django 5.1 on 2026-10-19 16:05
+
+from django.db import migrations
+from django.db import models
+import pgtrigger.compiler
+import pgtrigger.migrations
+
+from mboard.links import url_hash
+
+
+def backfill_url_hash(apps, schema_editor):
+    """Hashes existing urls. Older duplicates keep the hash, newer ones are left without."""
+    Post = apps.get_model("mboard", "Post")
+    seen = set()
+    batch = []
+    for post in Post.objects.order_by("id").only("id", "url").iterator(chunk_size=2_000):
+        h = url_hash(post.url)
+        if h in seen:
+            continue
+        seen.add(h)
+        post.url_hash = h
+        batch.append(post)
+        if len(batch) == 2_000:
+            Post.objects.bulk_update(batch, ["url_hash"])
+            batch = []
+    Post.objects.bulk_update(batch, ["url_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mboard", "0002_history_partitioning"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="post",
+            name="title_changed_update",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="url_hash",
+            field=models.CharField(
+                editable=False, max_length=64, null=True, unique=True
+            ),
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="posthistory",
+            name="url_hash",
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="post",
+            trigger=pgtrigger.compiler.Trigger(
+                name="title_changed_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."title" IS DISTINCT FROM (NEW."title"))',
+                    func='INSERT INTO "mboard_posthistory" ("board_id", "date", "edited", "id", "ncomments", "nlikes", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pinned", "score", "title", "url", "url_hash", "user_id") VALUES (OLD."board_id", OLD."date", OLD."edited", OLD."id", OLD."ncomments", OLD."nlikes", _pgh_attach_context(), NOW(), \'title_changed\', OLD."id", OLD."pinned", OLD."score", OLD."title", OLD."url", OLD."url_hash", OLD."user_id"); RETURN NULL;',
+                    hash="90b4af8a6236be95f9d2d90ec79ab8f4d2b172a3",
+                    operation="UPDATE",
+                    pgid="pgtrigger_title_changed_update_6125d",
+                    table="mboard_post",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1 on 2026-10-19 16:07
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mboard", "0003_post_url_hash"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="post",
+            name="title_changed_update",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="domain",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=253
+            ),
+        ),
+        migrations.AddField(
+            model_name="posthistory",
+            name="domain",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=253
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["domain", "-date"], name="mboard_post_domain_a7e1de_idx"
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="post",
+            trigger=pgtrigger.compiler.Trigger(
+                name="title_changed_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."title" IS DISTINCT FROM (NEW."title"))',
+                    func='INSERT INTO "mboard_posthistory" ("board_id", "date", "domain", "edited", "id", "ncomments", "nlikes", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pinned", "score", "title", "url", "url_hash", "user_id") VALUES (OLD."board_id", OLD."date", OLD."domain", OLD."edited", OLD."id", OLD."ncomments", OLD."nlikes", _pgh_attach_context(), NOW(), \'title_changed\', OLD."id", OLD."pinned", OLD."score", OLD."title", OLD."url", OLD."url_hash", OLD."user_id"); RETURN NULL;',
+                    hash="58b01e3e3b901dfe8cfeb3d87520b8415fb8f689",
+                    operation="UPDATE",
+                    pgid="pgtrigger_title_changed_update_6125d",
+                    table="mboard_post",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
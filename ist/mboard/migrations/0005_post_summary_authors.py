@@ -0,0 +1,62 @@
+# Generated by Django 5.1 on 2026-10-19 16:13
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mboard", "0004_post_domain"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="post",
+            name="title_changed_update",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="authors",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=500
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="summary",
+            field=models.TextField(
+                blank=True, default="", editable=False, max_length=5000
+            ),
+        ),
+        migrations.AddField(
+            model_name="posthistory",
+            name="authors",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=500
+            ),
+        ),
+        migrations.AddField(
+            model_name="posthistory",
+            name="summary",
+            field=models.TextField(
+                blank=True, default="", editable=False, max_length=5000
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="post",
+            trigger=pgtrigger.compiler.Trigger(
+                name="title_changed_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."title" IS DISTINCT FROM (NEW."title"))',
+                    func='INSERT INTO "mboard_posthistory" ("authors", "board_id", "date", "domain", "edited", "id", "ncomments", "nlikes", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pinned", "score", "summary", "title", "url", "url_hash", "user_id") VALUES (OLD."authors", OLD."board_id", OLD."date", OLD."domain", OLD."edited", OLD."id", OLD."ncomments", OLD."nlikes", _pgh_attach_context(), NOW(), \'title_changed\', OLD."id", OLD."pinned", OLD."score", OLD."summary", OLD."title", OLD."url", OLD."url_hash", OLD."user_id"); RETURN NULL;',
+                    hash="9bba54177a8db0ae2dfa0c68a8cb11ad048e22e2",
+                    operation="UPDATE",
+                    pgid="pgtrigger_title_changed_update_6125d",
+                    table="mboard_post",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.1 on 2026-10-19 17:17
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mboard", "0005_post_summary_authors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="comment",
+            name="content_changed_update",
+        ),
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="post",
+            name="title_changed_update",
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, default=None, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="commenthistory",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, default=None, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, default=None, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="posthistory",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, default=None, editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="comment_tombstone_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="post_tombstone_idx",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="comment",
+            trigger=pgtrigger.compiler.Trigger(
+                name="content_changed_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."content" IS DISTINCT FROM (NEW."content"))',
+                    func='INSERT INTO "mboard_commenthistory" ("content", "date", "deleted_at", "edited", "id", "nlikes", "parent_id", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "post_id", "user_id") VALUES (OLD."content", OLD."date", OLD."deleted_at", OLD."edited", OLD."id", OLD."nlikes", OLD."parent_id", _pgh_attach_context(), NOW(), \'content_changed\', OLD."id", OLD."post_id", OLD."user_id"); RETURN NULL;',
+                    hash="e7774010e2541504bb84fc6173b1fed53b8d2de9",
+                    operation="UPDATE",
+                    pgid="pgtrigger_content_changed_update_d14ad",
+                    table="mboard_comment",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="post",
+            trigger=pgtrigger.compiler.Trigger(
+                name="title_changed_update",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."title" IS DISTINCT FROM (NEW."title"))',
+                    func='INSERT INTO "mboard_posthistory" ("authors", "board_id", "date", "deleted_at", "domain", "edited", "id", "ncomments", "nlikes", "pgh_context_id", "pgh_created_at", "pgh_label", "pgh_obj_id", "pinned", "score", "summary", "title", "url", "url_hash", "user_id") VALUES (OLD."authors", OLD."board_id", OLD."date", OLD."deleted_at", OLD."domain", OLD."edited", OLD."id", OLD."ncomments", OLD."nlikes", _pgh_attach_context(), NOW(), \'title_changed\', OLD."id", OLD."pinned", OLD."score", OLD."summary", OLD."title", OLD."url", OLD."url_hash", OLD."user_id"); RETURN NULL;',
+                    hash="442fc30c997d598e62d3c24c954170b5f6f4a21f",
+                    operation="UPDATE",
+                    pgid="pgtrigger_title_changed_update_6125d",
+                    table="mboard_post",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
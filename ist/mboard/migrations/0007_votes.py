@@ -0,0 +1,155 @@
+from django.conf import settings
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+from django.db import models
+import django.db.models.deletion
+import django.db.models.functions.datetime
+
+# the tables django created for `Post.fans` and `Comment.fans`, with the name of their item column.
+VOTE_TABLES = {"PostVote": ("mboard_post_fans", "post"), "CommentVote": ("mboard_comment_fans", "comment")}
+
+
+def through_state(name: str) -> list:
+    """
+    Declares the vote model on the table django created for the many to many field, as it is: no table is
+    rewritten or copied, so votes keep flowing while the migration runs.
+    """
+    table, item = VOTE_TABLES[name]
+    return [
+        migrations.CreateModel(
+            name=name,
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    item,
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="votes",
+                        to=f"mboard.{item}",
+                    ),
+                ),
+                (
+                    "customuser",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name=f"{item}_votes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={"db_table": table, "unique_together": {(item, "customuser")}},
+        ),
+        migrations.AlterField(
+            model_name=item,
+            name="fans",
+            field=models.ManyToManyField(
+                editable=False,
+                related_name=f"liked_{item}s",
+                through=f"mboard.{name}",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+    # indexes are built concurrently, without locking out votes.
+    atomic = False
+
+    dependencies = [
+        ("mboard", "0006_tombstones"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[*through_state("PostVote"), *through_state("CommentVote")]
+        ),
+        # a nullable column without default is added without rewriting the table, the default applies to new votes.
+        *[
+            operation
+            for model_name in ["postvote", "commentvote"]
+            for operation in [
+                migrations.AddField(
+                    model_name=model_name,
+                    name="created_at",
+                    field=models.DateTimeField(editable=False, null=True),
+                ),
+                migrations.AlterField(
+                    model_name=model_name,
+                    name="created_at",
+                    field=models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now(), editable=False, null=True
+                    ),
+                ),
+            ]
+        ],
+        AddIndexConcurrently(
+            model_name="postvote",
+            index=models.Index(fields=["customuser", "created_at"], name="post_vote_user_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="postvote",
+            index=django.contrib.postgres.indexes.BrinIndex(fields=["created_at"], name="post_vote_created_brin"),
+        ),
+        AddIndexConcurrently(
+            model_name="commentvote",
+            index=models.Index(fields=["customuser", "created_at"], name="comment_vote_user_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="commentvote",
+            index=django.contrib.postgres.indexes.BrinIndex(fields=["created_at"], name="comment_vote_created_brin"),
+        ),
+        # single column indexes made redundant: the unique index leads with the item, the new one with the voter.
+        # they are dropped concurrently too, altering the fields would also drop and revalidate their foreign keys.
+        *[
+            migrations.SeparateDatabaseAndState(
+                database_operations=[
+                    migrations.RunSQL(
+                        sql=f"DROP INDEX CONCURRENTLY IF EXISTS {index}",
+                        reverse_sql=f"CREATE INDEX CONCURRENTLY {index} ON {table} ({field}_id)",
+                    )
+                ],
+                state_operations=[
+                    migrations.AlterField(
+                        model_name=model_name,
+                        name=field,
+                        field=models.ForeignKey(
+                            db_index=False,
+                            on_delete=django.db.models.deletion.CASCADE,
+                            related_name=related_name,
+                            to=to,
+                        ),
+                    )
+                ],
+            )
+            for model_name, table, field, index, related_name, to in [
+                ("postvote", "mboard_post_fans", "post", "mboard_post_fans_post_id_e9901e10", "votes", "mboard.post"),
+                (
+                    "postvote",
+                    "mboard_post_fans",
+                    "customuser",
+                    "mboard_post_fans_customuser_id_4c882fe1",
+                    "post_votes",
+                    settings.AUTH_USER_MODEL,
+                ),
+                (
+                    "commentvote",
+                    "mboard_comment_fans",
+                    "comment",
+                    "mboard_comment_fans_comment_id_72e95b4d",
+                    "votes",
+                    "mboard.comment",
+                ),
+                (
+                    "commentvote",
+                    "mboard_comment_fans",
+                    "customuser",
+                    "mboard_comment_fans_customuser_id_4c7d8725",
+                    "comment_votes",
+                    settings.AUTH_USER_MODEL,
+                ),
+            ]
+        ],
+    ]
@@ -1,12 +1,28 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from django.db.models import Exists
+from django.db.models import F
 from django.db.models import OuterRef
 from django.db.models import Prefetch
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.utils import timezone
 import pghistory
+import pgtrigger
 
 from ist.settings import AUTH_USER_MODEL
 
+from .feeds import publish
+from .feeds import refresh
+from .links import display_domain
+from .links import url_hash
+from .metadata import enrich_post
+from .notifications import notify
+from .rising import record_vote
 from .scores import compute_score
+from .versions import POST_VERSION
+from .versions import bump
+from .versions import post_versions
 
 CustomUser = AUTH_USER_MODEL
 
@@ -75,14 +91,23 @@ class PostManager(models.Manager):
         condition=pghistory.AnyChange("title"),
     ),
     model_name="PostHistory",
+    # history tables are range partitioned by `pgh_created_at`, see `compacthistory` command.
+    meta={"indexes": [models.Index(fields=["pgh_obj", "pgh_created_at"])]},
 )
 class Post(models.Model):
     title = models.CharField(max_length=120)
     url = models.CharField(max_length=300)
+    # hash of the canonical url, used to find duplicate submissions.
+    url_hash = models.CharField(max_length=64, unique=True, null=True, editable=False)
+    # the url host, computed once at save time for display and per domain feeds.
+    domain = models.CharField(max_length=253, blank=True, default="", editable=False)
+    # abstract and authors of the linked content, fetched in background after submission.
+    summary = models.TextField(max_length=5_000, blank=True, default="", editable=False)
+    authors = models.CharField(max_length=500, blank=True, default="", editable=False)
     date = models.DateTimeField(auto_now_add=True)
     edited = models.BooleanField(default=False)
     score = models.FloatField(editable=False, default=0)
-    fans = models.ManyToManyField(to=CustomUser, related_name="liked_posts", editable=False)
+    fans = models.ManyToManyField(to=CustomUser, through="PostVote", related_name="liked_posts", editable=False)
     keywords = models.ManyToManyField(Keyword, related_name="posts", blank=True)
     board = models.ForeignKey(to=Board, on_delete=models.SET_NULL, related_name="posts", null=True, blank=True)
     user = models.ForeignKey(to=CustomUser, related_name="posts", on_delete=models.CASCADE)
@@ -90,22 +115,69 @@ class Post(models.Model):
     nlikes = models.IntegerField(default=0)
     ncomments = models.IntegerField(default=0)
     pinned = models.BooleanField(default=False)
+    # deleted posts are kept as tombstones, for the discussion under them, until purged.
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, editable=False)
     objects = PostManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["domain", "-date"]),
+            models.Index(fields=["deleted_at"], condition=Q(deleted_at__isnull=False), name="post_tombstone_idx"),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.url})"
 
+    def save(self, *args, **kwargs):
+        if not self.domain:
+            self.domain = display_domain(self.url)
+        # tombstones give up their url, see `save_deleted_post`.
+        if self.url_hash is None and self.deleted_at is None:
+            self.url_hash = url_hash(self.url)
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        bump(*post_versions(self))
+        refresh(self.id)
+        return super().delete(*args, **kwargs)
+
     def board_prefix(self):
         return f"{self.board.get_name_display()}" if self.board else ""
 
 
-def save_new_post(title: str, author: CustomUser, url: str, board: str | None) -> Post:
+class PostVote(models.Model):
+    """
+    A vote of a user for a post, the through table of `Post.fans`, which keeps the table django created for it.
+    The unique index serves lookups by post and `with_fan_status`, the other indexes lookups by voter and by time.
+    """
+
+    post = models.ForeignKey(to=Post, on_delete=models.CASCADE, related_name="votes", db_index=False)
+    customuser = models.ForeignKey(to=CustomUser, on_delete=models.CASCADE, related_name="post_votes", db_index=False)
+    # set by the database, bulk inserts get it too. votes cast before it was recorded have none.
+    created_at = models.DateTimeField(null=True, editable=False, db_default=Now())
+
+    class Meta:
+        db_table = "mboard_post_fans"
+        unique_together = [("post", "customuser")]
+        indexes = [
+            models.Index(fields=["customuser", "created_at"], name="post_vote_user_idx"),
+            # votes are appended in time order, a block range index stays tiny.
+            BrinIndex(fields=["created_at"], name="post_vote_created_brin"),
+        ]
+
+
+def save_new_post(title: str, author: CustomUser, url: str, board: str | None, keywords=()) -> Post:
     post = Post(title=title, user=author, url=url, board=board)
     post.save()
+    if keywords:
+        post.keywords.set(keywords)
     post.fans.add(author)
     post.nlikes = 1
     post.score = compute_score(post.nlikes, post.date)
     post.save(update_fields=["nlikes", "score"])
+    enrich_post.enqueue(post.id)
+    bump(*post_versions(post))
+    publish(post.id)
     return post
 
 
@@ -115,12 +187,40 @@ def save_edited_post(new_title: str, post: Post) -> Post:
         post.edited = True
         post.title = new_title
         post.save(update_fields=["title", "edited"])
+        bump(*post_versions(post))
+        refresh(post.id)
+    return post
+
+
+# fields blanked on tombstones, their authors deleted them.
+BLANKED_POST_FIELDS = {"title": "", "url": "", "summary": "", "authors": ""}
+
+
+def save_deleted_post(post: Post) -> Post:
+    """
+    Turns a post into a tombstone, see `moderation.purge` for its removal. Its url can be submitted again.
+    What the author wrote is blanked, and the history of its edits dropped rather than added to.
+    """
+    # the update only matches once, concurrent deletes do not notify twice.
+    now = timezone.now()
+    with pgtrigger.ignore("mboard.Post:title_changed_update"):
+        updated = Post.objects.filter(pk=post.pk, deleted_at=None).update(
+            deleted_at=now, url_hash=None, **BLANKED_POST_FIELDS
+        )
+    if updated:
+        post.events.all().delete()
+        post.deleted_at, post.url_hash = now, None
+        for field, value in BLANKED_POST_FIELDS.items():
+            setattr(post, field, value)
+        bump(*post_versions(post))
+        refresh(post.id)
     return post
 
 
 def save_toggle_pin(post: Post):
     post.pinned = not post.pinned
     post.save(update_fields=["pinned"])
+    bump(*post_versions(post))
     return post
 
 
@@ -156,6 +256,7 @@ class CommentManager(models.Manager):
         condition=pghistory.AnyChange("content"),
     ),
     model_name="CommentHistory",
+    meta={"indexes": [models.Index(fields=["pgh_obj", "pgh_created_at"])]},
 )
 class Comment(models.Model):
     content = models.TextField(max_length=10_000)
@@ -167,17 +268,43 @@ class Comment(models.Model):
     nlikes = models.IntegerField(default=0)
     post = models.ForeignKey(to=Post, on_delete=models.CASCADE, related_name="comments")
     parent = models.ForeignKey(to="self", on_delete=models.CASCADE, related_name="replies", null=True)
-    fans = models.ManyToManyField(to=CustomUser, related_name="liked_comments", editable=False)
+    fans = models.ManyToManyField(to=CustomUser, through="CommentVote", related_name="liked_comments", editable=False)
+    # deleted comments are kept as tombstones, so that their replies keep their place in the tree, until purged.
+    deleted_at = models.DateTimeField(null=True, blank=True, default=None, editable=False)
     objects = CommentManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at"], condition=Q(deleted_at__isnull=False), name="comment_tombstone_idx"),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user.username} on {self.post.title}"
 
     def delete(self, *args, **kwargs):
         post = self.post
         super().delete(*args, **kwargs)
-        post.ncomments = post.comments.count()
+        post.ncomments = post.comments.filter(deleted_at=None).count()
         self.post.save(update_fields=["ncomments"])
+        bump(*post_versions(post))
+
+
+class CommentVote(models.Model):
+    """A vote of a user for a comment, the through table of `Comment.fans`, see `PostVote`."""
+
+    comment = models.ForeignKey(to=Comment, on_delete=models.CASCADE, related_name="votes", db_index=False)
+    customuser = models.ForeignKey(
+        to=CustomUser, on_delete=models.CASCADE, related_name="comment_votes", db_index=False
+    )
+    created_at = models.DateTimeField(null=True, editable=False, db_default=Now())
+
+    class Meta:
+        db_table = "mboard_comment_fans"
+        unique_together = [("comment", "customuser")]
+        indexes = [
+            models.Index(fields=["customuser", "created_at"], name="comment_vote_user_idx"),
+            BrinIndex(fields=["created_at"], name="comment_vote_created_brin"),
+        ]
 
 
 def save_new_comment(content: str, author: CustomUser, post: Post, parent: Comment | None):
@@ -188,6 +315,8 @@ def save_new_comment(content: str, author: CustomUser, post: Post, parent: Comme
     comment.save(update_fields=["nlikes"])
     post.ncomments += 1
     post.save(update_fields=["ncomments"])
+    bump(*post_versions(post))
+    notify(comment)
     return comment
 
 
@@ -197,6 +326,24 @@ def save_edited_comment(new_content: str, comment: Comment) -> Comment:
         comment.edited = True
         comment.content = new_content
         comment.save(update_fields=["content", "edited"])
+        bump(POST_VERSION.format(post_id=comment.post_id))
+    return comment
+
+
+def save_deleted_comment(comment: Comment) -> Comment:
+    """
+    Turns a comment into a tombstone, see `moderation.purge` for its removal.
+    Its content is blanked, and the history of its edits dropped, as for posts.
+    """
+    # the update only matches once, concurrent deletes do not count twice.
+    now = timezone.now()
+    with pgtrigger.ignore("mboard.Comment:content_changed_update"):
+        updated = Comment.objects.filter(pk=comment.pk, deleted_at=None).update(deleted_at=now, content="")
+    if updated:
+        comment.events.all().delete()
+        comment.deleted_at, comment.content = now, ""
+        Post.objects.filter(pk=comment.post_id).update(ncomments=F("ncomments") - 1)
+        bump(*post_versions(comment.post))
     return comment
 
 
@@ -207,6 +354,10 @@ def save_new_like(content: Comment | Post, fan: CustomUser) -> Comment | Post:
     if isinstance(content, Post):
         content.score = compute_score(content.nlikes, content.date)
         content.save(update_fields=["score"])
+        bump(*post_versions(content))
+        record_vote(content.id)
+    else:
+        bump(POST_VERSION.format(post_id=content.post_id))
     return content
 
 
@@ -217,4 +368,8 @@ def save_remove_like(content: Comment | Post, fan: CustomUser) -> Comment:
     if isinstance(content, Post):
         content.score = compute_score(content.nlikes, content.date)
         content.save(update_fields=["score"])
+        bump(*post_versions(content))
+        record_vote(content.id, -1)
+    else:
+        bump(POST_VERSION.format(post_id=content.post_id))
     return content
@@ -0,0 +1,265 @@
+"""
+Bulk moderation: banning and purging users, removing their content in a time window, pinning many posts.
+
+Rows are removed by batches of ids, each in its own short transaction, so that no statement holds its locks
+for long and the site keeps serving during a large purge. Removed comments take their replies with them, found
+with a recursive query rather than by Django's cascade, which loads every row it deletes. The counters and scores
+of the posts and comments left behind are recomputed once at the end, rather than after each deletion.
+Tombstones of posts and comments deleted by their authors are purged the same way, by a daily job.
+"""
+
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import datetime
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import forget_users
+
+from .feeds import refresh_all
+from .jobs import periodic
+from .models import Comment
+from .models import Post
+from .scores import SCORE_SQL
+from .settings import MODERATION_BATCH_SIZE
+from .settings import TOMBSTONE_RETENTION_DAYS
+from .versions import POST_VERSION
+from .versions import bump
+from .versions import post_versions
+
+
+def _tables() -> dict[str, str]:
+    return {
+        "post": Post._meta.db_table,
+        "comment": Comment._meta.db_table,
+        "post_fans": Post.fans.through._meta.db_table,
+        "post_keywords": Post.keywords.through._meta.db_table,
+        "comment_fans": Comment.fans.through._meta.db_table,
+    }
+
+
+def _chunks(ids: Iterable[int], size: int) -> Iterator[list[int]]:
+    ids = sorted(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
+def _authored(cursor, table: str, user_ids: list[int], since: datetime | None, until: datetime | None, size: int):
+    """Yields the ids of the rows of `table` written by users in a time window, batch by batch, in id order."""
+    query = f"SELECT id FROM {table} WHERE user_id = ANY(%(user_ids)s) AND id > %(last)s"
+    if since is not None:
+        query += " AND date >= %(since)s"
+    if until is not None:
+        query += " AND date < %(until)s"
+    params = {"user_ids": user_ids, "since": since, "until": until, "size": size, "last": 0}
+    while True:
+        cursor.execute(query + " ORDER BY id LIMIT %(size)s", params)
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return
+        yield ids
+        params["last"] = ids[-1]
+
+
+def _versions(post_ids: Iterable[int]) -> set[str]:
+    keys = set()
+    for post in Post.objects.filter(id__in=post_ids).select_related("board").only("domain", "user_id", "board"):
+        keys.update(post_versions(post))
+    return keys
+
+
+def _delete_posts(cursor, tables: dict[str, str], ids: list[int]) -> int:
+    """Deletes posts with their comments, votes and keywords. Returns the number of deleted posts."""
+    cursor.execute(
+        f"""
+        DELETE FROM {tables['comment_fans']}
+        WHERE comment_id IN (SELECT id FROM {tables['comment']} WHERE post_id = ANY(%(ids)s))
+        """,
+        {"ids": ids},
+    )
+    cursor.execute(f"DELETE FROM {tables['comment']} WHERE post_id = ANY(%(ids)s)", {"ids": ids})
+    cursor.execute(f"DELETE FROM {tables['post_fans']} WHERE post_id = ANY(%(ids)s)", {"ids": ids})
+    cursor.execute(f"DELETE FROM {tables['post_keywords']} WHERE post_id = ANY(%(ids)s)", {"ids": ids})
+    cursor.execute(f"DELETE FROM {tables['post']} WHERE id = ANY(%(ids)s)", {"ids": ids})
+    return cursor.rowcount
+
+
+def _delete_comments(cursor, tables: dict[str, str], ids: list[int]) -> list[int]:
+    """Deletes comments with all their replies and votes. Returns the post ids of the deleted comments."""
+    cursor.execute(
+        f"""
+        WITH RECURSIVE tree AS (
+            SELECT id FROM {tables['comment']} WHERE id = ANY(%(ids)s)
+            UNION
+            SELECT c.id FROM {tables['comment']} c JOIN tree t ON c.parent_id = t.id
+        ), votes AS (
+            DELETE FROM {tables['comment_fans']} WHERE comment_id IN (SELECT id FROM tree)
+        )
+        DELETE FROM {tables['comment']} WHERE id IN (SELECT id FROM tree) RETURNING post_id
+        """,
+        {"ids": ids},
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _delete_votes(cursor, table: str, column: str, user_ids: list[int], size: int) -> list[int]:
+    """Deletes the votes of users on `table`, batch by batch. Returns the ids of the voted rows."""
+    voted = []
+    while True:
+        with transaction.atomic():
+            cursor.execute(
+                f"""
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM {table} WHERE customuser_id = ANY(%(user_ids)s) LIMIT %(size)s
+                ) RETURNING {column}
+                """,
+                {"user_ids": user_ids, "size": size},
+            )
+            rows = cursor.fetchall()
+        voted += [row[0] for row in rows]
+        if len(rows) < size:
+            return voted
+
+
+def recount(post_ids: Iterable[int], comment_ids: Iterable[int], size: int = MODERATION_BATCH_SIZE):
+    """Recomputes the likes, comments and scores of posts and the likes of comments, from their rows."""
+    tables = _tables()
+    with connection.cursor() as cursor:
+        for ids in _chunks(set(post_ids), size):
+            cursor.execute(
+                f"""
+                UPDATE {tables['post']} p SET nlikes = c.nlikes, ncomments = c.ncomments,
+                    score = {SCORE_SQL.format(nlikes="c.nlikes", date="p.date")}
+                FROM (
+                    SELECT p.id,
+                           (SELECT count(*) FROM {tables['post_fans']} f WHERE f.post_id = p.id) AS nlikes,
+                           (
+                               SELECT count(*) FROM {tables['comment']} c
+                               WHERE c.post_id = p.id AND c.deleted_at IS NULL
+                           ) AS ncomments
+                    FROM {tables['post']} p WHERE p.id = ANY(%(ids)s)
+                ) c
+                WHERE p.id = c.id
+                """,
+                {"ids": ids},
+            )
+        for ids in _chunks(set(comment_ids), size):
+            cursor.execute(
+                f"""
+                UPDATE {tables['comment']} c
+                SET nlikes = (SELECT count(*) FROM {tables['comment_fans']} f WHERE f.comment_id = c.id)
+                WHERE c.id = ANY(%(ids)s)
+                """,
+                {"ids": ids},
+            )
+
+
+def remove_content(
+    user_ids: list[int],
+    since: datetime | None = None,
+    until: datetime | None = None,
+    size: int = MODERATION_BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    Removes the posts and comments written by users from `since` and until `until`, with everything under them:
+    comments on removed posts and replies to removed comments, whoever wrote them. Returns the removed counts.
+    """
+    tables = _tables()
+    counts = {"posts": 0, "comments": 0}
+    keys, touched = set(), set()
+    with connection.cursor() as cursor:
+        for ids in _authored(cursor, tables["post"], user_ids, since, until, size):
+            keys |= _versions(ids)
+            with transaction.atomic():
+                counts["posts"] += _delete_posts(cursor, tables, ids)
+        for ids in _authored(cursor, tables["comment"], user_ids, since, until, size):
+            with transaction.atomic():
+                post_ids = _delete_comments(cursor, tables, ids)
+            counts["comments"] += len(post_ids)
+            touched.update(post_ids)
+    recount(touched, [], size)
+    keys |= _versions(touched)
+    bump(*keys)
+    refresh_all()
+    return counts
+
+
+def ban(user_ids: list[int], purge: bool = True, size: int = MODERATION_BATCH_SIZE) -> dict[str, int]:
+    """
+    Bans users. With `purge`, also removes all their posts, comments and votes, and recomputes the counters
+    of what they had voted for. Returns the numbers of banned users and of removed rows.
+    """
+    User = get_user_model()
+    counts = {"users": User.objects.filter(id__in=user_ids).update(status=User.Status.BANNED)}
+    # updates skip `save`, which drops the cached users the sessions load.
+    forget_users(*user_ids)
+    if not purge:
+        return counts
+    tables = _tables()
+    with connection.cursor() as cursor:
+        voted_posts = _delete_votes(cursor, tables["post_fans"], "post_id", user_ids, size)
+        voted_comments = _delete_votes(cursor, tables["comment_fans"], "comment_id", user_ids, size)
+    counts |= remove_content(user_ids, size=size)
+    counts |= {"post_votes": len(voted_posts), "comment_votes": len(voted_comments)}
+    # rows removed with the content are skipped by the updates.
+    recount(voted_posts, voted_comments, size)
+    bump(*_versions(voted_posts), *_versions(Comment.objects.filter(id__in=voted_comments).values("post_id")))
+    return counts
+
+
+def set_pinned(post_ids: list[int], pinned: bool, size: int = MODERATION_BATCH_SIZE) -> int:
+    """Pins or unpins posts. Returns the number of posts which changed."""
+    changed = []
+    for ids in _chunks(post_ids, size):
+        batch = list(Post.objects.filter(id__in=ids).exclude(pinned=pinned).values_list("id", flat=True))
+        Post.objects.filter(id__in=batch).update(pinned=pinned)
+        changed += batch
+    bump(*_versions(changed))
+    return len(changed)
+
+
+def purge(before: datetime, size: int = MODERATION_BATCH_SIZE) -> dict[str, int]:
+    """
+    Hard deletes the tombstones of posts and comments deleted before `before`, once nothing hangs from them:
+    comments without replies, then posts without comments. A tombstone whose replies were all purged goes in
+    the same run. Returns the purged counts.
+    """
+    tables = _tables()
+    queries = {
+        "comments": f"""
+            SELECT id FROM {tables['comment']} c WHERE c.deleted_at < %(before)s
+            AND NOT EXISTS (SELECT 1 FROM {tables['comment']} r WHERE r.parent_id = c.id)
+            LIMIT %(size)s
+            """,
+        "posts": f"""
+            SELECT id FROM {tables['post']} p WHERE p.deleted_at < %(before)s
+            AND NOT EXISTS (SELECT 1 FROM {tables['comment']} c WHERE c.post_id = p.id)
+            LIMIT %(size)s
+            """,
+    }
+    counts, post_ids = {"comments": 0, "posts": 0}, set()
+    with connection.cursor() as cursor:
+        for table, query in queries.items():
+            while True:
+                with transaction.atomic():
+                    cursor.execute(query, {"before": before, "size": size})
+                    if not (ids := [row[0] for row in cursor.fetchall()]):
+                        break
+                    if table == "comments":
+                        post_ids.update(_delete_comments(cursor, tables, ids))
+                    else:
+                        _delete_posts(cursor, tables, ids)
+                        post_ids.update(ids)
+                counts[table] += len(ids)
+    bump(*[POST_VERSION.format(post_id=post_id) for post_id in post_ids])
+    return counts
+
+
+@periodic(timedelta(days=1))
+def purge_tombstones():
+    """Purges the tombstones older than the retention, daily on the job workers."""
+    purge(timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
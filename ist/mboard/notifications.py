@@ -0,0 +1,79 @@
+"""
+Reply notifications, written to the inbox of the replied user when a comment is saved.
+
+Inboxes are capped Redis lists of the newest notifications, with an unread counter beside them, so that
+reading an inbox or showing the counter costs one Redis read and no query. Pages read the counter once,
+for the navbar and for their ETag, since a new notification changes the page without changing its content.
+"""
+
+from datetime import datetime
+from functools import partial
+import json
+
+from django.contrib.auth import SESSION_KEY
+from django.db import transaction
+from django.http import HttpRequest
+from redis import Redis
+
+from .middleware import redis_default
+from .settings import INBOX_NENTRIES
+from .settings import INBOX_TIMEOUT
+
+INBOX_KEY = "inbox:{user_id}"
+UNREAD_KEY = "inbox:unread:{user_id}"
+EXCERPT_LENGTH = 200
+
+
+def _deliver(red: Redis, user_id: int, notification: str):
+    inbox, unread = INBOX_KEY.format(user_id=user_id), UNREAD_KEY.format(user_id=user_id)
+    with red.pipeline() as pipe:
+        pipe.lpush(inbox, notification)
+        pipe.ltrim(inbox, 0, INBOX_NENTRIES - 1)
+        pipe.incr(unread)
+        # inboxes of users who stopped coming expire.
+        pipe.expire(inbox, INBOX_TIMEOUT)
+        pipe.expire(unread, INBOX_TIMEOUT)
+        pipe.execute()
+
+
+def notify(comment):
+    """Notifies the author of the replied comment or post, once the current transaction commits."""
+    recipient_id = comment.parent.user_id if comment.parent_id is not None else comment.post.user_id
+    if recipient_id == comment.user_id:
+        return
+    notification = {
+        "comment_id": comment.id,
+        "post_id": comment.post_id,
+        "post_title": comment.post.title,
+        "username": comment.user.username,
+        "excerpt": comment.content[:EXCERPT_LENGTH],
+        "date": comment.date.isoformat(),
+        "reply_to": "comment" if comment.parent_id is not None else "post",
+    }
+    transaction.on_commit(partial(_deliver, redis_default, recipient_id, json.dumps(notification)))
+
+
+def inbox(red: Redis, user_id: int) -> list[dict]:
+    """Returns the notifications of a user, newest first, and marks them read."""
+    with red.pipeline() as pipe:
+        pipe.lrange(INBOX_KEY.format(user_id=user_id), 0, INBOX_NENTRIES - 1)
+        pipe.delete(UNREAD_KEY.format(user_id=user_id))
+        notifications, _ = pipe.execute()
+    notifications = [json.loads(notification) for notification in notifications]
+    for notification in notifications:
+        notification["date"] = datetime.fromisoformat(notification["date"])
+    return notifications
+
+
+def unread(request: HttpRequest) -> int:
+    """Returns the number of unread notifications of the session user, read once per request."""
+    if not hasattr(request, "_unread"):
+        # the session is enough to find the user, loading it is left to the views which need it.
+        user_id = getattr(request, "session", {}).get(SESSION_KEY)
+        request._unread = int(redis_default.get(UNREAD_KEY.format(user_id=user_id)) or 0) if user_id else 0
+    return request._unread
+
+
+def unread_count(request: HttpRequest) -> dict:
+    """Context processor showing the unread notifications in the navbar."""
+    return {"unread": unread(request)}
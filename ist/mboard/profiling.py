@@ -0,0 +1,81 @@
+import json
+from statistics import quantiles
+import time
+from uuid import uuid4
+import zlib
+
+from pyinstrument.renderers import SpeedscopeRenderer
+from pyinstrument.session import Session
+from redis import Redis
+
+# a capped list of profile summaries, newest first.
+RECORDS_KEY = "profiler:records"
+# compressed speedscope profiles are stored one per key and expire.
+PROFILE_KEY = "profiler:profile:{}"
+MAX_RECORDS = 5_000
+RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+
+def save_profile(
+    red: Redis,
+    view: str,
+    path: str,
+    session: Session,
+    peak_memory: int | None,
+    sampled: bool,
+) -> str:
+    """
+    Stores a compressed flame graph for a profiled request along with a summary record.
+    Returns the profile id.
+    """
+    profile_id = uuid4().hex
+    record = {
+        "id": profile_id,
+        "view": view,
+        "path": path,
+        "duration": session.duration,
+        "peak_memory": peak_memory,
+        "sampled": sampled,
+        "timestamp": time.time(),
+    }
+    profile = zlib.compress(SpeedscopeRenderer().render(session).encode())
+    pipe = red.pipeline()
+    pipe.set(PROFILE_KEY.format(profile_id), profile, ex=RETENTION_SECONDS)
+    pipe.lpush(RECORDS_KEY, json.dumps(record))
+    pipe.ltrim(RECORDS_KEY, 0, MAX_RECORDS - 1)
+    pipe.execute()
+    return profile_id
+
+
+def load_records(red: Redis) -> list[dict]:
+    return [json.loads(r) for r in red.lrange(RECORDS_KEY, 0, -1)]
+
+
+def load_profile(red: Redis, profile_id: str) -> str | None:
+    """Returns a speedscope JSON document, or None if the profile expired."""
+    profile = red.get(PROFILE_KEY.format(profile_id))
+    return zlib.decompress(profile).decode() if profile is not None else None
+
+
+def summarize(records: list[dict]) -> list[dict]:
+    """Groups records by view and sorts the groups from slowest to fastest by 95th percentile duration."""
+    views = {}
+    for record in records:
+        views.setdefault(record["view"], []).append(record)
+
+    summaries = []
+    for view, view_records in views.items():
+        durations = sorted(r["duration"] for r in view_records)
+        memories = [r["peak_memory"] for r in view_records if r["peak_memory"] is not None]
+        summaries.append(
+            {
+                "view": view,
+                "count": len(durations),
+                "median": durations[len(durations) // 2],
+                "p95": quantiles(durations, n=20, method="inclusive")[-1] if len(durations) > 1 else durations[0],
+                "max": durations[-1],
+                "peak_memory": max(memories, default=None),
+                "worst": max(view_records, key=lambda r: r["duration"])["id"],
+            }
+        )
+    return sorted(summaries, key=lambda s: s["p95"], reverse=True)
@@ -0,0 +1,72 @@
+"""
+Rising posts, ranked by how fast they are getting votes.
+
+Votes are counted in a ring of time buckets, one Redis sorted set of post ids per `RISING_BUCKET_SECONDS`.
+A periodic job sums the buckets of the window into the ranking, older buckets weighing less, then drops the
+buckets which fell out of the window. Voting costs one ZINCRBY, reading the feed one ZREVRANGE.
+"""
+
+from datetime import timedelta
+from functools import partial
+import time
+
+from django.db import transaction
+from redis import Redis
+
+from .jobs import periodic
+from .middleware import redis_default
+from .settings import FEED_NENTRIES
+from .settings import RISING_BUCKET_SECONDS
+from .settings import RISING_DECAY
+from .settings import RISING_NBUCKETS
+from .versions import FEED_VERSION
+from .versions import bump
+
+BUCKET_KEY = "rising:bucket:{bucket}"
+RANKING_KEY = "rising:ranking"
+RISING_VERSION = FEED_VERSION.format(feed="rising")
+
+
+def _bucket(now: float) -> int:
+    return int(now // RISING_BUCKET_SECONDS)
+
+
+def _record(red: Redis, post_id: int, delta: int):
+    key = BUCKET_KEY.format(bucket=_bucket(time.time()))
+    with red.pipeline() as pipe:
+        pipe.zincrby(key, delta, post_id)
+        # buckets the job missed, when no worker was running, expire anyway.
+        pipe.expire(key, RISING_BUCKET_SECONDS * (RISING_NBUCKETS + 1))
+        pipe.execute()
+
+
+def record_vote(post_id: int, delta: int = 1):
+    """Counts a vote, or a withdrawn vote with a negative `delta`, once the current transaction commits."""
+    transaction.on_commit(partial(_record, redis_default, post_id, delta))
+
+
+def update_ranking(red: Redis, now: float | None = None):
+    """
+    Ranks posts by their votes in the window, each bucket weighing `RISING_DECAY` times the following one,
+    and drops the older buckets.
+    """
+    current = _bucket(time.time() if now is None else now)
+    weights = {BUCKET_KEY.format(bucket=current - age): RISING_DECAY**age for age in range(RISING_NBUCKETS)}
+    with red.pipeline() as pipe:
+        pipe.zunionstore(RANKING_KEY, weights)
+        # posts whose votes were withdrawn.
+        pipe.zremrangebyscore(RANKING_KEY, "-inf", 0)
+        pipe.delete(*[BUCKET_KEY.format(bucket=current - age) for age in range(RISING_NBUCKETS, RISING_NBUCKETS + 3)])
+        pipe.execute()
+    bump(RISING_VERSION)
+
+
+def rising(red: Redis, n: int = FEED_NENTRIES) -> list[int]:
+    """Returns the ids of the `n` fastest rising posts, fastest first."""
+    return [int(post_id) for post_id in red.zrevrange(RANKING_KEY, 0, n - 1)]
+
+
+@periodic(timedelta(seconds=RISING_BUCKET_SECONDS))
+def rank_rising():
+    """Updates the rising ranking, at every bucket on the job workers."""
+    update_ranking(redis_default)
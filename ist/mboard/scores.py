@@ -8,3 +8,7 @@ day_seconds = 24 * 60 * 60
 def compute_score(nlikes: int, creation_date, days_modifier: int = 1):
     lapse = creation_date - arbitrary_date
     return log10(nlikes + 1) + (lapse.days + lapse.seconds / day_seconds) / days_modifier
+
+
+# `compute_score` as an SQL expression, for set based updates.
+SCORE_SQL = "log({nlikes} + 1) + extract(epoch FROM {date} - '2024-01-01T00:00:00Z'::timestamptz) / 86400"
@@ -3,3 +3,65 @@ MAX_DEPTH = 3
 # post board prefix separator
 BOARD_PREFIX_SEPARATOR = ":"
 PROFILE_NENTRIES = 30
+HISTORY_NREVISIONS = 20
+# json api page sizes, clients choose with `?limit=`.
+API_PAGE_SIZE = 30
+API_MAX_PAGE_SIZE = 100
+# reply notifications kept in each inbox, and seconds before the inboxes of inactive users expire.
+INBOX_NENTRIES = 50
+INBOX_TIMEOUT = 90 * 24 * 60 * 60
+# rising posts are ranked by their votes in a window of buckets, each weighing `RISING_DECAY` times the next.
+RISING_BUCKET_SECONDS = 5 * 60
+RISING_NBUCKETS = 12
+RISING_DECAY = 0.8
+# seconds before versions read but never bumped expire, see `versions.get_version`.
+VERSION_TIMEOUT = 24 * 60 * 60
+# syndication feeds
+FEED_NENTRIES = 30
+FEED_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# sitemaps, chunks are limited to 50k urls by the protocol.
+SITEMAP_CHUNK_SIZE = 50_000
+SITEMAP_FETCH_SIZE = 2_000
+# rows fetched at once from the server side cursors of exports.
+EXPORT_FETCH_SIZE = 2_000
+# bytes of the imported files sent at once to COPY, and the memory of the import's joins, sorts and index builds.
+IMPORT_CHUNK_SIZE = 2**20
+IMPORT_WORK_MEM = "256MB"
+IMPORT_MAINTENANCE_WORK_MEM = "512MB"
+# rows deleted or updated per transaction by bulk moderation actions.
+MODERATION_BATCH_SIZE = 500
+# co-voting analysis: votes read at once, posts with more voters left out, and the votes and Jaccard similarity
+# a pair of users must share to be linked.
+COVOTING_BATCH_SIZE = 100_000
+COVOTING_MAX_VOTERS = 1_000
+COVOTING_MIN_SHARED = 5
+COVOTING_MIN_SIMILARITY = 0.5
+# days deleted posts and comments are kept as tombstones before being purged.
+TOMBSTONE_RETENTION_DAYS = 30
+# pages rendered at start up, together with the top posts.
+WARMUP_VIEWS = ["mboard:index", "mboard:news", "mboard:papers", "mboard:code", "mboard:jobs"]
+WARMUP_NPOSTS = 10
+# link metadata fetching
+METADATA_TIMEOUT = 5
+METADATA_RETRIES = 2
+METADATA_BACKOFF = 0.5
+METADATA_MAX_BYTES = 2**20
+METADATA_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+ARXIV_API_URL = "https://export.arxiv.org/api/query?id_list={}"
+# background jobs
+JOB_RETRIES = 3
+# seconds before the first retry, doubling at each attempt.
+JOB_BACKOFF = 10
+JOB_LEADER_TTL = 30
+# seconds without heartbeat before a worker is considered dead, and the jobs it was running requeued.
+JOB_WORKER_TTL = 30
+MAX_FAILED_JOBS = 1_000
+# modules registering jobs, imported by the workers.
+JOB_MODULES = [
+    "mboard.metadata",
+    "mboard.history",
+    "mboard.mail",
+    "mboard.sitemaps",
+    "mboard.moderation",
+    "mboard.rising",
+]
@@ -0,0 +1,133 @@
+"""
+Prebuilt sitemaps of the post pages.
+
+Posts are split in chunks by id range, each written to a gzipped sitemap file by streaming its rows from
+a server side cursor, so that memory stays constant whatever the number of posts. A sitemap index lists
+the chunks. A manifest keeps the count, last id and last modification of each chunk: updates only look
+at the last known chunk and the following ones, where new posts land, and rewrite the chunks which changed.
+Full updates look at every chunk, picking up deletions. The proxy serves the files, views serve them otherwise.
+"""
+
+from datetime import timedelta
+import gzip
+import json
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Max
+from django.urls import reverse
+
+from .jobs import periodic
+from .models import Post
+from .settings import SITEMAP_CHUNK_SIZE
+from .settings import SITEMAP_FETCH_SIZE
+
+INDEX_NAME = "sitemap.xml"
+CHUNK_NAME = "posts-{chunk}.xml.gz"
+MANIFEST_NAME = "manifest.json"
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def chunk_stats(start: int = 0) -> dict[int, dict]:
+    """Returns the count, last id and last modification of the chunks from `start`, with one aggregate query."""
+    # fmt: off
+    rows = (
+        Post.objects
+        .filter(id__gte=start * SITEMAP_CHUNK_SIZE, deleted_at=None)
+        .annotate(chunk=F("id") / SITEMAP_CHUNK_SIZE)
+        .values("chunk")
+        .annotate(count=Count("id"), last_id=Max("id"), lastmod=Max("date"))
+        .order_by("chunk")
+    )
+    # fmt: on
+    return {
+        row["chunk"]: {"count": row["count"], "last_id": row["last_id"], "lastmod": row["lastmod"].isoformat()}
+        for row in rows
+    }
+
+
+def _replace(path: Path, write):
+    """Writes a file next to `path` with `write`, then moves it in place, so that readers never see it partial."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def write_chunk(root: Path, chunk: int):
+    """Writes the sitemap of the posts of a chunk, streaming them."""
+    # fmt: off
+    posts = (
+        Post.objects
+        .filter(id__gte=chunk * SITEMAP_CHUNK_SIZE, id__lt=(chunk + 1) * SITEMAP_CHUNK_SIZE, deleted_at=None)
+        .order_by("id")
+        .values_list("id", "date")
+    )
+    # fmt: on
+    # reversing each url would cost more than the rest of the loop.
+    url = escape(settings.SITE_URL + reverse("mboard:post_detail", args=(0,)).replace("/0/", "/{}/"))
+
+    def write(tmp: Path):
+        with gzip.open(tmp, "wt", encoding="utf-8") as file:
+            file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{XMLNS}">\n')
+            for post_id, date in posts.iterator(chunk_size=SITEMAP_FETCH_SIZE):
+                file.write(f"<url><loc>{url.format(post_id)}</loc><lastmod>{date:%Y-%m-%d}</lastmod></url>\n")
+            file.write("</urlset>\n")
+
+    _replace(root / CHUNK_NAME.format(chunk=chunk), write)
+
+
+def write_index(root: Path, manifest: dict[int, dict]):
+    def write(tmp: Path):
+        with open(tmp, "w", encoding="utf-8") as file:
+            file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{XMLNS}">\n')
+            for chunk, stats in sorted(manifest.items()):
+                url = escape(settings.SITE_URL + reverse("mboard:sitemap_chunk", args=(chunk,)))
+                file.write(f"<sitemap><loc>{url}</loc><lastmod>{stats['lastmod']}</lastmod></sitemap>\n")
+            file.write("</sitemapindex>\n")
+
+    _replace(root / INDEX_NAME, write)
+
+
+def load_manifest(root: Path) -> dict[int, dict]:
+    try:
+        with open(root / MANIFEST_NAME) as file:
+            return {int(chunk): stats for chunk, stats in json.load(file).items()}
+    except FileNotFoundError:
+        return {}
+
+
+def update(root: Path, full: bool = False) -> list[int]:
+    """Rewrites the chunks which changed since the last update, and the index. Returns the rewritten chunks."""
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(root)
+    stats = chunk_stats(0 if full else max(manifest, default=0))
+    written = []
+    for chunk, current in stats.items():
+        if manifest.get(chunk) != current:
+            write_chunk(root, chunk)
+            manifest[chunk] = current
+            written.append(chunk)
+    if full:
+        # chunks left without posts.
+        for chunk in manifest.keys() - stats.keys():
+            del manifest[chunk]
+            (root / CHUNK_NAME.format(chunk=chunk)).unlink(missing_ok=True)
+    write_index(root, manifest)
+    _replace(root / MANIFEST_NAME, lambda tmp: tmp.write_text(json.dumps(manifest)))
+    return written
+
+
+@periodic(timedelta(hours=1))
+def update_sitemap():
+    """Adds new posts to the sitemaps, hourly on the job workers."""
+    update(Path(settings.SITEMAP_ROOT))
+
+
+@periodic(timedelta(days=1))
+def rebuild_sitemap():
+    """Checks every chunk, daily, dropping deleted posts from the sitemaps."""
+    update(Path(settings.SITEMAP_ROOT), full=True)
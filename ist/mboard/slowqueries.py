@@ -0,0 +1,104 @@
+import json
+from random import randrange
+import sys
+import time
+
+from django.db import DatabaseError
+from django.db import transaction
+from django.http import HttpRequest
+from django.template.base import Origin
+from redis import Redis
+
+# a capped list of slow query records, newest first. the cap is our retention limit.
+RECORDS_KEY = "slowqueries:records"
+MAX_RECORDS = 2_000
+MAX_SQL_LENGTH = 4_000
+
+
+def current_template() -> str | None:
+    """
+    Returns the name of the innermost template being rendered, if any.
+    Walks the stack looking for template nodes, so it should only be called on rare events.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        origin = getattr(frame.f_locals.get("self"), "origin", None)
+        if isinstance(origin, Origin):
+            return origin.template_name or origin.name
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryRecorder:
+    """
+    A database execute wrapper recording queries slower than `threshold` seconds.
+    One every `explain_rate` slow SELECT queries is re-run under EXPLAIN ANALYZE.
+    """
+
+    def __init__(self, red: Redis, request: HttpRequest, threshold: float, explain_rate: int):
+        self.red = red
+        self.request = request
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration > self.threshold:
+            self.record(sql, params, many, context["connection"], duration)
+        return result
+
+    def record(self, sql, params, many, connection, duration: float):
+        plan = None
+        if (
+            not many
+            and self.explain_rate
+            and randrange(self.explain_rate) == 0
+            and sql.lstrip().upper().startswith("SELECT")
+        ):
+            plan = self.explain(connection, sql, params)
+
+        match = self.request.resolver_match
+        save_slow_query(
+            self.red,
+            {
+                "sql": sql[:MAX_SQL_LENGTH],
+                "database": connection.alias,
+                "duration": duration,
+                "view": match.view_name if match else "unresolved",
+                "template": current_template(),
+                "path": self.request.path,
+                "plan": plan,
+                "timestamp": time.time(),
+            },
+        )
+
+    def explain(self, connection, sql, params) -> str | None:
+        # EXPLAIN ANALYZE runs the query again. we do it in a savepoint so that a failure
+        # does not break the request transaction.
+        self._explaining = True
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    return "\n".join(row[0] for row in cursor.fetchall())
+        except DatabaseError:
+            return None
+        finally:
+            self._explaining = False
+
+
+def save_slow_query(red: Redis, record: dict):
+    pipe = red.pipeline()
+    pipe.lpush(RECORDS_KEY, json.dumps(record))
+    pipe.ltrim(RECORDS_KEY, 0, MAX_RECORDS - 1)
+    pipe.execute()
+
+
+def load_slow_queries(red: Redis) -> list[dict]:
+    return [json.loads(r) for r in red.lrange(RECORDS_KEY, 0, -1)]
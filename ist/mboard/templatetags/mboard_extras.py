@@ -1,6 +1,8 @@
-from urllib.parse import urlparse
-
 from django import template
+from django.template.defaulttags import CsrfTokenNode
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 from django.utils.timesince import timesince
 import mistune
 
@@ -9,6 +11,7 @@ register = template.Library()
 colors = {
     "all": "red-light",
     "news": "green-light",
+    "rising": "orange-light",
     "papers": "yellow-light",
     "code": "blue-light",
     "jobs": "magenta-light",
@@ -23,26 +26,6 @@ def board_color(header_text):
     return colors.get(header_text, "base-100")
 
 
-@register.filter
-def truncatesmart(value, limit=24):
-    """
-    Truncates a URL's domain+path after a given number of chars keeping whole words.
-    Uses urlparse for safe URL handling.
-    """
-    try:
-        limit = int(limit)
-    except ValueError:
-        return value
-
-    parsed = urlparse(value)
-    # Get domain and path, ignore scheme
-    display_url = parsed.netloc + parsed.path
-
-    if len(display_url) <= limit:
-        return display_url
-    return display_url.split("/", 1)[0] + "/.."
-
-
 @register.filter
 def timeago(value):
     return timesince(value, depth=1)
@@ -67,3 +50,112 @@ _markdown = mistune.create_markdown(
 @register.filter
 def markdown(value: str):
     return _markdown(value)
+
+
+# an id no comment will have for a while, reversed in place of real ids and replaced after.
+_ID_PLACEHOLDER = 9_876_543_210
+_COMMENT_URLS = [
+    "comment_upvote",
+    "comment_history",
+    "comment_detail",
+    "comment_delete",
+    "comment_edit",
+    "comment_reply",
+]
+
+
+def _url_pattern(name: str) -> tuple[str, str]:
+    """Reverses an URL taking an id, returning the parts before and after the id."""
+    prefix, _, suffix = reverse(name, args=(_ID_PLACEHOLDER,)).partition(str(_ID_PLACEHOLDER))
+    return prefix, suffix
+
+
+def _render_comment(comment, page: dict) -> str:
+    """Renders a comment as `mboard/includes/comment.html` does."""
+    urls = {name: f"{prefix}{comment.id}{suffix}" for name, (prefix, suffix) in page["urls"].items()}
+    if comment.deleted_at:
+        return (
+            '<div class="mb-2 flex gap-2"><div class="flex-none"></div><div class="flex-1">'
+            f'<div class="text-base-600 text-xs"> [deleted] {escape(timeago(comment.date))} ago'
+            f' | <a href="{urls["comment_detail"]}" class="hover:text-base-100 cursor-pointer">link</a>'
+            "</div></div></div>"
+        )
+    parts = ['<div class="mb-2 flex gap-2"><div class="flex-none">']
+    if page["authenticated"]:
+        parts.append(
+            f'{page["csrf_input"]}<a id="up_{comment.id}" onclick="upvoteComment(this)"'
+            f' data-upvote-url="{urls["comment_upvote"]}" data-redirect-url="{page["login_url"]}" class="cursor-pointer">'
+            f'<span class="{"hidden" if comment.is_fan else ""} grayscale opacity-30" data-state="inactive">🔥</span>'
+            f'<span class="{"" if comment.is_fan else "hidden"} grayscale-0 opacity-100" data-state="active">🔥</span>'
+            "</a>"
+        )
+    parts.append(
+        '</div><div class="flex-1"><div class="text-base-600 text-xs">'
+        f'<a href="{page["profile"][0]}{comment.user.id}{page["profile"][1]}"'
+        f' class="italic hover:text-base-100 cursor-pointer">{escape(comment.user)}</a>'
+        f" {escape(timeago(comment.date))} ago"
+    )
+    if comment.edited:
+        parts.append(f' <a href="{urls["comment_history"]}">*</a>')
+    parts.append(
+        f' • <span class="score" id="score_{comment.id}">{comment.nlikes} point{"" if comment.nlikes == 1 else "s"}</span>'
+        f' | <a href="{urls["comment_detail"]}" class="hover:text-base-100 cursor-pointer">link</a>'
+    )
+    if comment.user_id == page["user_id"] or page["is_mod"]:
+        parts.append(
+            f' | <a href="{urls["comment_delete"]}" class="hover:text-base-100 cursor-pointer">delete</a>'
+            f' | <a href="{urls["comment_edit"]}" class="hover:text-base-100 cursor-pointer">edit</a>'
+        )
+    parts.append(
+        '</div><div id="markdown" class="my-2 text-base-100 prose prose-invert prose-headings:text-base-100 prose-sm">'
+        f'{markdown(comment.content)}</div><div class="text-base-600 text-xs">'
+    )
+    if page["authenticated"]:
+        parts.append(f'<a href="{urls["comment_reply"]}" class="hover:text-base-100 cursor-pointer">reply</a>')
+    parts.append("</div></div></div>")
+    return "".join(parts)
+
+
+@register.simple_tag(takes_context=True)
+def comment_tree(context, comments, max_depth: int):
+    """
+    Renders comments and their replies, up to `max_depth`, as `mboard/includes/comments.html` does.
+    The tree is walked iteratively and URLs are reversed once per page, instead of once per comment and link.
+    Replies must be prefetched, see `CommentManager.with_nested_replies`.
+    """
+    user = context["request"].user
+    page = {
+        "urls": {name: _url_pattern(f"mboard:{name}") for name in _COMMENT_URLS},
+        "profile": _url_pattern("mboard:profile"),
+        "login_url": reverse("login"),
+        "authenticated": user.is_authenticated,
+        "user_id": user.id,
+        "is_mod": user.is_authenticated and user.has_mod_rights(),
+        "csrf_input": CsrfTokenNode().render(context),
+    }
+
+    # a stack of html snippets, comments to render, and (comment, depth) pairs whose replies are to render.
+    # items are pushed in reverse, so that they pop in document order.
+    stack = []
+    for comment in reversed(list(comments)):
+        stack += ["</ul>", (comment, 1), '<ul class="ml-8">', "</div>", comment, "<div>"]
+    html = []
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            html.append(item)
+        elif isinstance(item, tuple):
+            parent, depth = item
+            for reply in reversed(list(parent.replies.all())):
+                if depth < max_depth:
+                    stack += ["</ul>", (reply, depth + 1), '<ul class="ml-8">', reply]
+                else:
+                    stack += [
+                        '<div class="mb-4 text-xs text-base-600 hover:text-base-100 cursor-pointer">'
+                        f'<a href="{page["urls"]["comment_detail"][0]}{reply.id}{page["urls"]["comment_detail"][1]}">'
+                        "more replies...</a></div>",
+                        reply,
+                    ]
+        else:
+            html.append(_render_comment(item, page))
+    return mark_safe("".join(html))
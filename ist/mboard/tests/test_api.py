@@ -0,0 +1,150 @@
+"""
+JSON API Tests:
+
+[v] Test feeds walk every post once through cursor pages, with pinned posts first
+[v] Test cursor pages stay stable when posts are submitted meanwhile
+[v] Test field selection, and errors for unknown fields, bad limits and bad cursors
+[v] Test a post comes with its comment trees, cut at the maximum depth
+[v] Test comment trees take one query per level
+[v] Test profiles, their posts and their comments
+[v] Test deleted posts and comments are left out of lists, and emptied in threads
+[v] Test api feeds answer conditional GETs
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Board
+from ..models import Comment
+from ..models import Post
+from ..models import save_deleted_comment
+from ..models import save_deleted_post
+from ..settings import MAX_DEPTH
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.board = Board.objects.create(name=Board.Boards.PAPERS)
+        self.posts = [
+            Post.objects.create(
+                title=f"post {i}",
+                url=f"https://example.com/{i}",
+                user=self.user,
+                # ties on score, broken by date and id.
+                score=i % 3,
+                board=self.board if i % 2 else None,
+            )
+            for i in range(10)
+        ]
+
+    def walk(self, url: str) -> list[dict]:
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            results += response.json()["results"]
+            url = response.json()["next"]
+        return results
+
+    def test_feeds(self):
+        self.posts[0].pinned = True
+        self.posts[0].save()
+        ids = [post["id"] for post in self.walk(f"{reverse('mboard:api_index')}?limit=3")]
+        expected = sorted(self.posts, key=lambda post: (post.pinned, post.score, post.date, post.id), reverse=True)
+        self.assertEqual(ids, [post.id for post in expected])
+        papers = self.walk(f"{reverse('mboard:api_papers')}?limit=2")
+        self.assertEqual({post["id"] for post in papers}, {post.id for post in self.posts[1::2]})
+        self.assertTrue(all(post["board_name"] == "p" for post in papers))
+
+    def test_stable_pages(self):
+        response = self.client.get(f"{reverse('mboard:api_news')}?limit=4")
+        first = [post["id"] for post in response.json()["results"]]
+        Post.objects.create(title="new", url="https://example.com/new", user=self.user)
+        second = self.client.get(response.json()["next"]).json()["results"]
+        self.assertEqual([post["id"] for post in second], [post.id for post in self.posts[::-1][4:8]])
+        self.assertEqual(first, [post.id for post in self.posts[::-1][:4]])
+
+    def test_fields_and_errors(self):
+        url = reverse("mboard:api_news")
+        response = self.client.get(f"{url}?fields=title,username&limit=1")
+        self.assertEqual(response.json()["results"], [{"title": "post 9", "username": "test-user"}])
+        self.assertEqual(self.client.get(f"{url}?fields=title,password").status_code, 400)
+        self.assertEqual(self.client.get(f"{url}?limit=0").status_code, 400)
+        self.assertEqual(self.client.get(f"{url}?limit=many").status_code, 400)
+        self.assertEqual(self.client.get(f"{url}?cursor=garbage").status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 405)
+        response = self.client.get(reverse("mboard:api_post_detail", args=(0,)))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "not found"})
+
+    def create_chain(self, post: Post, length: int) -> list[Comment]:
+        parent, chain = None, []
+        for i in range(length):
+            parent = Comment.objects.create(content=f"reply {i}", post=post, user=self.user, parent=parent)
+            chain.append(parent)
+        return chain
+
+    def test_post_detail(self):
+        post = self.posts[0]
+        chain = self.create_chain(post, MAX_DEPTH + 2)
+        other = Comment.objects.create(content="other", post=post, user=self.user)
+        response = self.client.get(f"{reverse('mboard:api_post_detail', args=(post.id,))}?comment_fields=content")
+        data = response.json()
+        self.assertEqual(data["post"]["title"], post.title)
+        self.assertEqual(data["comments"][0], {"content": "other", "replies": []})
+        node = data["comments"][1]
+        for comment in chain[:MAX_DEPTH]:
+            self.assertEqual(node["content"], comment.content)
+            node = node["replies"][0]
+        self.assertEqual(node, {"content": chain[MAX_DEPTH].content, "replies": None})
+        response = self.client.get(reverse("mboard:api_comment_detail", args=(chain[MAX_DEPTH].id,)))
+        self.assertEqual(response.json()["comment"]["replies"][0]["id"], chain[-1].id)
+        response = self.client.get(f"{reverse('mboard:api_post_detail', args=(post.id,))}?limit=1")
+        self.assertEqual([comment["id"] for comment in response.json()["comments"]], [other.id])
+
+    def test_comment_tree_queries(self):
+        post = self.posts[0]
+        for _ in range(5):
+            self.create_chain(post, MAX_DEPTH + 1)
+        url = reverse("mboard:api_post_detail", args=(post.id,))
+        # the post, the top comments, one query per level and one for the replies beyond.
+        with self.assertNumQueries(3 + MAX_DEPTH):
+            self.client.get(url)
+
+    def test_profile(self):
+        comment = Comment.objects.create(content="comment", post=self.posts[0], user=self.user)
+        response = self.client.get(reverse("mboard:api_profile", args=(self.user.id,)))
+        self.assertEqual(response.json()["user"]["post_count"], len(self.posts))
+        self.assertNotIn("password", response.json()["user"])
+        posts = self.walk(reverse("mboard:api_profile_posts", args=(self.user.id,)))
+        self.assertEqual(len(posts), len(self.posts))
+        comments = self.walk(reverse("mboard:api_profile_comments", args=(self.user.id,)))
+        self.assertEqual([c["id"] for c in comments], [comment.id])
+        self.assertEqual(self.client.get(reverse("mboard:api_profile_posts", args=(0,))).status_code, 404)
+
+    def test_tombstones(self):
+        post = self.posts[0]
+        parent = Comment.objects.create(content="deleted", post=post, user=self.user)
+        Comment.objects.create(content="reply", post=post, user=self.user, parent=parent)
+        save_deleted_comment(parent)
+        save_deleted_post(post)
+        self.assertNotIn(post.id, [row["id"] for row in self.walk(reverse("mboard:api_news"))])
+        response = self.client.get(reverse("mboard:api_post_detail", args=(post.id,)))
+        self.assertEqual(response.json()["post"]["title"], None)
+        self.assertIsNotNone(response.json()["post"]["deleted_at"])
+        (tombstone,) = response.json()["comments"]
+        self.assertEqual((tombstone["content"], tombstone["username"]), (None, None))
+        self.assertEqual(tombstone["replies"][0]["content"], "reply")
+        comments = self.walk(reverse("mboard:api_profile_comments", args=(self.user.id,)))
+        self.assertEqual([c["content"] for c in comments], ["reply"])
+
+    def test_not_modified(self):
+        url = reverse("mboard:api_index")
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
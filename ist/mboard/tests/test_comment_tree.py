@@ -0,0 +1,75 @@
+"""
+Comment Tree Tests:
+
+[v] Test the comment tree tag renders as the recursive templates, for visitors, authors and moderators, tombstones included
+[v] Test the comment tree tag does not query replies beyond those prefetched
+"""
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.template import RequestContext
+from django.template import Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test import TestCase
+
+from ..models import Comment
+from ..models import Post
+from ..models import save_deleted_comment
+from ..models import save_edited_comment
+from ..settings import MAX_DEPTH
+
+
+def normalize(html: str) -> str:
+    # csrf tokens are masked differently at each render.
+    html = re.sub(r'name="csrfmiddlewaretoken" value="[^"]+"', 'name="csrfmiddlewaretoken"', html)
+    html = re.sub(r"<!--.*?-->", "", html, flags=re.DOTALL)
+    html = re.sub(r"\s+", " ", html)
+    return re.sub(r">\s+<", "><", html).strip()
+
+
+class CommentTreeTests(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username="author")
+        self.other = get_user_model().objects.create_user(username="other")
+        self.mod = get_user_model().objects.create_user(username="mod", status=get_user_model().Status.MODERATOR)
+        self.post = Post.objects.create(title="title", url="https://example.com", user=self.author)
+        for i in range(3):
+            parent = Comment.objects.create(content=f"**top** <{i}> & co", post=self.post, user=self.author)
+            # a chain longer than the maximum depth, with branches.
+            for depth in range(MAX_DEPTH + 1):
+                Comment.objects.create(content=f"sibling {depth}", post=self.post, user=self.other, parent=parent)
+                parent = Comment.objects.create(
+                    content=f"reply {depth}", post=self.post, user=self.other, parent=parent, nlikes=1
+                )
+        save_edited_comment("edited *content*", Comment.objects.filter(parent=None).first())
+        save_deleted_comment(Comment.objects.filter(content="reply 0").first())
+        self.factory = RequestFactory()
+
+    def render_both(self, user) -> tuple[str, str]:
+        request = self.factory.get("/")
+        request.user = user
+        comments = Comment.objects.with_nested_replies(MAX_DEPTH, user).filter(parent=None, post=self.post)
+        context = {"comments": comments.order_by("-date"), "max_depth": MAX_DEPTH}
+        expected = render_to_string("mboard/includes/comments.html", context, request=request)
+        context = {"comments": comments.order_by("-date"), "max_depth": MAX_DEPTH}
+        template = Template("{% load mboard_extras %}{% comment_tree comments max_depth %}")
+        return expected, template.render(RequestContext(request, context))
+
+    def test_same_html(self):
+        for user in (AnonymousUser(), self.author, self.other, self.mod):
+            with self.subTest(user=user):
+                expected, rendered = self.render_both(user)
+                self.assertEqual(normalize(rendered), normalize(expected))
+                self.assertIn("more replies...", rendered)
+                self.assertIn("[deleted]", rendered)
+
+    def test_no_queries_beyond_prefetch(self):
+        request = self.factory.get("/")
+        request.user = self.author
+        comments = list(Comment.objects.with_nested_replies(MAX_DEPTH, self.author).filter(parent=None, post=self.post))
+        template = Template("{% load mboard_extras %}{% comment_tree comments max_depth %}")
+        with self.assertNumQueries(0):
+            template.render(RequestContext(request, {"comments": comments, "max_depth": MAX_DEPTH}))
@@ -0,0 +1,66 @@
+"""
+Co-voting Tests:
+
+[v] Test users voting for the same posts are clustered, with their author
+[v] Test occasional shared votes, popular posts and old votes are left out
+[v] Test the command reports clusters, and mails them to the admins and moderators
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..covoting import find_rings
+from ..covoting import sparse
+from ..models import PostVote
+from ..models import save_new_like
+from ..models import save_new_post
+
+
+@skipIf(sparse is None, "scipy is not installed")
+class CovotingTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.author = User.objects.create_user(username="author")
+        self.ring = [User.objects.create_user(username=f"ring{i}") for i in range(3)]
+        self.users = [User.objects.create_user(username=f"user{i}") for i in range(3)]
+        self.posts = [save_new_post(f"post {i}", self.author, f"https://example.com/{i}", None) for i in range(6)]
+        for user in self.ring:
+            for post in self.posts:
+                save_new_like(post, user)
+        for user, post in zip(self.users, self.posts):
+            save_new_like(post, user)
+        save_new_like(self.posts[0], self.users[1])
+
+    def test_ring(self):
+        (cluster,) = find_rings(size=4)
+        self.assertEqual(cluster["user_ids"], [self.author.id, *[user.id for user in self.ring]])
+        self.assertEqual((cluster["pairs"], cluster["shared"], cluster["similarity"]), (6, 6, 1.0))
+
+    def test_left_out(self):
+        self.assertEqual(find_rings(min_shared=7), [])
+        # the first posts have more voters than the others, the remaining shared votes are too few.
+        self.assertEqual(find_rings(max_voters=4, min_shared=4), [])
+        self.assertEqual(len(find_rings(max_voters=4, min_shared=3)), 1)
+        PostVote.objects.filter(customuser__in=self.ring).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(find_rings(since=timezone.now() - timedelta(days=1)), [])
+
+    def test_command(self):
+        User = get_user_model()
+        User.objects.create_user(username="moderator", email="moderator@example.com", status=User.Status.MODERATOR)
+        User.objects.create_user(username="staff", email="staff@example.com", is_staff=True)
+        stdout = StringIO()
+        call_command("covoting", "--mail", stdout=stdout, stderr=StringIO())
+        report = "4 users (author, ring0, ring1, ring2): 6 pairs, up to 6 shared votes, similarity 1.00.\n"
+        self.assertEqual(stdout.getvalue(), report)
+        (message,) = mail.outbox
+        self.assertEqual(message.to, ["moderator@example.com"])
+        stdout = StringIO()
+        call_command("covoting", "--min-similarity", "1.1", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "No suspicious clusters.\n")
@@ -0,0 +1,96 @@
+"""
+Export Tests:
+
+[v] Test posts, comments and votes export as JSON lines and CSV, ordered by id
+[v] Test incremental exports after an id or since a timestamp
+[v] Test votes export since a timestamp, those cast before it was recorded are left out
+[v] Test the export endpoint streams, for staff only
+[v] Test emails are only exported on request, never by the endpoint
+"""
+
+import csv
+from datetime import timedelta
+from io import StringIO
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment
+from ..models import Post
+from ..models import PostVote
+from ..models import save_new_like
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="test-user", email="test@example.com", password="test-password"
+        )
+        self.posts = [
+            Post.objects.create(title=f"post {i}", url=f"https://example.com/{i}", user=self.user) for i in range(3)
+        ]
+        self.comment = Comment.objects.create(
+            content='a "quoted",\nmultiline comment', post=self.posts[0], user=self.user
+        )
+        save_new_like(self.posts[1], self.user)
+        save_new_like(self.comment, self.user)
+
+    def export(self, *args) -> tuple[str, str]:
+        stdout, stderr = StringIO(), StringIO()
+        call_command("export", *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_jsonl(self):
+        output, summary = self.export("posts")
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([row["id"] for row in rows], [post.id for post in self.posts])
+        self.assertEqual(rows[0]["date"], self.posts[0].date.isoformat())
+        self.assertIn(f"Exported 3 posts, last id {self.posts[-1].id}.", summary)
+        output, _ = self.export("post_votes")
+        self.assertEqual(json.loads(output)["post_id"], self.posts[1].id)
+
+    def test_csv(self):
+        output, _ = self.export("comments", "--format", "csv")
+        header, row = list(csv.reader(StringIO(output)))
+        self.assertEqual(dict(zip(header, row))["content"], self.comment.content)
+        output, _ = self.export("comment_votes", "--format", "csv")
+        self.assertEqual(list(csv.DictReader(StringIO(output)))[0]["comment_id"], str(self.comment.id))
+
+    def test_incremental(self):
+        output, _ = self.export("posts", "--after-id", str(self.posts[0].id))
+        self.assertEqual([json.loads(line)["id"] for line in output.splitlines()], [p.id for p in self.posts[1:]])
+        Post.objects.filter(pk=self.posts[2].pk).update(date=self.posts[2].date + timedelta(days=1))
+        since = (self.posts[2].date + timedelta(hours=1)).isoformat()
+        output, _ = self.export("posts", "--since", since)
+        self.assertEqual([json.loads(line)["id"] for line in output.splitlines()], [self.posts[2].id])
+        output, _ = self.export("post_votes", "--since", self.posts[1].date.isoformat())
+        self.assertEqual([json.loads(line)["post_id"] for line in output.splitlines()], [self.posts[1].id])
+        PostVote.objects.update(created_at=None)
+        self.assertEqual(self.export("post_votes", "--since", self.posts[1].date.isoformat())[0], "")
+
+    def test_endpoint(self):
+        url = reverse("mboard:export", args=("posts", "csv"))
+        self.client.login(username="test-user", password="test-password")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="posts.csv"')
+        self.assertEqual(len(list(csv.reader(StringIO(response.getvalue().decode())))), 4)
+        self.assertEqual(self.client.get(f"{url}?since=yesterday").status_code, 400)
+        self.assertEqual(self.client.get(reverse("mboard:export", args=("sessions", "csv"))).status_code, 404)
+
+    def test_private(self):
+        output, _ = self.export("users")
+        self.assertNotIn("email", json.loads(output))
+        output, _ = self.export("users", "--private")
+        self.assertEqual(json.loads(output)["email"], "test@example.com")
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login(username="test-user", password="test-password")
+        response = self.client.get(reverse("mboard:export", args=("users", "jsonl")), {"private": "1"})
+        self.assertNotIn(b"test@example.com", response.getvalue())
@@ -0,0 +1,89 @@
+"""
+Syndication Feed Tests:
+
+[v] Test rss and atom feeds list the newest posts
+[v] Test board and keyword feeds list only their posts
+[v] Test new posts are pushed to the cached entries of their feeds
+[v] Test edits and deletes drop the cached entries, which are rebuilt
+[v] Test polls answer 304 without queries while unchanged, and votes do not change feeds
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..feeds import ENTRIES_KEY
+from ..feeds import entries
+from ..middleware import redis_default
+from ..models import Board
+from ..models import Keyword
+from ..models import save_deleted_post
+from ..models import save_edited_post
+from ..models import save_new_like
+from ..models import save_new_post
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for key in redis_default.scan_iter(ENTRIES_KEY.format(feed="*")):
+            redis_default.delete(key)
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.papers = Board.objects.create(name=Board.Boards.PAPERS)
+        self.galaxies = Keyword.objects.create(name=Keyword.Keywords.GALAXIES)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.paper = save_new_post("paper", self.user, "https://arxiv.org/abs/2401.01234", self.papers)
+            self.repo = save_new_post("repo", self.user, "https://github.com/user/repo", None, [self.galaxies])
+
+    def test_newest(self):
+        response = self.client.get(reverse("mboard:rss", kwargs={"feed": "all"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("application/rss+xml"))
+        content = response.content.decode()
+        self.assertLess(content.index("<title>repo</title>"), content.index("<title>paper</title>"))
+        self.assertIn(reverse("mboard:post_detail", args=(self.paper.id,)), content)
+        response = self.client.get(reverse("mboard:atom", kwargs={"feed": "all"}))
+        self.assertTrue(response["Content-Type"].startswith("application/atom+xml"))
+        self.assertContains(response, "<title>paper</title>")
+
+    def test_board_and_keyword(self):
+        response = self.client.get("/feeds/boards/papers/rss/")
+        self.assertContains(response, "<title>paper</title>")
+        self.assertNotContains(response, "<title>repo</title>")
+        response = self.client.get("/feeds/keywords/galaxies/atom/")
+        self.assertContains(response, "<title>repo</title>")
+        self.assertNotContains(response, "<title>paper</title>")
+
+    def test_new_posts_pushed(self):
+        self.assertEqual(len(entries(redis_default, "all")), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = save_new_post("new paper", self.user, "https://arxiv.org/abs/2401.05678", self.papers)
+        with self.assertNumQueries(0):
+            newest = entries(redis_default, "all")
+        self.assertEqual([entry["id"] for entry in newest], [post.id, self.repo.id, self.paper.id])
+        # feeds never read are left to be built from the database.
+        self.assertFalse(redis_default.exists(ENTRIES_KEY.format(feed="board:p")))
+
+    def test_edits_and_deletes(self):
+        entries(redis_default, "all")
+        with self.captureOnCommitCallbacks(execute=True):
+            save_edited_post("edited paper", self.paper)
+        self.assertFalse(redis_default.exists(ENTRIES_KEY.format(feed="all")))
+        self.assertEqual(entries(redis_default, "all")[1]["title"], "edited paper")
+        with self.captureOnCommitCallbacks(execute=True):
+            save_deleted_post(self.repo)
+        self.assertEqual([entry["id"] for entry in entries(redis_default, "all")], [self.paper.id])
+
+    def test_not_modified(self):
+        url = reverse("mboard:rss", kwargs={"feed": "all"})
+        etag = self.client.get(url)["ETag"]
+        voter = get_user_model().objects.create_user(username="voter")
+        with self.captureOnCommitCallbacks(execute=True):
+            save_new_like(self.paper, voter)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            save_new_post("new paper", self.user, "https://arxiv.org/abs/2401.05678", self.papers)
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
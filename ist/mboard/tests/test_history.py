@@ -0,0 +1,104 @@
+"""
+History Tests:
+
+[v] Test history tables are partitioned and edits land in a partition
+[v] Test compaction keeps the original and recent revisions
+[v] Test partitions are created ahead and old ones dropped
+
+[v] Test line diffs
+[v] Test revisions are paged by cursor with diffs against the following revision
+[v] Test diffs are cached
+"""
+
+from datetime import date
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ..history import PARTITION_NAME
+from ..history import compact
+from ..history import create_partitions
+from ..history import drop_partitions
+from ..history import line_diff
+from ..history import partitions
+from ..history import revisions
+from ..models import Comment
+from ..models import CommentHistory
+from ..models import Post
+from ..models import save_edited_comment
+
+
+class HistoryMaintenanceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.post = Post.objects.create(title="title", url="https://example.com", user=self.user)
+        self.comment = Comment.objects.create(content="v0", post=self.post, user=self.user)
+        for i in range(1, 5):
+            save_edited_comment(f"v{i}", self.comment)
+
+    def test_history_is_partitioned(self):
+        table = CommentHistory._meta.db_table
+        self.assertIn(f"{table}_default", partitions(CommentHistory))
+        self.assertIn(PARTITION_NAME.format(table=table, month=timezone.now()), partitions(CommentHistory))
+        self.assertEqual(CommentHistory.objects.filter(pgh_obj=self.comment).count(), 4)
+
+    def test_compaction_keeps_original(self):
+        events = CommentHistory.objects.filter(pgh_obj=self.comment).order_by("pgh_id")
+        # the last revision is recent, the others are old.
+        cutoff = events[3].pgh_created_at
+        CommentHistory.objects.filter(pgh_id__in=[e.pgh_id for e in events[:3]]).update(
+            pgh_created_at=cutoff - timedelta(days=1)
+        )
+        ndeleted = compact(CommentHistory, before=cutoff, batch_size=1)
+        self.assertEqual(ndeleted, 2)
+        self.assertEqual(
+            list(
+                CommentHistory.objects.filter(pgh_obj=self.comment).order_by("pgh_id").values_list("content", flat=True)
+            ),
+            ["v0", "v3"],
+        )
+
+    def test_create_and_drop_partitions(self):
+        table = CommentHistory._meta.db_table
+        created, skipped = create_partitions(CommentHistory, date(2000, 1, 1), months=2)
+        self.assertEqual(created, [f"{table}_p200001", f"{table}_p200002"])
+        self.assertEqual(skipped, [])
+        dropped = drop_partitions(CommentHistory, before=timezone.now().replace(year=2000, month=2, day=15))
+        self.assertEqual(dropped, [f"{table}_p200001"])
+        self.assertNotIn(f"{table}_p200001", partitions(CommentHistory))
+
+
+class RevisionsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.post = Post.objects.create(title="title", url="https://example.com", user=self.user)
+        self.comment = Comment.objects.create(content="v0", post=self.post, user=self.user)
+        for i in range(1, 6):
+            save_edited_comment(f"v{i}", self.comment)
+
+    def test_line_diff(self):
+        self.assertEqual(
+            line_diff("a\nb\nc", "a\nB\nc"),
+            [(" ", "a"), ("-", "b"), ("+", "B"), (" ", "c")],
+        )
+
+    def test_pagination(self):
+        page, cursor = revisions(CommentHistory, self.comment, "content", None, 2)
+        self.assertEqual([r["diff"] for r in page], [[("-", "v4"), ("+", "v5")], [("-", "v3"), ("+", "v4")]])
+        page, cursor = revisions(CommentHistory, self.comment, "content", cursor, 2)
+        self.assertEqual([r["diff"] for r in page], [[("-", "v2"), ("+", "v3")], [("-", "v1"), ("+", "v2")]])
+        page, cursor = revisions(CommentHistory, self.comment, "content", cursor, 2)
+        self.assertEqual([r["diff"] for r in page], [[("-", "v0"), ("+", "v1")]])
+        self.assertIsNone(cursor)
+
+    def test_diffs_are_cached(self):
+        cache.clear()
+        first_page, _ = revisions(CommentHistory, self.comment, "content", None, 5)
+        with patch("mboard.history.line_diff") as line_diff_mock:
+            page, _ = revisions(CommentHistory, self.comment, "content", None, 5)
+        line_diff_mock.assert_not_called()
+        self.assertEqual(page, first_page)
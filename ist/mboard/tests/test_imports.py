@@ -0,0 +1,123 @@
+"""
+Import Tests:
+
+[v] Test an export imports back, with comment trees, votes, counters and scores
+[v] Test users are matched by username and posts by url, new comments join existing posts
+[v] Test rows referring to missing rows are skipped
+[v] Test indexes and foreign keys dropped for a first import are rebuilt
+"""
+
+from io import StringIO
+import json
+from pathlib import Path
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Comment
+from ..models import Post
+from ..models import save_new_comment
+from ..models import save_new_like
+from ..models import save_new_post
+from ..scores import compute_score
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.author = get_user_model().objects.create_user(username="author")
+        self.voter = get_user_model().objects.create_user(username="voter")
+        self.post = save_new_post("paper", self.author, "https://arxiv.org/abs/2401.01234v2", None)
+        save_new_like(self.post, self.voter)
+        parent = None
+        for i in range(3):
+            parent = save_new_comment(f"reply {i}", self.voter, self.post, parent)
+        save_new_like(parent, self.author)
+
+    def export(self):
+        for table in ["users", "posts", "comments", "post_votes", "comment_votes"]:
+            call_command("export", table, "--output", str(self.root / f"{table}.jsonl"), stderr=StringIO())
+
+    def import_(self) -> str:
+        stdout = StringIO()
+        call_command("importjsonl", str(self.root), stdout=stdout)
+        return stdout.getvalue()
+
+    def test_roundtrip(self):
+        self.export()
+        Post.objects.all().delete()
+        get_user_model().objects.all().delete()
+        output = self.import_()
+        self.assertIn("comments: imported 3 of 3 rows.", output)
+        post = Post.objects.get()
+        self.assertEqual((post.title, post.domain, post.user.username), ("paper", "arxiv.org", "author"))
+        self.assertEqual((post.nlikes, post.ncomments), (2, 3))
+        self.assertAlmostEqual(post.score, compute_score(2, post.date), places=4)
+        self.assertEqual(set(post.fans.values_list("username", flat=True)), {"author", "voter"})
+        comment = Comment.objects.get(parent=None)
+        contents = []
+        while comment is not None:
+            contents.append(comment.content)
+            last, comment = comment, comment.replies.first()
+        self.assertEqual(contents, ["reply 0", "reply 1", "reply 2"])
+        self.assertEqual(last.nlikes, 2)
+        self.assertFalse(get_user_model().objects.get(username="voter").has_usable_password())
+
+    def test_merge(self):
+        self.export()
+        # another community discussed the same paper, under another url.
+        (self.root / "posts.jsonl").write_text(
+            json.dumps({"id": 1, "title": "same", "url": "https://arxiv.org/pdf/2401.01234", "user_id": 7}) + "\n"
+        )
+        (self.root / "users.jsonl").write_text(
+            json.dumps({"id": 7, "username": "author"}) + "\n" + json.dumps({"id": 8, "username": "newcomer"}) + "\n"
+        )
+        (self.root / "comments.jsonl").write_text(
+            json.dumps({"id": 1, "post_id": 1, "parent_id": None, "user_id": 8, "content": "hello"})
+            + "\n"
+            + json.dumps({"id": 2, "post_id": 1, "parent_id": 1, "user_id": 7, "content": "hi"})
+            + "\n"
+        )
+        (self.root / "post_votes.jsonl").write_text(json.dumps({"id": 1, "post_id": 1, "user_id": 8}) + "\n")
+        (self.root / "comment_votes.jsonl").unlink()
+        self.import_()
+        self.assertEqual(Post.objects.get().title, "paper")
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.nlikes, self.post.ncomments), (3, 5))
+        self.assertEqual(get_user_model().objects.count(), 3)
+        reply = Comment.objects.get(content="hi")
+        self.assertEqual((reply.user, reply.parent.content, reply.post), (self.author, "hello", self.post))
+
+    def test_orphans(self):
+        (self.root / "users.jsonl").write_text(json.dumps({"id": 1, "username": "newcomer"}) + "\n")
+        (self.root / "posts.jsonl").write_text(
+            json.dumps({"id": 1, "title": "orphan", "url": "https://example.com/1", "user_id": 2})
+            + "\n"
+            + json.dumps({"id": 2, "title": "post", "url": "https://example.com/2", "user_id": 1})
+            + "\n"
+        )
+        (self.root / "comments.jsonl").write_text(
+            json.dumps({"id": 1, "post_id": 1, "parent_id": None, "user_id": 1, "content": "on orphan post"})
+            + "\n"
+            + json.dumps({"id": 2, "post_id": 2, "parent_id": 5, "user_id": 1, "content": "missing parent"})
+            + "\n"
+            + json.dumps({"id": 3, "post_id": 2, "parent_id": 2, "user_id": 1, "content": "missing grandparent"})
+            + "\n"
+        )
+        output = self.import_()
+        self.assertIn("posts: imported 1 of 2 rows.", output)
+        self.assertIn("comments: imported 0 of 3 rows.", output)
+        self.assertEqual(Post.objects.get(title="post").ncomments, 0)
+
+    def test_rebuilt_indexes(self):
+        self.export()
+        tables = [Post._meta.db_table, Comment._meta.db_table, Post.fans.through._meta.db_table]
+        with connection.cursor() as cursor:
+            before = [connection.introspection.get_constraints(cursor, table) for table in tables]
+            # the exported rows outnumber the rows left, their tables are loaded without indexes.
+            Comment.objects.all().delete()
+            self.import_()
+            self.assertEqual([connection.introspection.get_constraints(cursor, table) for table in tables], before)
@@ -0,0 +1,126 @@
+"""
+Jobs Tests:
+
+[v] Test enqueued jobs are run by the worker
+[v] Test jobs are enqueued only once the transaction commits
+[v] Test jobs of dead workers are requeued, those of live ones are not
+[v] Test failing jobs are retried with backoff, then moved to the failed list
+[v] Test only the leader enqueues periodic jobs, once per interval
+[v] Test the queued email backend sends emails from the worker
+"""
+
+from datetime import timedelta
+import json
+import time
+from unittest.mock import patch
+
+from django.core import mail
+from django.test import TestCase
+from django.test import override_settings
+
+from ..jobs import FAILED_KEY
+from ..jobs import HEARTBEAT_KEY
+from ..jobs import LAST_RUN_KEY
+from ..jobs import LEADER_KEY
+from ..jobs import PERIODIC_JOBS
+from ..jobs import PROCESSING_KEY
+from ..jobs import QUEUE_KEY
+from ..jobs import SCHEDULED_KEY
+from ..jobs import WORKERS_KEY
+from ..jobs import enqueue
+from ..jobs import enqueue_periodic
+from ..jobs import heartbeat
+from ..jobs import job
+from ..jobs import promote_scheduled
+from ..jobs import requeue_stale
+from ..jobs import work
+from ..middleware import redis_default
+
+calls = []
+
+
+@job(retries=1)
+def record(value):
+    calls.append(value)
+
+
+@job(retries=1)
+def fail():
+    raise RuntimeError("failed")
+
+
+class JobsTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        redis_default.delete(QUEUE_KEY, SCHEDULED_KEY, FAILED_KEY, LEADER_KEY, LAST_RUN_KEY, WORKERS_KEY)
+        for worker_id in ("worker", "dead", "alive"):
+            redis_default.delete(PROCESSING_KEY.format(worker_id=worker_id), HEARTBEAT_KEY.format(worker_id=worker_id))
+        # periodic jobs registered by the app would be enqueued by the worker.
+        patcher = patch.dict(PERIODIC_JOBS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enqueue_and_work(self):
+        enqueue(redis_default, record.job_name, ["a"])
+        self.assertTrue(work(redis_default, "worker", timeout=1))
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(redis_default.llen(PROCESSING_KEY.format(worker_id="worker")), 0)
+        self.assertFalse(work(redis_default, "worker", timeout=1))
+        with self.assertRaises(KeyError):
+            enqueue(redis_default, "mboard.nothing", [])
+
+    def test_enqueue_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            record.enqueue("b")
+            self.assertEqual(redis_default.llen(QUEUE_KEY), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(redis_default.llen(QUEUE_KEY), 1)
+
+    def test_requeue_stale(self):
+        for worker_id in ("dead", "alive"):
+            heartbeat(redis_default, worker_id)
+            enqueue(redis_default, record.job_name, [worker_id])
+            # the worker is killed while running the job.
+            redis_default.lmove(QUEUE_KEY, PROCESSING_KEY.format(worker_id=worker_id), "RIGHT", "LEFT")
+        redis_default.delete(HEARTBEAT_KEY.format(worker_id="dead"))
+        self.assertEqual(requeue_stale(redis_default), 1)
+        self.assertEqual(redis_default.smembers(WORKERS_KEY), {b"alive"})
+        self.assertEqual(redis_default.llen(PROCESSING_KEY.format(worker_id="alive")), 1)
+        work(redis_default, "worker", timeout=1)
+        self.assertEqual(calls, ["dead"])
+
+    def test_retries(self):
+        enqueue(redis_default, fail.job_name)
+        work(redis_default, "worker", timeout=1)
+        # the retry waits for its backoff.
+        self.assertEqual(redis_default.zcard(SCHEDULED_KEY), 1)
+        self.assertEqual(promote_scheduled(redis_default, time.time()), 0)
+        self.assertEqual(promote_scheduled(redis_default, time.time() + 3600), 1)
+
+        work(redis_default, "worker", timeout=1)
+        self.assertEqual(redis_default.zcard(SCHEDULED_KEY), 0)
+        failed = json.loads(redis_default.lindex(FAILED_KEY, 0))
+        self.assertEqual((failed["name"], failed["attempt"]), (fail.job_name, 1))
+
+    def test_periodic_jobs_leader(self):
+        PERIODIC_JOBS[record.job_name] = timedelta(minutes=1)
+        now = time.time()
+        self.assertEqual(enqueue_periodic(redis_default, "leader", now), [record.job_name])
+        self.assertEqual(enqueue_periodic(redis_default, "follower", now + 120), [])
+        self.assertEqual(enqueue_periodic(redis_default, "leader", now + 30), [])
+        self.assertEqual(enqueue_periodic(redis_default, "leader", now + 60), [record.job_name])
+        self.assertEqual(redis_default.llen(QUEUE_KEY), 2)
+
+    @override_settings(
+        EMAIL_BACKEND="mboard.mail.QueuedEmailBackend",
+        QUEUED_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    )
+    def test_queued_email_backend(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mail.send_mail("subject", "body", "from@example.com", ["to@example.com"], html_message="<p>body</p>")
+        self.assertEqual(len(mail.outbox), 0)
+        work(redis_default, "worker", timeout=1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "subject")
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
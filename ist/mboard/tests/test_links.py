@@ -0,0 +1,53 @@
+"""
+Links Tests:
+
+[v] Test arXiv abstract, pdf and versioned urls share a canonical url
+[v] Test DOI extraction from doi.org and publisher urls
+[v] Test generic urls are normalized
+[v] Test url hash ignores irrelevant differences
+"""
+
+from django.test import SimpleTestCase
+
+from ..links import arxiv_id
+from ..links import canonicalize_url
+from ..links import doi
+from ..links import url_hash
+
+
+class CanonicalizeUrlTests(SimpleTestCase):
+    def test_arxiv(self):
+        urls = [
+            "https://arxiv.org/abs/2401.01234",
+            "https://arxiv.org/abs/2401.01234v2",
+            "http://arxiv.org/pdf/2401.01234v1.pdf",
+            "https://www.arxiv.org/pdf/2401.01234",
+            "arxiv.org/abs/2401.01234/",
+        ]
+        for url in urls:
+            self.assertEqual(arxiv_id(url), "2401.01234")
+            self.assertEqual(canonicalize_url(url), "https://arxiv.org/abs/2401.01234")
+        self.assertEqual(arxiv_id("https://arxiv.org/abs/astro-ph/0601001v3"), "astro-ph/0601001")
+        self.assertIsNone(arxiv_id("https://arxiv.org/list/astro-ph/new"))
+
+    def test_doi(self):
+        self.assertEqual(doi("https://doi.org/10.1093/MNRAS/stab123"), "10.1093/mnras/stab123")
+        self.assertEqual(doi("https://dx.doi.org/10.1093/mnras/stab123"), "10.1093/mnras/stab123")
+        self.assertEqual(doi("https://onlinelibrary.wiley.com/doi/full/10.1002/asna.2023"), "10.1002/asna.2023")
+        self.assertIsNone(doi("https://example.com/10.1002/asna.2023"))
+        self.assertEqual(
+            canonicalize_url("https://onlinelibrary.wiley.com/doi/pdf/10.1002/ASNA.2023"),
+            "https://doi.org/10.1002/asna.2023",
+        )
+
+    def test_generic(self):
+        self.assertEqual(
+            canonicalize_url("http://www.Example.com/a/?utm_source=x&b=2&fbclid=y&a=1#section"),
+            "https://example.com/a?a=1&b=2",
+        )
+        self.assertEqual(canonicalize_url("https://example.com:8080/"), "https://example.com:8080")
+        self.assertEqual(canonicalize_url("https://example.com:443/"), "https://example.com")
+
+    def test_url_hash(self):
+        self.assertEqual(url_hash("https://github.com/user/repo"), url_hash("http://www.github.com/user/repo/"))
+        self.assertNotEqual(url_hash("https://github.com/user/repo"), url_hash("https://github.com/user/other"))
@@ -0,0 +1,183 @@
+"""
+Metadata Tests:
+
+[v] Test summary and authors are read from html meta tags
+[v] Test arXiv links are resolved through the arXiv API
+[v] Test server errors are retried and client errors are not
+[v] Test responses are cached
+[v] Test other schemes, non public addresses and redirects to them are refused
+[v] Test posts are enriched and failures leave them untouched
+"""
+
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from threading import Thread
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import TestCase
+
+from .. import settings
+from ..metadata import _global
+from ..metadata import enrich_post
+from ..metadata import fetch
+from ..metadata import fetch_metadata
+from ..models import Post
+
+PAGE = b"""<html><head>
+<meta name="citation_author" content="Rossi, Anna">
+<meta name="citation_author" content="Bianchi, Bruno">
+<meta property="og:description" content="A   short
+description.">
+</head><body><meta name="description" content="not in head"></body></html>"""
+
+ATOM = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<entry>
+<summary>  We study
+ gamma-ray bursts. </summary>
+<author><name>Anna Rossi</name></author>
+<author><name>Bruno Bianchi</name></author>
+</entry>
+</feed>"""
+
+
+class Handler(BaseHTTPRequestHandler):
+    # requests paths, shared with the tests.
+    hits = []
+    # number of 503s served before answering, per path.
+    failures = {}
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.failures.get(self.path, 0) > 0:
+            self.failures[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", self.path.removeprefix("/redirect?to="))
+            self.end_headers()
+            return
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = ATOM if self.path.startswith("/api") else PAGE
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        Handler.hits.clear()
+        Handler.failures.clear()
+        patcher = patch.multiple(settings, ARXIV_API_URL=f"{self.base}/api?id_list={{}}", METADATA_BACKOFF=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # the test server is on the loopback, which is refused otherwise.
+        patcher = patch("mboard.metadata._global", self.reachable)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def reachable(address: str) -> bool:
+        return address == "127.0.0.1"
+
+
+class FetchMetadataTests(ServerMixin, SimpleTestCase):
+    def test_page_metadata(self):
+        metadata = fetch_metadata(f"{self.base}/paper")
+        self.assertEqual(metadata["summary"], "A short description.")
+        self.assertEqual(metadata["authors"], ["Rossi, Anna", "Bianchi, Bruno"])
+
+    def test_arxiv_metadata(self):
+        metadata = fetch_metadata("https://arxiv.org/pdf/2401.01234v2")
+        self.assertEqual(metadata["summary"], "We study gamma-ray bursts.")
+        self.assertEqual(metadata["authors"], ["Anna Rossi", "Bruno Bianchi"])
+        self.assertEqual(Handler.hits, ["/api?id_list=2401.01234"])
+
+    def test_retries(self):
+        Handler.failures["/flaky"] = settings.METADATA_RETRIES
+        self.assertEqual(fetch(f"{self.base}/flaky"), PAGE)
+        self.assertEqual(len(Handler.hits), settings.METADATA_RETRIES + 1)
+
+        Handler.hits.clear()
+        Handler.failures["/down"] = settings.METADATA_RETRIES + 1
+        self.assertIsNone(fetch(f"{self.base}/down"))
+        self.assertEqual(len(Handler.hits), settings.METADATA_RETRIES + 1)
+
+        Handler.hits.clear()
+        self.assertIsNone(fetch(f"{self.base}/missing"))
+        self.assertEqual(len(Handler.hits), 1)
+
+    def test_responses_are_cached(self):
+        fetch(f"{self.base}/paper")
+        fetch(f"{self.base}/paper")
+        self.assertEqual(Handler.hits, ["/paper"])
+
+
+class RefusedFetchTests(ServerMixin, SimpleTestCase):
+    def test_schemes(self):
+        for url in ("file:///etc/passwd", "ftp://127.0.0.1/", f"gopher{self.base.removeprefix('http')}/"):
+            self.assertIsNone(fetch(url))
+        self.assertEqual(Handler.hits, [])
+
+    def test_addresses(self):
+        for address in ("10.0.0.1", "169.254.169.254", "100.64.0.1", "::ffff:127.0.0.1", "240.0.0.1"):
+            self.assertFalse(_global(address))
+        self.assertTrue(_global("93.184.215.14"))
+        with patch("mboard.metadata._global", _global):
+            self.assertIsNone(fetch(f"{self.base}/paper"))
+            # a host checked before it resolved elsewhere is refused once connected.
+            with patch("mboard.metadata.check"):
+                self.assertIsNone(fetch(f"{self.base}/paper"))
+        self.assertEqual(Handler.hits, [])
+
+    def test_redirects(self):
+        self.assertIsNone(fetch(f"{self.base}/redirect?to=http://169.254.169.254/latest/meta-data/"))
+        self.assertIsNone(fetch(f"{self.base}/redirect?to=file:///etc/passwd"))
+        self.assertEqual(fetch(f"{self.base}/redirect?to=/paper"), PAGE)
+        self.assertEqual(len(Handler.hits), 4)
+
+
+class EnrichPostTests(ServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username="test-user")
+
+    def test_post_is_enriched(self):
+        post = Post.objects.create(title="title", url=f"{self.base}/paper", user=self.user)
+        enrich_post(post.id)
+        post.refresh_from_db()
+        self.assertEqual(post.summary, "A short description.")
+        self.assertEqual(post.authors, "Rossi, Anna, Bianchi, Bruno")
+
+    def test_failure_leaves_post_untouched(self):
+        post = Post.objects.create(title="title", url=f"{self.base}/missing", user=self.user)
+        enrich_post(post.id)
+        post.refresh_from_db()
+        self.assertEqual(post.summary, "")
+        self.assertEqual(post.authors, "")
@@ -5,6 +5,9 @@ a. Post Model:
 [v] Test creating a post with valid data
 [v] Test creating a post with invalid data (e.g., exceeding max length for title)
 [v] Test the str method returns the expected string
+[v] Test the display domain is computed at save time
+[v] Test the url hash is computed at save time, except for tombstones
+[v] Test the display domain backfill command
 
 b. Comment Model:
 
@@ -13,12 +16,17 @@ b. Comment Model:
 [v] Test the str method returns the expected string
 """
 
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.db import DataError
 from django.test import TestCase
 
+from ..links import url_hash
 from ..models import Comment
 from ..models import Post
+from ..models import save_deleted_post
 
 
 class PostModelTests(TestCase):
@@ -65,6 +73,25 @@ class PostModelTests(TestCase):
             "Gürzénìchstraße (www.test.com)",
         )
 
+    def test_domain(self):
+        post = Post.objects.create(title="title", url="https://www.GitHub.com/user/repo", user=self.user)
+        self.assertEqual(post.domain, "github.com")
+
+    def test_url_hash(self):
+        post = Post.objects.create(title="title", url="https://www.GitHub.com/user/repo", user=self.user)
+        self.assertEqual(post.url_hash, url_hash("https://github.com/user/repo"))
+        save_deleted_post(post)
+        post.save()
+        post.refresh_from_db()
+        self.assertIsNone(post.url_hash)
+
+    def test_backfill_domains(self):
+        post = Post.objects.create(title="title", url="https://arxiv.org/abs/2401.01234", user=self.user)
+        Post.objects.filter(pk=post.pk).update(domain="")
+        call_command("backfilldomains", batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.domain, "arxiv.org")
+
 
 class CommentModelTests(TestCase):
     def setUp(self):
@@ -0,0 +1,135 @@
+"""
+Moderation Tests:
+
+[v] Test banning purges posts, comments with their replies, and votes, then fixes the counters once
+[v] Test banning without purge keeps content
+[v] Test content is removed in a time window only, in batches
+[v] Test posts are pinned and unpinned in bulk
+[v] Test the admin actions and the command
+[v] Test old tombstones are purged once nothing hangs from them
+[v] Test tombstones keep nothing of what was written, nor its edits
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment
+from ..models import Post
+from ..models import save_deleted_comment
+from ..models import save_deleted_post
+from ..models import save_edited_comment
+from ..models import save_edited_post
+from ..models import save_new_comment
+from ..models import save_new_like
+from ..models import save_new_post
+from ..moderation import ban
+from ..moderation import purge
+from ..moderation import remove_content
+from ..moderation import set_pinned
+from ..scores import compute_score
+
+
+class ModerationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.spammer = User.objects.create_user(username="spammer")
+        self.user = User.objects.create_user(username="user")
+        self.spam = save_new_post("spam", self.spammer, "https://example.com/spam", None)
+        self.post = save_new_post("post", self.user, "https://example.com/post", None)
+        save_new_comment("reply to spam", self.user, self.spam, None)
+        self.spam_comment = save_new_comment("spam comment", self.spammer, self.post, None)
+        self.reply = save_new_comment("reply", self.user, self.post, self.spam_comment)
+        self.comment = save_new_comment("comment", self.user, self.post, None)
+        save_new_like(self.post, self.spammer)
+        save_new_like(self.comment, self.spammer)
+
+    def test_ban(self):
+        counts = ban([self.spammer.id], size=1)
+        self.assertEqual(counts, {"users": 1, "post_votes": 2, "comment_votes": 2, "posts": 1, "comments": 2})
+        self.spammer.refresh_from_db()
+        self.assertTrue(self.spammer.is_banned())
+        self.assertFalse(Post.objects.filter(user=self.spammer).exists())
+        self.assertEqual(list(Comment.objects.all()), [self.comment])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.nlikes, self.post.ncomments), (1, 1))
+        self.assertAlmostEqual(self.post.score, compute_score(1, self.post.date), places=4)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.nlikes, 1)
+
+    def test_ban_without_purge(self):
+        self.assertEqual(ban([self.spammer.id], purge=False), {"users": 1})
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_window(self):
+        Post.objects.filter(pk=self.spam.pk).update(date=self.spam.date - timedelta(days=2))
+        since = self.spam.date - timedelta(days=1)
+        with self.assertNumQueries(8):
+            counts = remove_content([self.spammer.id], since=since)
+        self.assertEqual(counts, {"posts": 0, "comments": 2})
+        self.assertTrue(Post.objects.filter(pk=self.spam.pk).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.ncomments, 1)
+        self.assertEqual(remove_content([self.spammer.id], until=since), {"posts": 1, "comments": 0})
+
+    def test_pin(self):
+        self.assertEqual(set_pinned([self.spam.id, self.post.id], pinned=True, size=1), 2)
+        self.assertEqual(set_pinned([self.spam.id, self.post.id], pinned=True), 0)
+        self.assertEqual(Post.objects.filter(pinned=True).count(), 2)
+        self.assertEqual(set_pinned([self.post.id], pinned=False), 1)
+        self.assertEqual(list(Post.objects.filter(pinned=True)), [self.spam])
+
+    def test_admin_and_command(self):
+        admin = get_user_model().objects.create_superuser(username="admin", password="admin-password")
+        self.client.force_login(admin)
+        self.client.post(
+            reverse("admin:mboard_post_changelist"),
+            {"action": "pin", "_selected_action": [self.post.id]},
+        )
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.pinned)
+        self.client.post(
+            reverse("admin:accounts_customuser_changelist"),
+            {"action": "ban_and_purge", "_selected_action": [self.spammer.id]},
+        )
+        self.assertFalse(Post.objects.filter(user=self.spammer).exists())
+        stdout = StringIO()
+        call_command("moderate", "remove", "user", "--since", "2024-01-01T00:00:00+00:00", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "1 posts, 0 comments.\n")
+        self.assertFalse(Post.objects.exists())
+
+    def test_purge(self):
+        save_deleted_comment(self.spam_comment)
+        save_deleted_comment(self.reply)
+        save_deleted_post(self.spam)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.ncomments, 1)
+        now = timezone.now()
+        self.assertEqual(purge(now - timedelta(days=1)), {"comments": 0, "posts": 0})
+        # the reply goes first, then the comment it hung from. the spam post keeps a live comment.
+        self.assertEqual(purge(now + timedelta(seconds=1), size=1), {"comments": 2, "posts": 0})
+        self.assertEqual(list(Comment.objects.filter(post=self.post)), [self.comment])
+        self.assertTrue(Post.objects.filter(pk=self.spam.pk).exists())
+        Comment.objects.filter(post=self.spam).update(deleted_at=now)
+        self.assertEqual(purge(now + timedelta(seconds=1)), {"comments": 1, "posts": 1})
+        self.assertFalse(Post.objects.filter(pk=self.spam.pk).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.ncomments, 1)
+
+    def test_tombstone(self):
+        save_edited_post("edited spam", self.spam)
+        save_edited_comment("edited spam comment", self.spam_comment)
+        self.assertEqual((self.spam.events.count(), self.spam_comment.events.count()), (1, 1))
+        save_deleted_post(self.spam)
+        save_deleted_comment(self.spam_comment)
+        self.spam.refresh_from_db()
+        self.assertEqual((self.spam.title, self.spam.url, self.spam.summary, self.spam.authors), ("", "", "", ""))
+        self.spam_comment.refresh_from_db()
+        self.assertEqual(self.spam_comment.content, "")
+        self.assertFalse(self.spam.events.exists())
+        self.assertFalse(self.spam_comment.events.exists())
@@ -0,0 +1,76 @@
+"""
+Notification Tests:
+
+[v] Test replies notify the author of the post or comment replied to, not the replier
+[v] Test inboxes are capped, and reading them marks them read
+[v] Test the navbar shows the unread count, with one redis read and no query
+[v] Test the inbox view lists replies, for authenticated users only
+[v] Test cached pages change when a notification arrives
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..middleware import redis_default
+from ..models import save_new_comment
+from ..models import save_new_post
+from ..notifications import INBOX_KEY
+from ..notifications import UNREAD_KEY
+from ..notifications import inbox
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username="author", password="test-password")
+        self.replier = get_user_model().objects.create_user(username="replier", password="test-password")
+        for user in (self.author, self.replier):
+            redis_default.delete(INBOX_KEY.format(user_id=user.id), UNREAD_KEY.format(user_id=user.id))
+        self.post = save_new_post("post", self.author, "https://example.com", None)
+
+    def reply(self, author, parent=None, content="reply"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return save_new_comment(content, author, self.post, parent)
+
+    def test_recipients(self):
+        comment = self.reply(self.replier)
+        self.reply(self.author, comment, "thanks")
+        self.reply(self.author)
+        (notification,) = inbox(redis_default, self.author.id)
+        self.assertEqual((notification["comment_id"], notification["username"]), (comment.id, "replier"))
+        self.assertEqual(notification["reply_to"], "post")
+        (notification,) = inbox(redis_default, self.replier.id)
+        self.assertEqual((notification["excerpt"], notification["reply_to"]), ("thanks", "comment"))
+
+    @patch("mboard.notifications.INBOX_NENTRIES", 2)
+    def test_capped(self):
+        for i in range(3):
+            self.reply(self.replier, content=f"reply {i}")
+        self.assertEqual(int(redis_default.get(UNREAD_KEY.format(user_id=self.author.id))), 3)
+        self.assertEqual([n["excerpt"] for n in inbox(redis_default, self.author.id)], ["reply 2", "reply 1"])
+        self.assertIsNone(redis_default.get(UNREAD_KEY.format(user_id=self.author.id)))
+
+    def test_navbar(self):
+        self.reply(self.replier)
+        self.client.login(username="author", password="test-password")
+        url = reverse("mboard:inbox")
+        self.assertContains(self.client.get(reverse("mboard:profile", args=(self.author.id,))), "inbox (1)")
+        with patch.object(redis_default, "get", wraps=redis_default.get) as get:
+            self.client.get(reverse("mboard:news"))
+        self.assertEqual(get.call_count, 1)
+        response = self.client.get(url)
+        self.assertContains(response, "replied to your post")
+        self.assertNotContains(self.client.get(reverse("mboard:news")), "inbox (")
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_not_modified(self):
+        self.client.login(username="author", password="test-password")
+        url = reverse("mboard:post_detail", args=(self.post.id,))
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 304)
+        with patch("mboard.models.bump"):
+            self.reply(self.replier)
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 200)
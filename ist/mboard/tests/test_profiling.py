@@ -0,0 +1,76 @@
+"""
+Profiling Tests:
+
+[v] Test sampled requests are stored with peak memory
+[v] Test requests over the latency threshold are stored
+[v] Test fast, unsampled requests are not stored
+[v] Test summaries group records by view, slowest first
+"""
+
+from time import sleep
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase
+from django.test import override_settings
+
+from ..middleware import redis_default
+from ..middleware import sampling_profiler
+from ..profiling import RECORDS_KEY
+from ..profiling import load_profile
+from ..profiling import load_records
+from ..profiling import summarize
+
+
+def fast_view(request):
+    return HttpResponse("ok")
+
+
+def slow_view(request):
+    sleep(0.05)
+    return HttpResponse("ok")
+
+
+class SamplingProfilerTests(TestCase):
+    def setUp(self):
+        redis_default.delete(RECORDS_KEY)
+        self.request = RequestFactory().get("/")
+
+    def tearDown(self):
+        redis_default.delete(RECORDS_KEY)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_THRESHOLD_MS=0)
+    def test_sampled_request_is_stored(self):
+        response = sampling_profiler(fast_view)(self.request)
+        self.assertEqual(response.status_code, 200)
+        records = load_records(redis_default)
+        self.assertEqual(len(records), 1)
+        self.assertTrue(records[0]["sampled"])
+        self.assertIsNotNone(records[0]["peak_memory"])
+        self.assertIn("speedscope", load_profile(redis_default, records[0]["id"]))
+
+    @override_settings(PROFILER_SAMPLE_RATE=0, PROFILER_THRESHOLD_MS=10)
+    def test_slow_request_is_stored(self):
+        sampling_profiler(slow_view)(self.request)
+        records = load_records(redis_default)
+        self.assertEqual(len(records), 1)
+        self.assertFalse(records[0]["sampled"])
+        self.assertIsNone(records[0]["peak_memory"])
+        self.assertGreater(records[0]["duration"], 0.01)
+
+    @override_settings(PROFILER_SAMPLE_RATE=0, PROFILER_THRESHOLD_MS=1_000)
+    def test_fast_request_is_not_stored(self):
+        sampling_profiler(fast_view)(self.request)
+        self.assertEqual(load_records(redis_default), [])
+
+    def test_summarize(self):
+        records = [
+            {"id": "a", "view": "mboard:index", "duration": 0.1, "peak_memory": None},
+            {"id": "b", "view": "mboard:index", "duration": 0.3, "peak_memory": 1024},
+            {"id": "c", "view": "mboard:post_detail", "duration": 2.0, "peak_memory": None},
+        ]
+        summaries = summarize(records)
+        self.assertEqual([s["view"] for s in summaries], ["mboard:post_detail", "mboard:index"])
+        self.assertEqual(summaries[1]["count"], 2)
+        self.assertEqual(summaries[1]["worst"], "b")
+        self.assertEqual(summaries[1]["peak_memory"], 1024)
@@ -0,0 +1,76 @@
+"""
+Replica Routing Tests:
+
+[v] Test read only views read from a replica
+[v] Test clients which wrote recently, and pinned requests, read from the primary
+[v] Test lagging replicas are skipped
+[v] Test writes always go to the primary
+[v] Test the lag check runs against the database and is cached
+"""
+
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase
+
+from ist import routers
+from ist.routers import PRIMARY
+from ist.routers import ReplicaRouter
+from ist.routers import STICKY_COOKIE
+from ist.routers import pin_to_primary
+from ist.routers import read_from_replica
+from ist.routers import replica_lag
+
+from ..middleware import primary_after_write
+from ..models import Post
+
+
+@read_from_replica
+def read_alias(request):
+    return HttpResponse(ReplicaRouter().db_for_read(Post))
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = patch.object(routers, "replicas", return_value=["replica0"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica(self):
+        with patch.object(routers, "replica_lag", return_value=0.0):
+            response = read_alias(self.factory.get("/"))
+        self.assertEqual(response.content, b"replica0")
+        # outside decorated views we read from the primary.
+        self.assertEqual(ReplicaRouter().db_for_read(Post), PRIMARY)
+        self.assertEqual(ReplicaRouter().db_for_write(Post), PRIMARY)
+
+    def test_sticky_after_write(self):
+        middleware = primary_after_write(lambda request: HttpResponse())
+        self.assertNotIn(STICKY_COOKIE, middleware(self.factory.get("/")).cookies)
+        response = middleware(self.factory.post("/"))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = self.factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = "1"
+        with patch.object(routers, "replica_lag", return_value=0.0):
+            self.assertEqual(read_alias(request).content.decode(), PRIMARY)
+
+    def test_pinned(self):
+        request = self.factory.get("/")
+        pin_to_primary(request)
+        with patch.object(routers, "replica_lag", return_value=0.0):
+            self.assertEqual(read_alias(request).content.decode(), PRIMARY)
+
+    def test_lagging_replica_is_skipped(self):
+        with patch.object(routers, "replica_lag", return_value=60.0):
+            response = read_alias(self.factory.get("/"))
+        self.assertEqual(response.content.decode(), PRIMARY)
+
+    def test_lag_check(self):
+        routers._lags.clear()
+        # the primary is not replaying anything, it is never behind.
+        self.assertEqual(replica_lag(PRIMARY), 0.0)
+        with self.assertNumQueries(0):
+            replica_lag(PRIMARY)
@@ -0,0 +1,88 @@
+"""
+Rising Tests:
+
+[v] Test votes are counted in the current bucket, withdrawn votes too
+[v] Test the ranking weighs recent buckets more, and drops posts without votes
+[v] Test buckets out of the window are dropped
+[v] Test the rising view lists ranked posts in their order, pinned ones included
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..middleware import redis_default
+from ..models import save_new_like
+from ..models import save_new_post
+from ..models import save_remove_like
+from ..models import save_toggle_pin
+from ..rising import BUCKET_KEY
+from ..rising import RANKING_KEY
+from ..rising import rising
+from ..rising import update_ranking
+from ..settings import RISING_BUCKET_SECONDS
+from ..settings import RISING_NBUCKETS
+
+
+class RisingTests(TestCase):
+    def setUp(self):
+        self.now = time.time()
+        self.current = int(self.now // RISING_BUCKET_SECONDS)
+        redis_default.delete(
+            RANKING_KEY, *[BUCKET_KEY.format(bucket=self.current - age) for age in range(RISING_NBUCKETS + 3)]
+        )
+        User = get_user_model()
+        self.users = [User.objects.create_user(username=f"user{i}") for i in range(3)]
+        self.old = save_new_post("old", self.users[0], "https://example.com/old", None)
+        self.new = save_new_post("new", self.users[0], "https://example.com/new", None)
+
+    def vote(self, post, user, bucket=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            save_new_like(post, user)
+        if bucket is not None:
+            # moves the vote back in time.
+            redis_default.zincrby(BUCKET_KEY.format(bucket=self.current), -1, post.id)
+            redis_default.zincrby(BUCKET_KEY.format(bucket=bucket), 1, post.id)
+
+    def test_record(self):
+        self.vote(self.new, self.users[1])
+        self.vote(self.new, self.users[2])
+        with self.captureOnCommitCallbacks(execute=True):
+            save_remove_like(self.new, self.users[2])
+        self.assertEqual(redis_default.zscore(BUCKET_KEY.format(bucket=self.current), self.new.id), 1)
+
+    def test_ranking(self):
+        for user in self.users:
+            self.vote(self.old, user, bucket=self.current - 4)
+        self.vote(self.new, self.users[1])
+        self.vote(self.new, self.users[2])
+        update_ranking(redis_default, self.now)
+        self.assertEqual(rising(redis_default), [self.new.id, self.old.id])
+        self.assertEqual(rising(redis_default, n=1), [self.new.id])
+        # withdrawn votes count in the current bucket, the post drops once they outweigh the older votes.
+        for user, ranked in ((self.users[0], [self.new.id, self.old.id]), (self.users[1], [self.new.id])):
+            with self.captureOnCommitCallbacks(execute=True):
+                save_remove_like(self.old, user)
+            update_ranking(redis_default, self.now)
+            self.assertEqual(rising(redis_default), ranked)
+
+    def test_window(self):
+        self.vote(self.old, self.users[1], bucket=self.current - RISING_NBUCKETS)
+        self.vote(self.new, self.users[1], bucket=self.current - RISING_NBUCKETS + 1)
+        update_ranking(redis_default, self.now)
+        self.assertEqual(rising(redis_default), [self.new.id])
+        self.assertFalse(redis_default.exists(BUCKET_KEY.format(bucket=self.current - RISING_NBUCKETS)))
+
+    def test_view(self):
+        self.assertContains(self.client.get(reverse("mboard:rising")), "It is empty here!")
+        self.vote(self.old, self.users[1])
+        for user in self.users[1:]:
+            self.vote(self.new, user)
+        update_ranking(redis_default, self.now)
+        response = self.client.get(reverse("mboard:rising"))
+        self.assertEqual(list(response.context["page_obj"]), [self.new, self.old])
+        save_toggle_pin(self.old)
+        response = self.client.get(reverse("mboard:rising"))
+        self.assertEqual(list(response.context["page_obj"]), [self.new, self.old])
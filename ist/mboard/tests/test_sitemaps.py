@@ -0,0 +1,90 @@
+"""
+Sitemap Tests:
+
+[v] Test posts are written to gzipped chunks by id range, listed by the index
+[v] Test updates only rewrite the chunks with new posts
+[v] Test full updates drop deleted posts and empty chunks
+[v] Test the views serve the prebuilt files
+"""
+
+import gzip
+from io import StringIO
+from pathlib import Path
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..sitemaps import CHUNK_NAME
+from ..sitemaps import INDEX_NAME
+from ..sitemaps import update
+
+CHUNK_SIZE = 4
+
+
+@patch("mboard.sitemaps.SITEMAP_CHUNK_SIZE", CHUNK_SIZE)
+class SitemapTests(TestCase):
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(SITEMAP_ROOT=self.root, SITE_URL="https://example.org"))
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.posts = [self.create_post(i) for i in range(6)]
+
+    def create_post(self, i: int) -> Post:
+        return Post.objects.create(title=f"post {i}", url=f"https://example.com/{i}", user=self.user)
+
+    def chunk_urls(self, chunk: int | Path) -> list[str]:
+        path = chunk if isinstance(chunk, Path) else self.root / CHUNK_NAME.format(chunk=chunk)
+        content = gzip.decompress(path.read_bytes()).decode()
+        return [line.split("<loc>")[1].split("</loc>")[0] for line in content.splitlines() if "<loc>" in line]
+
+    def post_url(self, post: Post) -> str:
+        return f"https://example.org{reverse('mboard:post_detail', args=(post.id,))}"
+
+    def chunk(self, post: Post) -> int:
+        return post.id // CHUNK_SIZE
+
+    def test_chunks(self):
+        written = update(self.root)
+        chunks = sorted({self.chunk(post) for post in self.posts})
+        self.assertEqual(written, chunks)
+        urls = [url for chunk in chunks for url in self.chunk_urls(chunk)]
+        self.assertEqual(urls, [self.post_url(post) for post in self.posts])
+        index = (self.root / INDEX_NAME).read_text()
+        for chunk in chunks:
+            self.assertIn(f"https://example.org{reverse('mboard:sitemap_chunk', args=(chunk,))}", index)
+
+    def test_incremental(self):
+        update(self.root)
+        post = self.create_post(6)
+        with self.assertNumQueries(2):
+            written = update(self.root)
+        self.assertEqual(written, [self.chunk(post)])
+        self.assertIn(self.post_url(post), self.chunk_urls(self.chunk(post)))
+        self.assertEqual(update(self.root), [])
+
+    def test_full(self):
+        update(self.root)
+        first = self.chunk(self.posts[0])
+        kept = [self.post_url(post) for post in self.posts[:-1] if self.chunk(post) != first]
+        Post.objects.filter(id__lt=(first + 1) * CHUNK_SIZE).delete()
+        self.posts[-1].delete()
+        call_command("sitemap", "--full", stdout=StringIO())
+        self.assertFalse((self.root / CHUNK_NAME.format(chunk=first)).exists())
+        urls = [url for path in self.root.glob(CHUNK_NAME.format(chunk="*")) for url in self.chunk_urls(path)]
+        self.assertCountEqual(urls, kept)
+        self.assertNotIn(reverse("mboard:sitemap_chunk", args=(first,)), (self.root / INDEX_NAME).read_text())
+
+    def test_views(self):
+        self.assertEqual(self.client.get(reverse("mboard:sitemap_index")).status_code, 404)
+        update(self.root)
+        response = self.client.get(reverse("mboard:sitemap_index"))
+        self.assertEqual(response["Content-Type"], "application/xml")
+        self.assertIn(b"<sitemapindex", b"".join(response.streaming_content))
+        response = self.client.get(reverse("mboard:sitemap_chunk", args=(self.chunk(self.posts[0]),)))
+        self.assertIn(self.post_url(self.posts[0]).encode(), gzip.decompress(b"".join(response.streaming_content)))
@@ -0,0 +1,100 @@
+"""
+Slow Query Tests:
+
+[v] Test queries over the threshold are recorded with their view
+[v] Test queries below the threshold are not recorded
+[v] Test a sampled slow select gets an EXPLAIN ANALYZE plan
+[v] Test queries run while rendering record the template name
+[v] Test queries on replicas are recorded with their database
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test import TestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from ..middleware import redis_default
+from ..middleware import slow_query_logger
+from ..models import Post
+from ..slowqueries import RECORDS_KEY
+from ..slowqueries import load_slow_queries
+
+SLOW_QUERY_MIDDLEWARE = "mboard.middleware.slow_query_logger"
+
+
+class SlowQueryLoggerTests(TestCase):
+    def setUp(self):
+        redis_default.delete(RECORDS_KEY)
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.post = Post.objects.create(title="title", url="https://example.com", user=self.user)
+
+    def tearDown(self):
+        redis_default.delete(RECORDS_KEY)
+
+    def get_detail(self, **options):
+        with override_settings(MIDDLEWARE=[SLOW_QUERY_MIDDLEWARE] + settings.MIDDLEWARE, **options):
+            return self.client.get(reverse("mboard:post_detail", args=(self.post.id,)))
+
+    def test_slow_queries_are_recorded(self):
+        # a negative threshold makes every query slow.
+        response = self.get_detail(SLOW_QUERY_THRESHOLD_MS=-1, SLOW_QUERY_EXPLAIN_RATE=0)
+        self.assertEqual(response.status_code, 200)
+        records = load_slow_queries(redis_default)
+        self.assertTrue(records)
+        self.assertTrue(all(r["view"] == "mboard:post_detail" for r in records))
+        self.assertTrue(all(r["plan"] is None for r in records))
+
+    def test_fast_queries_are_not_recorded(self):
+        self.get_detail(SLOW_QUERY_THRESHOLD_MS=60_000, SLOW_QUERY_EXPLAIN_RATE=1)
+        self.assertEqual(load_slow_queries(redis_default), [])
+
+    def test_slow_selects_are_explained(self):
+        self.get_detail(SLOW_QUERY_THRESHOLD_MS=-1, SLOW_QUERY_EXPLAIN_RATE=1)
+        plans = [r["plan"] for r in load_slow_queries(redis_default) if r["sql"].startswith("SELECT")]
+        self.assertTrue(plans)
+        self.assertTrue(all("Buffers" in plan or "actual time" in plan for plan in plans))
+
+    def test_template_is_recorded(self):
+        self.get_detail(SLOW_QUERY_THRESHOLD_MS=-1, SLOW_QUERY_EXPLAIN_RATE=0)
+        templates = {r["template"] for r in load_slow_queries(redis_default)}
+        # the comment queryset is lazily evaluated while rendering the thread.
+        self.assertIn("mboard/post_detail.html", templates)
+
+
+class ReplicaSlowQueryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # a second alias on the test database stands for a replica. it is only known once the tests run.
+        connections.settings["replica0"] = connections["default"].settings_dict | {"TEST": {"MIRROR": "default"}}
+        cls.databases = {"default", "replica0"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del cls.databases
+        connections["replica0"].close()
+        if connections["replica0"].pool is not None:
+            connections["replica0"].close_pool()
+        del connections["replica0"]
+        del connections.settings["replica0"]
+
+    def setUp(self):
+        redis_default.delete(RECORDS_KEY)
+
+    def tearDown(self):
+        redis_default.delete(RECORDS_KEY)
+
+    def test_replica_queries_are_recorded(self):
+        def get_response(request):
+            with connections["replica0"].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return HttpResponse()
+
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=-1, SLOW_QUERY_EXPLAIN_RATE=0):
+            slow_query_logger(get_response)(RequestFactory().get("/"))
+        self.assertEqual([r["database"] for r in load_slow_queries(redis_default)], ["replica0"])
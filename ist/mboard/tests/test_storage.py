@@ -0,0 +1,46 @@
+"""
+Static Storage Tests:
+
+[v] Test collectstatic writes hashed names and their gzip variants
+[v] Test names missing from the manifest are hashed from the collected file, uncollected ones are an error
+"""
+
+import gzip
+import json
+from pathlib import Path
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+# tests run on the plain storage, see `ist/settings.py`.
+STORAGES = settings.STORAGES | {"staticfiles": {"BACKEND": "ist.storage.CompressedManifestStaticFilesStorage"}}
+
+
+@override_settings(STORAGES=STORAGES)
+class CompressedManifestStorageTests(SimpleTestCase):
+    def test_collectstatic(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            url = static("css/output.css")
+            name = url.removeprefix(staticfiles_storage.base_url)
+            self.assertRegex(name, r"^css/output\.[0-9a-f]{12}\.css$")
+            original = (Path(root) / "css" / "output.css").read_bytes()
+            self.assertEqual(gzip.decompress((Path(root) / f"{name}.gz").read_bytes()), original)
+
+    def test_missing_from_manifest(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            hashed = static("css/output.css")
+            manifest = Path(root) / "staticfiles.json"
+            content = json.loads(manifest.read_text())
+            del content["paths"]["css/output.css"]
+            manifest.write_text(json.dumps(content))
+            staticfiles_storage.hashed_files, _ = staticfiles_storage.load_manifest()
+            self.assertEqual(static("css/output.css"), hashed)
+            with self.assertRaises(ValueError):
+                static("css/missing.css")
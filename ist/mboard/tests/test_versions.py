@@ -0,0 +1,103 @@
+"""
+Conditional GET Tests:
+
+[v] Test post pages answer 304 without queries while unchanged
+[v] Test comments, votes and edits invalidate post pages
+[v] Test feeds are invalidated by changes to their posts only
+[v] Test validators differ between users
+[v] Test pages which changed recently read from the primary
+[v] Test versions made up for unknown pages expire, and hold when evicted at once
+"""
+
+import time
+from unittest.mock import ANY
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..models import save_edited_post
+from ..models import save_new_comment
+from ..models import save_new_like
+from ..models import save_new_post
+from ..settings import VERSION_TIMEOUT
+from ..versions import POST_VERSION
+from ..versions import get_version
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="test-user", password="test-password")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = save_new_post("title", self.user, "https://arxiv.org/abs/2401.01234", None)
+            self.other_post = save_new_post("other", self.user, "https://github.com/user/repo", None)
+        self.url = reverse("mboard:post_detail", args=(self.post.id,))
+
+    def get(self, url: str, etag: str):
+        return self.client.get(url, headers={"if-none-match": etag})
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            response = self.get(self.url, response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_post(self):
+        etag = self.client.get(self.url)["ETag"]
+        changes = [
+            lambda: save_new_comment("comment", self.user, self.post, None),
+            lambda: save_new_like(self.post.comments.first(), self.user),
+            lambda: save_edited_post("new title", self.post),
+        ]
+        for change in changes:
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            response = self.get(self.url, etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+    def test_feeds(self):
+        index, arxiv, github = (
+            reverse("mboard:index"),
+            reverse("mboard:from_domain", args=("arxiv.org",)),
+            reverse("mboard:from_domain", args=("github.com",)),
+        )
+        etags = {url: self.client.get(url)["ETag"] for url in (index, arxiv, github)}
+        voter = get_user_model().objects.create_user(username="voter")
+        with self.captureOnCommitCallbacks(execute=True):
+            save_new_like(Post.objects.get(pk=self.post.pk), voter)
+        self.assertEqual(self.get(index, etags[index]).status_code, 200)
+        self.assertEqual(self.get(arxiv, etags[arxiv]).status_code, 200)
+        self.assertEqual(self.get(github, etags[github]).status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.login(username="test-user", password="test-password")
+        response = self.get(self.url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_fresh_pages_read_from_primary(self):
+        with patch("mboard.versions.pin_to_primary") as pin:
+            self.client.get(self.url)
+        pin.assert_called_once()
+        cache.set(POST_VERSION.format(post_id=self.post.id), time.time() - 60, timeout=None)
+        with patch("mboard.versions.pin_to_primary") as pin:
+            self.client.get(self.url)
+        pin.assert_not_called()
+
+    def test_made_up_versions_expire(self):
+        with patch.object(cache, "add", wraps=cache.add) as add:
+            self.client.get(reverse("mboard:from_domain", args=("nowhere.example",)))
+        add.assert_called_once_with(ANY, ANY, timeout=VERSION_TIMEOUT)
+
+    def test_version_evicted_at_once(self):
+        before = time.time()
+        with patch.object(cache, "get", return_value=None):
+            self.assertGreaterEqual(get_version(["version:nowhere"]), before)
@@ -7,6 +7,11 @@ Index View:
 [v] Test that it displays the correct number of posts (e.g., the latest 5)
 [ ] Test the ordering of posts (should be by date, newest first)
 
+Domain Feed View:
+
+[v] Test the feed lists only posts from the domain
+[v] Test posts link to their domain feed
+
 Post Detail View:
 
 [v] Test that a valid post detail page loads successfully
@@ -21,6 +26,8 @@ Post Submit View:
 [v] Test accessing the submit page as an unauthenticated user (should redirect to login)
 [v] Author gets form by get method
 [v] Lurker gets redirected attempting get
+[v] Submitting an already posted url redirects to the existing post
+[v] Losing the race to a post deleted at once shows the form again
 
 Post Edit View:
 
@@ -32,7 +39,7 @@ Post Edit View:
 
 Post Delete View:
 
-[v] Test deleting a post successfully (by the post author)
+[v] Test deleting a post successfully (by the post author), which leaves a tombstone off the listings
 [v] Test deleting a post by a non-author (should be forbidden)
 
 Post Comment View:
@@ -58,6 +65,11 @@ Comment History View:
 [v] Test 404 for non-existent comment
 [v] Test unedited comment shows appropriate message
 
+Post History View:
+
+[v] Test history view shows the title diff
+[v] Test unedited post shows appropriate message
+
 Comment Reply View:
 
 [v] Test authenticated user gets 200 response
@@ -75,7 +87,7 @@ Comment Edit View:
 
 Comment Delete View:
 
-[v] Test author can delete their comment
+[v] Test author can delete their comment, which stays as a tombstone above its replies
 [v] Test non-author cannot delete comment
 [v] Test author gets delete confirmation form
 [v] Test non-author is redirected
@@ -86,14 +98,23 @@ Post Pinning:
 [v] test pinning and then unpinning behaves as intended.
 [v] test pinning not existent post results in 404.
 
+Readiness:
+
+[v] Test the readiness probe answers while database and cache are up
+[v] Test the readiness probe fails when the cache is unreachable
 
 """
 
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import Client
 from django.test import TestCase
 from django.urls import reverse
+from redis import ConnectionError
 
+from ..middleware import redis_default
 from ..models import Comment
 from ..models import Post
 from ..settings import MAX_DEPTH
@@ -122,12 +143,28 @@ class IndexViewTests(TestCase):
         from ..settings import INDEX_NPOSTS
 
         for i in range(31):
-            Post(title="title", url="www.google.it", user=self.user).save()
+            Post(title="title", url=f"www.google.it/{i}", user=self.user).save()
 
         response = self.client.get(reverse("mboard:index"))
         self.assertEqual(len(response.context["latest_posts"]), INDEX_NPOSTS)
 
 
+class FromDomainViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="test-user")
+        self.arxiv_post = Post.objects.create(title="a paper", url="https://arxiv.org/abs/2401.01234", user=self.user)
+        self.github_post = Post.objects.create(title="some code", url="https://github.com/user/repo", user=self.user)
+
+    def test_feed_filters_by_domain(self):
+        response = self.client.get(reverse("mboard:from_domain", args=("arxiv.org",)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["page_obj"]), [self.arxiv_post])
+
+    def test_posts_link_to_domain_feed(self):
+        response = self.client.get(reverse("mboard:index"))
+        self.assertContains(response, reverse("mboard:from_domain", args=("github.com",)))
+
+
 class PostDetailViewTests(TestCase):
     def setUp(self):
         user = get_user_model().objects.create_user(username="test-user")
@@ -187,6 +224,24 @@ class PostSubmitViewTests(TestCase):
         self.assertEqual(response.status_code, 302)  # Check for redirection
         self.assertRedirects(response, f"{reverse('login')}?next={reverse('mboard:post_submit')}")
 
+    def test_duplicate_url_redirects_to_existing_post(self):
+        self.client.login(username="test-user", password="test-password")
+        self.client.post(reverse("mboard:post_submit"), {"title": "paper", "url": "https://arxiv.org/abs/2401.01234"})
+        post = Post.objects.get()
+        response = self.client.post(
+            reverse("mboard:post_submit"),
+            {"title": "same paper", "url": "arxiv.org/pdf/2401.01234v2"},
+        )
+        self.assertRedirects(response, reverse("mboard:post_detail", args=(post.id,)))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_duplicate_deleted_meanwhile(self):
+        self.client.login(username="test-user", password="test-password")
+        with patch("mboard.views.save_new_post", side_effect=IntegrityError):
+            response = self.client.post(reverse("mboard:post_submit"), {"title": "title", "url": "https://test.com/"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context["form"], "url", "This link was just submitted, please try again.")
+
     def test_post_submit_template_on_get(self):
         self.client.login(username="test-user", password="test-password")
         response = self.client.get(reverse("mboard:post_submit"))
@@ -247,7 +302,15 @@ class PostDeleteViewTests(TestCase):
         self.client.login(username="test-author", password="test-password")
         response = self.client.post(reverse("mboard:post_delete", args=(self.post.id,)))
         self.assertEqual(response.status_code, 302)
-        self.assertFalse(Post.objects.exists())
+        # the post is kept as a tombstone, off the listings.
+        self.post.refresh_from_db()
+        self.assertIsNotNone(self.post.deleted_at)
+        self.assertNotContains(self.client.get(reverse("mboard:news")), "wwww.test.com")
+        response = self.client.get(reverse("mboard:post_detail", args=(self.post.id,)))
+        self.assertContains(response, "[deleted]")
+        self.assertNotContains(response, "wwww.test.com")
+        response = self.client.post(reverse("mboard:post_delete", args=(self.post.id,)))
+        self.assertEqual(response.status_code, 404)
 
     def test_lurker_cant_delete(self):
         self.client.login(username="test-lurker", password="test-password")
@@ -415,6 +478,24 @@ class CommentHistoryViewTest(TestCase):
         self.assertContains(response, "this comment was never edited")
 
 
+class PostHistoryViewTests(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username="test-author", password="test-password")
+        self.post = Post.objects.create(title="original title", url="www.test.com", user=self.author)
+        self.client.login(username="test-author", password="test-password")
+
+    def test_history_view_contains_edits(self):
+        self.client.post(reverse("mboard:post_edit", args=(self.post.id,)), {"title": "edited title"})
+        response = self.client.get(reverse("mboard:post_history", args=[self.post.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "- original title")
+        self.assertContains(response, "+ edited title")
+
+    def test_unedited_post_shows_appropriate_message(self):
+        response = self.client.get(reverse("mboard:post_history", args=[self.post.id]))
+        self.assertContains(response, "this post was never edited")
+
+
 class CommentReplyViewTests(TestCase):
     def setUp(self):
         self.author = get_user_model().objects.create_user(username="test-author", password="test-password")
@@ -503,9 +584,23 @@ class CommentDeleteViewTests(TestCase):
 
     def test_author_can_delete_comment(self):
         self.client.login(username="test-author", password="test-password")
+        reply = Comment.objects.create(content="A reply", post=self.post, user=self.lurker, parent=self.comment)
+        Post.objects.filter(pk=self.post.pk).update(ncomments=2)
         response = self.client.post(reverse("mboard:comment_delete", args=(self.comment.id,)))
         self.assertEqual(response.status_code, 302)
-        self.assertFalse(Comment.objects.filter(id=self.comment.id).exists())
+        # the comment is kept as a tombstone, with its replies in place.
+        self.comment.refresh_from_db()
+        self.assertIsNotNone(self.comment.deleted_at)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.ncomments, 1)
+        response = self.client.get(reverse("mboard:post_detail", args=(self.post.id,)))
+        self.assertContains(response, "[deleted]")
+        self.assertNotContains(response, "This is a comment")
+        self.assertContains(response, reply.content)
+        response = self.client.post(reverse("mboard:comment_delete", args=(self.comment.id,)))
+        self.assertEqual(response.status_code, 404)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.ncomments, 1)
 
     def test_lurker_cant_delete_comment(self):
         self.client.login(username="test-lurker", password="test-password")
@@ -635,4 +730,15 @@ class PostPinTests(TestCase):
         self.client.login(username="test-admin", password="test-password")
         non_existent_pin_url = reverse("mboard:post_pin", args=[99999])
         response = self.client.post(non_existent_pin_url)
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+
+class ReadyViewTests(TestCase):
+    def test_ready(self):
+        response = self.client.get(reverse("mboard:ready"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_ready_without_cache(self):
+        with patch.object(redis_default, "ping", side_effect=ConnectionError):
+            response = self.client.get(reverse("mboard:ready"))
+        self.assertEqual(response.status_code, 503)
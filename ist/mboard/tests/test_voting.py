@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 
-from ..models import Post, Comment, save_new_comment, save_new_post
+from ..models import Post, Comment, CommentVote, PostVote, save_new_comment, save_new_post
 from ..scores import compute_score, arbitrary_date
 
 
@@ -129,6 +129,18 @@ class VotingSystemTests(TestCase):
         self.assertFalse(data['isupvote'])
         self.assertFalse(self.comment.fans.filter(id=self.voter.id).exists())
 
+    def test_vote_timestamps(self):
+        """Votes record when they were cast, to look them up by voter and time"""
+        before = timezone.now()
+        self.client.login(username="test-voter", password="test-password")
+        self.client.post(self.post_upvote_url)
+        self.client.post(self.comment_upvote_url)
+
+        vote = PostVote.objects.get(post=self.post, customuser=self.voter)
+        self.assertGreaterEqual(vote.created_at, before)
+        self.assertTrue(CommentVote.objects.filter(customuser=self.voter, created_at__gte=before).exists())
+        self.assertEqual(list(self.voter.post_votes.filter(created_at__gte=before)), [vote])
+
     def test_upvote_nonexistent_content(self):
         self.client.login(username="test-voter", password="test-password")
 
@@ -0,0 +1,34 @@
+"""
+Warm Up Tests:
+
+[v] Test project templates are compiled
+[v] Test the top feeds and posts are rendered
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..settings import WARMUP_NPOSTS
+from ..warmup import compile_templates
+from ..warmup import warm_up
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="test-user")
+        self.posts = [
+            Post.objects.create(title=f"post {i}", url=f"https://example.com/{i}", user=user, score=i)
+            for i in range(WARMUP_NPOSTS + 2)
+        ]
+
+    def test_compile_templates(self):
+        self.assertGreater(compile_templates(), 0)
+
+    def test_warm_up(self):
+        timings = warm_up()
+        self.assertIn(reverse("mboard:index"), timings)
+        self.assertIn(reverse("mboard:post_detail", args=(self.posts[-1].id,)), timings)
+        self.assertNotIn(reverse("mboard:post_detail", args=(self.posts[0].id,)), timings)
+        self.assertEqual({status for status, _ in timings.values()}, {200})
@@ -1,14 +1,27 @@
 from django.urls import path
+from django.utils.text import slugify
 
+from . import api
+from . import feeds
 from . import views
+from .models import Board
+from .models import Keyword
 
 app_name = "mboard"
+# syndication feeds by url prefix.
+FEEDS = {
+    "": "all",
+    **{f"boards/{slugify(label)}/": f"board:{name}" for name, label in Board.Boards.choices},
+    **{f"keywords/{slugify(label)}/": f"keyword:{name}" for name, label in Keyword.Keywords.choices},
+}
 urlpatterns = [
     path("", views.index, name="index"),
     path("news/", views.news, name="news"),
+    path("rising/", views.rising, name="rising"),
     path("papers/", views.papers, name="papers"),
     path("code/", views.code, name="code"),
     path("jobs/", views.jobs, name="jobs"),
+    path("from/<str:domain>/", views.from_domain, name="from_domain"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("posts/submit/", views.post_submit, name="post_submit"),
     path("posts/<int:post_id>/comment", views.post_comment, name="post_comment"),
@@ -16,6 +29,7 @@ urlpatterns = [
     path("posts/<int:post_id>/edit", views.post_edit, name="post_edit"),
     path("posts/<int:post_id>/upvote", views.post_upvote, name="post_upvote"),
     path("posts/<int:post_id>/pin", views.post_pin, name="post_pin"),
+    path("posts/<int:post_id>/history", views.post_history, name="post_history"),
     path("comments/<int:comment_id>/", views.comment_detail, name="comment_detail"),
     path("comments/<int:comment_id>/reply", views.comment_reply, name="comment_reply"),
     path("comments/<int:comment_id>/delete", views.comment_delete, name="comment_delete"),
@@ -25,4 +39,22 @@ urlpatterns = [
     path("accounts/<int:user_id>/", views.profile, name="profile"),
     path("accounts/<int:user_id>/posts", views.profile_posts, name="profile_posts"),
     path("accounts/<int:user_id>/comments", views.profile_comments, name="profile_comments"),
+    path("inbox/", views.inbox, name="inbox"),
+    path("ready/", views.ready, name="ready"),
+    path("export/<str:table>.<str:format>", views.export, name="export"),
+    path("sitemap.xml", views.sitemap_index, name="sitemap_index"),
+    path("sitemaps/posts-<int:chunk>.xml.gz", views.sitemap_chunk, name="sitemap_chunk"),
+    path("api/", api.index, name="api_index"),
+    path("api/news/", api.news, name="api_news"),
+    path("api/papers/", api.papers, name="api_papers"),
+    path("api/code/", api.code, name="api_code"),
+    path("api/jobs/", api.jobs, name="api_jobs"),
+    path("api/from/<str:domain>/", api.from_domain, name="api_from_domain"),
+    path("api/posts/<int:post_id>/", api.post_detail, name="api_post_detail"),
+    path("api/comments/<int:comment_id>/", api.comment_detail, name="api_comment_detail"),
+    path("api/accounts/<int:user_id>/", api.profile, name="api_profile"),
+    path("api/accounts/<int:user_id>/posts", api.profile_posts, name="api_profile_posts"),
+    path("api/accounts/<int:user_id>/comments", api.profile_comments, name="api_profile_comments"),
+    *[path(f"feeds/{prefix}rss/", feeds.rss, {"feed": feed}, name="rss") for prefix, feed in FEEDS.items()],
+    *[path(f"feeds/{prefix}atom/", feeds.atom, {"feed": feed}, name="atom") for prefix, feed in FEEDS.items()],
 ]
@@ -0,0 +1,85 @@
+from datetime import datetime
+from datetime import timezone
+from functools import wraps
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from ist.routers import pin_to_primary
+
+from .notifications import unread
+from .settings import VERSION_TIMEOUT
+
+# versions are the timestamps of the last change to what a page shows. they only grow.
+POST_VERSION = "version:post:{post_id}"
+FEED_VERSION = "version:feed:{feed}"
+
+
+def post_versions(post) -> list[str]:
+    """Returns the versions of a post page and of the feeds listing it."""
+    feeds = ["all", f"domain:{post.domain}", f"user:{post.user_id}"]
+    if post.board_id is not None:
+        feeds.append(f"board:{post.board.name}")
+    return [POST_VERSION.format(post_id=post.id)] + [FEED_VERSION.format(feed=feed) for feed in feeds]
+
+
+def bump(*keys: str):
+    """Marks versions as changed, once the current transaction commits and readers can see the change."""
+    transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time()), timeout=None))
+
+
+def get_version(keys: list[str]) -> float:
+    versions = cache.get_many(keys)
+    # versions never written, or evicted, start now. anyone can make up keys by asking for pages which do not
+    # exist, so these expire. a version starting again later only costs clients a full response.
+    now = time.time()
+    for key in set(keys) - versions.keys():
+        # whoever adds the key first sets the version, unless it is gone again already.
+        cache.add(key, now, timeout=VERSION_TIMEOUT)
+        versions[key] = cache.get(key) or now
+    return max(versions.values())
+
+
+def conditional(*keys: str):
+    """
+    Answers conditional GETs with 304 Not Modified when none of the versions a view depends on changed,
+    before the view runs. Keys are formatted with the view keyword arguments.
+    The ETag depends on the user, since pages show their votes and moderation links.
+    """
+
+    def decorator(view):
+        def version(request: HttpRequest, **kwargs) -> float:
+            if not hasattr(request, "_version"):
+                request._version = get_version([key.format(**kwargs) for key in keys])
+            return request._version
+
+        def etag(request: HttpRequest, *args, **kwargs) -> str:
+            # the session is enough to tell users apart, loading the user would hit the database.
+            # unread notifications show in the navbar, without changing the version of the page.
+            return f"{version(request, **kwargs):.6f}-{request.session.get(SESSION_KEY, 0)}-{unread(request)}"
+
+        def last_modified(request: HttpRequest, *args, **kwargs) -> datetime:
+            return datetime.fromtimestamp(version(request, **kwargs), tz=timezone.utc)
+
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs):
+            # versions are bumped when the primary commits, replicas may not have the change yet. rendering
+            # their older page under the new version would keep serving it as not modified until the next bump.
+            if time.time() - version(request, **kwargs) < settings.REPLICA_STICKY_SECONDS:
+                pin_to_primary(request)
+            response = conditional_view(request, *args, **kwargs)
+            # browsers would otherwise guess a freshness from Last-Modified and skip asking.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,23 +1,48 @@
 from functools import partial
+from pathlib import Path
 
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.core.paginator import Paginator
+from django.db import DatabaseError
+from django.db import IntegrityError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Case
 from django.db.models import Count
+from django.db.models import Q
+from django.db.models import When
+from django.http import FileResponse
+from django.http import Http404
 from django.http import HttpRequest
 from django.http import HttpResponse
+from django.http import HttpResponseBadRequest
 from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
 from django.views.decorators.http import require_POST
+from redis import RedisError
 
+from ist.routers import read_from_replica
+
+from . import export as exports
 from .forms import CommentForm
 from .forms import PostEditForm
 from .forms import PostForm
+from .history import revisions
+from .links import url_hash
+from .middleware import redis_default
 from .models import Comment
 from .models import CommentHistory
 from .models import Post
+from .models import PostHistory
+from .models import save_deleted_comment
+from .models import save_deleted_post
 from .models import save_edited_comment
 from .models import save_edited_post
 from .models import save_new_comment
@@ -25,8 +50,17 @@ from .models import save_new_like
 from .models import save_new_post
 from .models import save_remove_like
 from .models import save_toggle_pin
+from .notifications import inbox as inbox_notifications
+from .rising import RISING_VERSION
+from .rising import rising as rising_ids
+from .settings import HISTORY_NREVISIONS
 from .settings import INDEX_NPOSTS
 from .settings import MAX_DEPTH
+from .sitemaps import CHUNK_NAME
+from .sitemaps import INDEX_NAME
+from .versions import FEED_VERSION
+from .versions import POST_VERSION
+from .versions import conditional
 
 EMPTY_MESSAGE = "It is empty here!"
 
@@ -39,14 +73,17 @@ def _index(
     order_by: tuple[str],
     filter: dict,
     header: str | None = None,
+    pinned_first: bool = True,
 ) -> HttpResponse:
+    if pinned_first:
+        order_by = ("-pinned", *order_by)
     # fmt: off
     posts = (
         Post.objects
         .with_fan_status(request.user)
         .select_related("user", "board")
-        .order_by("-pinned", *order_by)
-        .filter(**filter)
+        .order_by(*order_by)
+        .filter(deleted_at=None, **filter)
     )
     # fmt: on
     # TODO: fix this paginator so we can have one queries for the homepage
@@ -59,38 +96,61 @@ def _index(
     return render(request, "mboard/index.html", context)
 
 
-index = partial(
-    _index,
+def _feed(version: str, **kwargs):
+    """Returns a view listing posts as `_index` does, answering conditional GETs from the feed version."""
+    return conditional(version)(read_from_replica(partial(_index, **kwargs)))
+
+
+index = _feed(
+    FEED_VERSION.format(feed="all"),
     header="all",
     filter={},
     order_by=("-score", "-date"),
 )
-news = partial(
-    _index,
+news = _feed(
+    FEED_VERSION.format(feed="all"),
     header="news",
     filter={},
     order_by=("-date",),
 )
-papers = partial(
-    _index,
+papers = _feed(
+    FEED_VERSION.format(feed="board:p"),
     header="papers",
     filter={"board__name": "p"},
     order_by=("-score",),
 )
-code = partial(
-    _index,
+code = _feed(
+    FEED_VERSION.format(feed="board:c"),
     header="code",
     filter={"board__name": "c"},
     order_by=("-score",),
 )
-jobs = partial(
-    _index,
+jobs = _feed(
+    FEED_VERSION.format(feed="board:j"),
     header="jobs",
     filter={"board__name": "j"},
     order_by=("-score",),
 )
 
 
+@conditional(FEED_VERSION.format(feed="all"), RISING_VERSION)
+@read_from_replica
+def rising(request: HttpRequest) -> HttpResponse:
+    # the ranking is kept in redis, posts are listed in its order.
+    ids = rising_ids(redis_default)
+    rank = Case(*[When(id=post_id, then=i) for i, post_id in enumerate(ids)], default=len(ids))
+    # ranked by momentum alone, pinned posts are no exception.
+    return _index(request, header="rising", filter={"id__in": ids}, order_by=(rank,), pinned_first=False)
+
+
+@conditional(FEED_VERSION.format(feed="domain:{domain}"))
+@read_from_replica
+def from_domain(request: HttpRequest, domain: str) -> HttpResponse:
+    return _index(request, header=domain, filter={"domain": domain}, order_by=("-date",))
+
+
+@conditional(POST_VERSION)
+@read_from_replica
 def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
     post = get_object_or_404(Post.objects.with_fan_status(request.user), pk=post_id)
     # fmt: off
@@ -101,7 +161,8 @@ def post_detail(request: HttpRequest, post_id: int) -> HttpResponse:
         .order_by("-date")
     )
     # fmt: on
-    comment_form = CommentForm()
+    # deleted posts take no more comments.
+    comment_form = CommentForm() if post.deleted_at is None else None
     return render(
         request,
         "mboard/post_detail.html",
@@ -129,13 +190,26 @@ def post_submit(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         form = PostForm(request.POST)
         if form.is_valid():
-            _ = save_new_post(
-                title=form.cleaned_data["title"],
-                url=form.cleaned_data["url"],
-                board=form.cleaned_data["board"],
-                author=request.user,
-            )
-            return redirect("mboard:index")
+            # we send users to the existing discussion rather than splitting it across duplicates.
+            duplicates = Post.objects.filter(url_hash=url_hash(form.cleaned_data["url"])).values_list("id", flat=True)
+            if (duplicate_id := duplicates.first()) is not None:
+                return redirect("mboard:post_detail", post_id=duplicate_id)
+            try:
+                with transaction.atomic():
+                    _ = save_new_post(
+                        title=form.cleaned_data["title"],
+                        url=form.cleaned_data["url"],
+                        board=form.cleaned_data["board"],
+                        author=request.user,
+                        keywords=form.cleaned_data["keywords"],
+                    )
+            except IntegrityError:
+                # somebody submitted the same url in the meantime, their post may be deleted already.
+                if (duplicate_id := duplicates.first()) is not None:
+                    return redirect("mboard:post_detail", post_id=duplicate_id)
+                form.add_error("url", "This link was just submitted, please try again.")
+            else:
+                return redirect("mboard:index")
     else:
         form = PostForm()
     return render(
@@ -148,7 +222,7 @@ def post_submit(request: HttpRequest) -> HttpResponse:
 
 
 def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
-    post = get_object_or_404(Post.objects.with_fan_status(request.user), pk=post_id)
+    post = get_object_or_404(Post.objects.with_fan_status(request.user).filter(deleted_at=None), pk=post_id)
     if not can_edit(request.user, post):
         return redirect(settings.LOGIN_URL)
 
@@ -173,7 +247,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HttpResponse:
 
 
 def post_delete(request: HttpRequest, post_id: int) -> HttpResponse:
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.filter(deleted_at=None), pk=post_id)
     if not can_edit(request.user, post):
         return redirect(settings.LOGIN_URL)
 
@@ -185,7 +259,7 @@ def post_delete(request: HttpRequest, post_id: int) -> HttpResponse:
                 "post": post,
             },
         )
-    post.delete()
+    _ = save_deleted_post(post=post)
     return redirect("mboard:index")
 
 
@@ -195,7 +269,7 @@ def post_comment(request: HttpRequest, post_id: int) -> HttpResponse:
     if not can_submit(request.user):
         return redirect(settings.LOGIN_URL)
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.filter(deleted_at=None), pk=post_id)
     form = CommentForm(request.POST)
     if form.is_valid():
         _ = save_new_comment(
@@ -215,7 +289,7 @@ def post_pin(request: HttpRequest, post_id: int) -> HttpResponse:
     if not can_pin(request.user):
         return redirect(settings.LOGIN_URL)
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.filter(deleted_at=None), pk=post_id)
     if request.method == "GET":
         return render(request, "mboard/post_pin.html", {"post": post})
     _ = save_toggle_pin(post=post)
@@ -248,7 +322,7 @@ def comment_reply(request: HttpRequest, comment_id: int) -> HttpResponse:
     if not can_submit(request.user):
         return redirect(settings.LOGIN_URL)
 
-    comment = get_object_or_404(Comment, pk=comment_id)
+    comment = get_object_or_404(Comment.objects.filter(deleted_at=None), pk=comment_id)
     if request.method == "POST":
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -272,20 +346,20 @@ def comment_reply(request: HttpRequest, comment_id: int) -> HttpResponse:
 
 
 def comment_delete(request: HttpRequest, comment_id: int) -> HttpResponse:
-    comment = get_object_or_404(Comment, pk=comment_id)
+    comment = get_object_or_404(Comment.objects.filter(deleted_at=None), pk=comment_id)
     if not can_edit(request.user, comment):
         return redirect(settings.LOGIN_URL)
 
     if request.method == "GET":
         return render(request, "mboard/comment_delete.html", {"comment": comment})
     elif request.method == "POST":
-        comment.delete()
+        _ = save_deleted_comment(comment=comment)
         return redirect("mboard:post_detail", post_id=comment.post.id)
     return redirect("mboard:post_detail", post_id=comment.post.id)
 
 
 def comment_edit(request: HttpRequest, comment_id: int) -> HttpResponse:
-    comment = get_object_or_404(Comment, pk=comment_id)
+    comment = get_object_or_404(Comment.objects.filter(deleted_at=None), pk=comment_id)
     if not can_edit(request.user, comment):
         return redirect(settings.LOGIN_URL)
 
@@ -309,26 +383,41 @@ def comment_edit(request: HttpRequest, comment_id: int) -> HttpResponse:
     )
 
 
-def comment_history(request: HttpRequest, comment_id: int) -> HttpResponse:
-    comment = get_object_or_404(Comment, pk=comment_id)
-    history = [
-        {
-            "content": c["content"],
-            "date": c["pgh_created_at"],
-        }
-        for c in CommentHistory.objects.filter(pgh_obj=comment).values()
-    ]
-    context = {"history": history, "comment": comment}
+def _history(
+    request: HttpRequest,
+    obj: Post | Comment,
+    model: type[PostHistory] | type[CommentHistory],
+    field: str,
+    context: dict,
+) -> HttpResponse:
+    try:
+        cursor = int(request.GET["cursor"])
+    except (KeyError, ValueError):
+        cursor = None
+    page, next_cursor = revisions(model, obj, field, cursor, HISTORY_NREVISIONS)
     return render(
         request,
-        "mboard/comment_history.html",
+        "mboard/history.html",
         {
-            "history": history,
-            "comment": comment,
+            "revisions": page,
+            "next_cursor": next_cursor,
+            **context,
         },
     )
 
 
+def post_history(request: HttpRequest, post_id: int) -> HttpResponse:
+    post = get_object_or_404(
+        Post.objects.with_fan_status(request.user).select_related("user", "board").filter(deleted_at=None), pk=post_id
+    )
+    return _history(request, post, PostHistory, "title", {"post": post, "kind": "post"})
+
+
+def comment_history(request: HttpRequest, comment_id: int) -> HttpResponse:
+    comment = get_object_or_404(Comment.objects.select_related("user", "post").filter(deleted_at=None), pk=comment_id)
+    return _history(request, comment, CommentHistory, "content", {"comment": comment, "kind": "comment"})
+
+
 def can_upvote(user) -> bool:
     return user.is_authenticated and not user.is_banned()
 
@@ -344,7 +433,7 @@ def _upvote(
             "success": False,
         })
 
-    item = get_object_or_404(contrib_model, pk=contrib_id)
+    item = get_object_or_404(contrib_model.objects.filter(deleted_at=None), pk=contrib_id)
     if not item.fans.contains(request.user):
         _ = save_new_like(item, request.user)
         isupvote = True
@@ -368,11 +457,12 @@ def post_upvote(request: HttpRequest, post_id: int):
     return _upvote(request, post_id, Post)
 
 
+@read_from_replica
 def profile(request: HttpRequest, user_id: int) -> HttpResponse:
     user = get_object_or_404(
         get_user_model().objects.annotate(
-            post_count=Count("posts", distinct=True),
-            comment_count=Count("comments", distinct=True),
+            post_count=Count("posts", filter=Q(posts__deleted_at=None), distinct=True),
+            comment_count=Count("comments", filter=Q(comments__deleted_at=None), distinct=True),
         ),
         pk=user_id,
     )
@@ -385,18 +475,21 @@ def profile(request: HttpRequest, user_id: int) -> HttpResponse:
     )
 
 
+@conditional(FEED_VERSION.format(feed="user:{user_id}"))
+@read_from_replica
 def profile_posts(request: HttpRequest, user_id: int) -> HttpResponse:
     _ = get_object_or_404(get_user_model(), pk=user_id)
     return _index(request, filter={"user_id": user_id}, order_by=("-date",))
 
 
+@read_from_replica
 def profile_comments(request: HttpRequest, user_id: int) -> HttpResponse:
     _ = get_object_or_404(get_user_model(), pk=user_id)
     # fmt: off
     comments = (
         Comment.objects
         .with_nested_replies(MAX_DEPTH, request.user)
-        .filter(user_id=user_id)
+        .filter(user_id=user_id, deleted_at=None)
         .order_by("-date")
     )
     # fmt: on
@@ -408,3 +501,65 @@ def profile_comments(request: HttpRequest, user_id: int) -> HttpResponse:
             "max_depth": MAX_DEPTH,
         },
     )
+
+
+@require_GET
+def inbox(request: HttpRequest) -> HttpResponse:
+    """Lists the replies to the user's posts and comments, newest first, and marks them read."""
+    if not request.user.is_authenticated:
+        return redirect(settings.LOGIN_URL)
+    notifications = inbox_notifications(redis_default, request.user.id)
+    return render(request, "mboard/inbox.html", {"notifications": notifications, "unread": 0})
+
+
+@require_GET
+def ready(request: HttpRequest) -> HttpResponse:
+    """Readiness probe for the proxy and orchestrators, fails while the database or the cache are unreachable."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        redis_default.ping()
+    except (DatabaseError, RedisError):
+        return HttpResponse("unavailable", status=503, content_type="text/plain")
+    return HttpResponse("ready", content_type="text/plain")
+
+
+def _sitemap_file(name: str, content_type: str) -> FileResponse:
+    try:
+        return FileResponse(open(Path(settings.SITEMAP_ROOT) / name, "rb"), content_type=content_type)
+    except FileNotFoundError:
+        raise Http404("Sitemaps have not been built yet.")
+
+
+@require_GET
+def sitemap_index(request: HttpRequest) -> FileResponse:
+    """Serves the prebuilt sitemap index, where the proxy does not."""
+    return _sitemap_file(INDEX_NAME, "application/xml")
+
+
+@require_GET
+def sitemap_chunk(request: HttpRequest, chunk: int) -> FileResponse:
+    return _sitemap_file(CHUNK_NAME.format(chunk=chunk), "application/gzip")
+
+
+@staff_member_required
+@require_GET
+def export(request: HttpRequest, table: str, format: str) -> HttpResponse:
+    """
+    Streams a table as JSON lines or CSV, see `mboard/export.py`. Incremental exports pass `since`,
+    an ISO timestamp, or `after_id`.
+    """
+    if table not in exports.TABLES or format not in exports.FORMATS:
+        raise Http404
+    try:
+        since = None
+        if "since" in request.GET and (since := parse_datetime(request.GET["since"])) is None:
+            raise ValueError("since must be an ISO timestamp.")
+        after_id = int(request.GET["after_id"]) if "after_id" in request.GET else None
+        lines = exports.lines(table, format, since, after_id)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    content_type = "application/jsonl" if format == "jsonl" else "text/csv"
+    response = StreamingHttpResponse(lines, content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{table}.{format}"'
+    return response
@@ -0,0 +1,58 @@
+from pathlib import Path
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import get_resolver
+from django.urls import reverse
+
+from .models import Post
+from .settings import WARMUP_NPOSTS
+from .settings import WARMUP_VIEWS
+from .templatetags.mboard_extras import markdown
+
+
+def compile_templates() -> int:
+    """Loads the project templates, which the cached loader keeps compiled. Returns their number."""
+    ntemplates = 0
+    for backend in engines.all():
+        for directory in map(Path, backend.template_dirs):
+            # third party templates, the admin's included, are left to the first request needing them.
+            if not directory.is_relative_to(settings.BASE_DIR):
+                continue
+            for path in directory.rglob("*.html"):
+                backend.get_template(path.relative_to(directory).as_posix())
+                ntemplates += 1
+    return ntemplates
+
+
+def warm_up() -> dict[str, tuple[int, float]]:
+    """
+    Pays the costs the first requests of a process would: template compilation, URL resolver population,
+    model metadata and the markdown parser. Then renders the top feeds and posts, filling the caches they use.
+    Returns the status code and rendering time of each warmed URL.
+    """
+    compile_templates()
+    get_resolver().reverse_dict
+    for model in apps.get_models():
+        model._meta.get_fields()
+    markdown("*warm* [up](https://example.com)")
+
+    urls = [reverse(view) for view in WARMUP_VIEWS]
+    top_posts = Post.objects.filter(deleted_at=None).order_by("-score").values_list("id", flat=True)[:WARMUP_NPOSTS]
+    urls += [reverse("mboard:post_detail", args=(post_id,)) for post_id in top_posts]
+
+    # requests go through the whole middleware stack, as an anonymous visitor.
+    handler = WSGIHandler()
+    host = next((h.lstrip(".") for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+    factory = RequestFactory(HTTP_HOST=host)
+    timings = {}
+    for url in urls:
+        start = time.perf_counter()
+        # we do not close responses, closing signals the end of a request and would close db connections.
+        response = handler.get_response(factory.get(url))
+        timings[url] = (response.status_code, time.perf_counter() - start)
+    return timings
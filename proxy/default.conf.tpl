@@ -1,8 +1,45 @@
+# hashed static names change with their content, so they can be cached forever.
+map $uri $static_cache_control {
+    "~\.[0-9a-f]{12}\.\w+$"  "public, max-age=31536000, immutable";
+    default                  "no-cache";
+}
+
 server {
     listen ${LISTEN_PORT};
 
     location /static {
         alias /vol/static;
+        # serves the .gz variants written by collectstatic.
+        gzip_static on;
+        gzip_vary on;
+        add_header Cache-Control $static_cache_control;
+    }
+
+    # sitemaps, prebuilt by the job workers. chunks are gzipped files, served as they are.
+    location = /sitemap.xml {
+        alias /vol/static/sitemaps/sitemap.xml;
+        add_header Cache-Control "public, max-age=3600";
+    }
+
+    location ~ ^/sitemaps/(posts-[0-9]+\.xml\.gz)$ {
+        alias /vol/static/sitemaps/$1;
+        types { application/gzip gz; }
+        add_header Cache-Control "public, max-age=3600";
+    }
+
+    # exports stream large responses, which should reach the client as they come rather than be buffered.
+    location /export/ {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        uwsgi_buffering         off;
+        uwsgi_read_timeout      600s;
+    }
+
+    # readiness probe, never cached nor logged.
+    location = /ready/ {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        access_log              off;
     }
 
     location / {